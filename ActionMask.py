@@ -1,28 +1,55 @@
+import gymnasium as gym
 import numpy as np
 
 from Card import *
+from cardsdb import CARDS_BY_ID
+from Flatten import FlatLayout
 from mappings import *
 
 
+def action_mask_space(num_players=NUM_PLAYERS):
+    """
+    Space matching the layout of ActionMask.action_mask, e.g. for batching
+    masks across vectorized envs.
+    """
+    return gym.spaces.Dict({
+        "action_ID": gym.spaces.MultiBinary(NUM_ACTIONS),
+        "hand_card": gym.spaces.MultiBinary(NUM_UNIQUE_CARDS),
+        "opponent_ID": gym.spaces.MultiBinary(num_players),
+        "property_card": gym.spaces.Dict({
+            "colour": gym.spaces.MultiBinary(NUM_UNIQUE_COLOURS),
+            "set_index": gym.spaces.MultiBinary(MAX_SETS_PER_PROPERTY),
+            "card": gym.spaces.MultiBinary(NUM_UNIQUE_PROPERTY_CARDS)
+        }),
+        "set": gym.spaces.Dict({
+            "colour": gym.spaces.MultiBinary(NUM_UNIQUE_COLOURS),
+            "set_index": gym.spaces.MultiBinary(MAX_SETS_PER_PROPERTY)
+        }),
+        "payment_bundle": gym.spaces.MultiBinary(MAX_PAYMENT_BUNDLES)
+    })
+
+
+# Flat int8 layout of a mask: ActionMask.buffer holds every component back
+# to back and ActionMask.action_mask is a dict of views into it. One layout
+# per supported player count, built once; ACTION_MASK_LAYOUT is the default.
+ACTION_MASK_LAYOUTS = {n: FlatLayout(action_mask_space(n)) for n in range(MIN_PLAYERS, MAX_PLAYERS+1)}
+ACTION_MASK_LAYOUT = ACTION_MASK_LAYOUTS[NUM_PLAYERS]
+
+
+def opponent_seats(players, agents, agent_selection):
+    # SeatArrays rows of agent_selection's opponents, in turn order
+    return [players[agent].seat for agent in agents if agent != agent_selection]
+
+
 class ActionMask():
-    def __init__(self):
+    def __init__(self, buffer=None, num_players=NUM_PLAYERS):
+        layout = ACTION_MASK_LAYOUTS[num_players]
+        self.buffer = buffer if buffer is not None else layout.empty()
+        self.action_mask = layout.views(self.buffer)
         self.initialise_action_mask()
         
     def initialise_action_mask(self):
-        self.action_mask = {
-            "action_ID": np.zeros(NUM_ACTIONS, dtype=np.int8),
-            "hand_card": np.zeros(NUM_UNIQUE_CARDS, dtype=np.int8),
-            "opponent_ID": np.zeros(NUM_OPPONENTS+1, dtype=np.int8),
-            "property_card": {
-                "colour": np.zeros(NUM_UNIQUE_COLOURS, dtype=np.int8),
-                "set_index": np.zeros(MAX_SETS_PER_PROPERTY, dtype=np.int8),
-                "card": np.zeros(NUM_UNIQUE_PROPERTY_CARDS, dtype=np.int8)
-            },
-            "set": {
-                "colour": np.zeros(NUM_UNIQUE_COLOURS, dtype=np.int8),
-                "set_index": np.zeros(MAX_SETS_PER_PROPERTY, dtype=np.int8)
-            }
-        }
+        self.buffer.fill(0)
 
     def set_action_ID(self, internal_state):
         # set action mask based on cards in hand
@@ -47,96 +74,82 @@ class ActionMask():
         # only requirement is having one in hand.
         self.action_mask["action_ID"][4] = player.hasWildPropertyInHand()
 
+        # every opponent at once, from the stacked seat arrays
+        seats = player.seats
+        opponents = opponent_seats(players, agents, agent_selection)
+        opponent_has_property = seats.hasProperty(opponents).any()
+        opponent_has_money = seats.hasMoney(opponents).any()
+
         # sly deal, at least one opponent must have any property on the board.
         # Wilds are stealable; the source-side property mask permits wild-only
         # buckets and the destination check uses canAddProperty (which also
         # accepts wilds into empty sets).
-        if player.hasSlyDeal():
-            for opponent in players.values():
-                if opponent == player:
-                    continue
-                if opponent.hasAtLeastOnePropertyOnBoard():
-                    self.action_mask["action_ID"][5] = 1
-                    break
+        if player.hasSlyDeal() and opponent_has_property:
+            self.action_mask["action_ID"][5] = 1
 
         # forced deal, both sides must have at least one property — wilds on
         # either side are tradable.
-        if player.hasForcedDeal() and player.hasAtLeastOnePropertyOnBoard():
-            for opponent in players.values():
-                if opponent == player:
-                    continue
-                if opponent.hasAtLeastOnePropertyOnBoard():
-                    self.action_mask["action_ID"][6] = 1
-                    break
+        if player.hasForcedDeal() and player.hasAtLeastOnePropertyOnBoard() and opponent_has_property:
+            self.action_mask["action_ID"][6] = 1
         
         # debt collector, at least one opponent must have >0 money on the board
-        if player.hasDebtCollector():
-            for opponent in players.values():
-                if opponent == player:
-                    continue
-                if opponent.hasAtLeastOneMoneyOnBoard():
-                    self.action_mask["action_ID"][7] = 1
-                    break
+        if player.hasDebtCollector() and opponent_has_money:
+            self.action_mask["action_ID"][7] = 1
 
         # its my birthday, at least one opponent must have >0 money on the board
-        if player.hasItsMyBirthday():
-            for opponent in players.values():
-                if opponent == player:
-                    continue
-                if opponent.hasAtLeastOneMoneyOnBoard():
-                    self.action_mask["action_ID"][8] = 1
-                    break
+        if player.hasItsMyBirthday() and opponent_has_money:
+            self.action_mask["action_ID"][8] = 1
 
         # deal breaker, at least one opponent must have at least one set on the board
-        if player.hasDealBreaker():
-            for opponent in players.values():
-                if opponent == player:
-                    continue
-                if opponent.hasAtLeastOneSetOnBoard():
-                    self.action_mask["action_ID"][9] = 1
-                    break
+        if player.hasDealBreaker() and seats.hasSet(opponents).any():
+            self.action_mask["action_ID"][9] = 1
         
         # rent, at least one property of that colour AND at least one opponent with >0 money
-        for opponent in players.values():
-            if opponent == player:
-                continue
-            if opponent.hasAtLeastOneMoneyOnBoard():
-                pColours = player.whichColoursOnBoard()
-                rColours = player.whichRentColoursInHand()
-
-                validColours = pColours.intersection(rColours)
-
-                if "Red" in validColours:
-                    self.action_mask["action_ID"][10] = 1
-                if "Green" in validColours:
-                    self.action_mask["action_ID"][11] = 1
-                if "Pink" in validColours:
-                    self.action_mask["action_ID"][12] = 1
-                if "Black" in validColours:
-                    self.action_mask["action_ID"][13] = 1
-                if "Brown" in validColours:
-                    self.action_mask["action_ID"][14] = 1
-                if "Wild" in rColours:
-                    self.action_mask["action_ID"][15] = 1
+        if opponent_has_money:
+            pColours = player.whichColoursOnBoard()
+            rColours = player.whichRentColoursInHand()
+
+            validColours = pColours.intersection(rColours)
+
+            if "Red" in validColours:
+                self.action_mask["action_ID"][10] = 1
+            if "Green" in validColours:
+                self.action_mask["action_ID"][11] = 1
+            if "Pink" in validColours:
+                self.action_mask["action_ID"][12] = 1
+            if "Black" in validColours:
+                self.action_mask["action_ID"][13] = 1
+            if "Brown" in validColours:
+                self.action_mask["action_ID"][14] = 1
+            if "Wild" in rColours:
+                self.action_mask["action_ID"][15] = 1
         
         # just say no, masked 
         self.action_mask["action_ID"][16] = 0
 
+    def set_opening_action_ID(self, player):
+        # set_action_ID for the first decision of a fresh deal: every board
+        # and bank is empty, so only skipping and playing money, property or
+        # wild property from hand can be legal
+        action_ID = self.action_mask["action_ID"]
+        action_ID[0] = 1
+        action_ID[2] = player.hasMoneyInHand()
+        action_ID[3] = player.hasPropertyInHand()
+        action_ID[4] = player.hasWildPropertyInHand()
+
     def set_hand_card(self, internal_state):
         # set action mask based on cards in hand and action_ID
 
         players, agents, agent_selection, deck, action_context = internal_state
         player = players[agent_selection]
-        action_ID = action_context["action"]
+        action_ID = action_context[CTX_ACTION]
     
         if action_ID == 2:      # money
-            for card in player.hand:
-                self.action_mask["hand_card"][card.id] = 1
+            self.action_mask["hand_card"][:] = np.frombuffer(player.hand, dtype=np.int8) > 0
 
         elif action_ID == 3:    # property
-            for card in player.hand:
-                if isinstance(card,PropertyCard):
-                    self.action_mask["hand_card"][card.id] = 1
+            in_hand = np.frombuffer(player.hand, dtype=np.int8)[:NUM_UNIQUE_PROPERTY_CARDS] > 0
+            self.action_mask["hand_card"][:NUM_UNIQUE_PROPERTY_CARDS] = in_hand
 
         elif action_ID == 4:    # wild property
             self.action_mask["hand_card"][17] = 1
@@ -175,9 +188,23 @@ class ActionMask():
             self.action_mask["hand_card"][33] = 1
 
     def set_opponent(self, internal_state):
+        # unmask the opponents the chosen action can target
         players, agents, agent_selection, deck, action_context = internal_state
+        seats = players[agent_selection].seats
+        order = [players[agent].seat for agent in agents]
+        action_ID = action_context[CTX_ACTION]
+
+        if action_ID in [5,6]:
+            # sly deal, forced deal: opponent needs a property
+            eligible = seats.hasProperty(order)
+        elif action_ID == 9:
+            # deal breaker: opponent needs a full set
+            eligible = seats.hasSet(order)
+        else:
+            # debt collector, wild rent: opponent needs money
+            eligible = seats.hasMoney(order)
 
-        self.action_mask["opponent_ID"] = np.ones(NUM_OPPONENTS+1, dtype=np.int8)
+        self.action_mask["opponent_ID"][:] = eligible
         self.action_mask["opponent_ID"][agents.index(str(agent_selection))] = 0
 
     def set_property_colour(self, internal_state, target_opponent):
@@ -185,235 +212,129 @@ class ActionMask():
 
         players, agents, agent_selection, deck, action_context = internal_state
         if target_opponent:
-            opponent = agents[action_context["opponent_ID"]]
+            opponent = agents[action_context[CTX_OPPONENT_ID]]
             target = players[opponent]
         else:
             target = players[agent_selection]
 
         # Any non-empty colour bucket is a valid source — wild-only buckets
         # included (Move Property / Sly Deal / Forced Deal can pick wilds).
-        for cind,pSets in enumerate(target.sets.values()):
-            for pSet in pSets:
-                if not pSet.isEmpty():
-                    self.action_mask["property_card"]["colour"][cind] = 1
-                    break
+        self.action_mask["property_card"]["colour"][:] = target.boardTree().nonempty.any(axis=1)
 
     def set_property_set_index(self, internal_state, target_opponent):
         # set action mask based on agents properties on the board
 
         players, agents, agent_selection, deck, action_context = internal_state
         if target_opponent:
-            opponent = agents[action_context["opponent_ID"]] 
+            opponent = agents[action_context[CTX_OPPONENT_ID]] 
             target = players[opponent]
-            colour_ID = action_context["opponent_property"]["colour"]
+            colour_ID = action_context[CTX_OPPONENT_PROPERTY_COLOUR]
         else:
             target = players[agent_selection]
-            colour_ID = action_context["my_property"]["colour"]
-        
-        colour = decode_colour(colour_ID)
+            colour_ID = action_context[CTX_MY_PROPERTY_COLOUR]
         
         # Any non-empty slot of the chosen colour is a valid source.
-        for pind,pSet in enumerate(target.sets[colour]):
-            if not pSet.isEmpty():
-                self.action_mask["property_card"]["set_index"][pind] = 1
-                break
+        self.action_mask["property_card"]["set_index"][:] = target.boardTree().nonempty[colour_ID]
 
     def set_property_card(self, internal_state, target_opponent):
         # set action mask based on agents properties on the board
 
         players, agents, agent_selection, deck, action_context = internal_state
         if target_opponent:
-            opponent = agents[action_context["opponent_ID"]] 
+            opponent = agents[action_context[CTX_OPPONENT_ID]] 
             target = players[opponent]
-            colour_ID = action_context["opponent_property"]["colour"]
-            set_index = action_context["opponent_property"]["set_index"]
+            colour_ID = action_context[CTX_OPPONENT_PROPERTY_COLOUR]
+            set_index = action_context[CTX_OPPONENT_PROPERTY_SET_INDEX]
         else:
             target = players[agent_selection]
-            colour_ID = action_context["my_property"]["colour"]
-            set_index = action_context["my_property"]["set_index"]
+            colour_ID = action_context[CTX_MY_PROPERTY_COLOUR]
+            set_index = action_context[CTX_MY_PROPERTY_SET_INDEX]
 
-        colour = decode_colour(colour_ID)
-        
-        for card in target.sets[colour][set_index].properties:
-            self.action_mask["property_card"]["card"][card.id] = 1
+        self.action_mask["property_card"]["card"][:] = target.boardTree().cards[colour_ID, set_index] > 0
 
-    def set_set_colour(self, internal_state, target_opponent):
-        # set action mask on set colour
+    def _set_choices(self, internal_state, target_opponent):
+        # (colour, set_index) grid of legal set choices for decisions 5/6,
+        # sliced out of the target's BoardTree
 
         players, agents, agent_selection, deck, action_context = internal_state
         if target_opponent:
-            opponent = agents[action_context["opponent_ID"]] 
+            opponent = agents[action_context[CTX_OPPONENT_ID]] 
             target = players[opponent]
         else:
             target = players[agent_selection]
+        tree = target.boardTree()
+        action_ID = action_context[CTX_ACTION]
 
         # playing a property into a set
-        if action_context["action"] < 9:
-            if action_context["action"] in [1]:
+        if action_ID < 9:
+            if action_ID in [1]:
                 # move property
-                my_property = action_context["my_property"]
-
-                # decode colour
-                colour = decode_colour(my_property["colour"])
-
-                # get property
-                pCard = target.getPropertyById(colour,my_property["set_index"],my_property["card"])
-            elif action_context["action"] in [3,4]:
+                card_ID = action_context[CTX_MY_PROPERTY_CARD]
+            elif action_ID in [3,4]:
                 # play property or wild property
-                card_ID = action_context["hand_card"]
-
-                # get property
-                pCard = target.getHandCardById(card_ID)
-            elif action_context["action"] in [5,6]:
+                card_ID = action_context[CTX_HAND_CARD]
+            elif action_ID in [5,6]:
                 # sly deal or forced deal
-                opponent = players[agents[action_context["opponent_ID"]]]
-                opponent_property = action_context["opponent_property"]
+                card_ID = action_context[CTX_OPPONENT_PROPERTY_CARD]
 
-                # decode colour
-                colour = decode_colour(opponent_property["colour"])
-
-                # get property
-                pCard = opponent.getPropertyById(colour,opponent_property["set_index"],opponent_property["card"])
-
-            for cind,(colour,pSets) in enumerate(target.sets.items()):
-                for pSet in pSets:
-                    if pSet.canAddProperty(pCard):
-                        self.action_mask["set"]["colour"][cind] = 1
-                        break
+            return tree.placement(CARDS_BY_ID[card_ID])
+        elif action_ID == 9:
+            # deal breaker, unmask all full sets
+            return tree.completed
         else:
-            if action_context["action"] == 9:
-                # deal breaker, unmask all full sets
-                for cind,(colour,pSets) in enumerate(target.sets.items()):
-                    for pSet in pSets:
-                        if pSet.isCompleted():
-                            self.action_mask["set"]["colour"][cind] = 1
-                            break
-            else:
-                # rent, unmask based on rent card
-                card_ID = action_context["hand_card"]
-                # get rent card
-                rCard = target.getHandCardById(card_ID)
-
-                if rCard.isWild():
-                    for cind,(colour,pSets) in enumerate(target.sets.items()):
-                        for pSet in pSets:
-                            if not pSet.isEmpty():
-                                self.action_mask["set"]["colour"][cind] = 1
-                                break
-                else:
-                    for cind,(colour,pSets) in enumerate(target.sets.items()):
-                        if colour not in rCard.colours:
-                            continue
-                        for pSet in pSets:
-                            if not pSet.isEmpty():
-                                self.action_mask["set"]["colour"][cind] = 1
-                                break
+            # rent, unmask non-empty sets of the rent card's colours
+            rCard = CARDS_BY_ID[action_context[CTX_HAND_CARD]]
+            if rCard.isWild():
+                return tree.nonempty
+            rent_colours = np.array([colour in rCard.colours for colour in SET_LENGTH])
+            return tree.nonempty & rent_colours[:, None]
 
-    def set_set_index(self, internal_state, target_opponent):
-        # set action mask on set index
+    def set_set_colour(self, internal_state, target_opponent):
+        # set action mask on set colour
+        self.action_mask["set"]["colour"][:] = self._set_choices(internal_state, target_opponent).any(axis=1)
 
+    def set_set_index(self, internal_state, target_opponent):
+        # set action mask on set index, for the colour chosen at decision 5 only
         players, agents, agent_selection, deck, action_context = internal_state
         if target_opponent:
-            opponent = agents[action_context["opponent_ID"]] 
-            target = players[opponent]
-        else:
-            target = players[agent_selection]
-
-        # playing a property into a set
-        if action_context["action"] < 9:
-            if action_context["action"] in [1]:
-                # move property
-                my_property = action_context["my_property"]
-
-                # decode colour
-                colour = decode_colour(my_property["colour"])
-
-                # get property
-                pCard = target.getPropertyById(colour,my_property["set_index"],my_property["card"])
-            elif action_context["action"] in [3,4]:
-                # play property or wild property
-                card_ID = action_context["hand_card"]
-                
-                # get property
-                pCard = target.getHandCardById(card_ID)
-            elif action_context["action"] in [5,6]:
-                # sly deal or forced deal
-                opponent = players[agents[action_context["opponent_ID"]]]
-                opponent_property = action_context["opponent_property"]
-
-                # decode colour
-                colour = decode_colour(opponent_property["colour"])
-
-                # get property
-                pCard = opponent.getPropertyById(colour,opponent_property["set_index"],opponent_property["card"])
-
-            for cind,(colour,pSets) in enumerate(target.sets.items()):
-                for pind,pSet in enumerate(pSets):
-                    if pSet.canAddProperty(pCard):
-                        self.action_mask["set"]["set_index"][pind] = 1
+            colour_ID = action_context[CTX_OPPONENT_SET_COLOUR]
         else:
-            if action_context["action"] == 9:
-                # deal breaker, unmask all full sets
-                for cind,(colour,pSets) in enumerate(target.sets.items()):
-                    for pind,pSet in enumerate(pSets):
-                        if pSet.isCompleted():
-                            self.action_mask["set"]["set_index"][pind] = 1
-            else:
-                # rent, unmask based on rent card
-                card_ID = action_context["hand_card"]
-
-                # get rent card
-                rCard = target.getHandCardById(card_ID)
-
-                if rCard.isWild():
-                    for cind,(colour,pSets) in enumerate(target.sets.items()):
-                        for pind,pSet in enumerate(pSets):
-                            if not pSet.isEmpty():
-                                self.action_mask["set"]["set_index"][pind] = 1
-                else:
-                    for cind,(colour,pSets) in enumerate(target.sets.items()):
-                        if colour not in rCard.colours:
-                            continue
-                        for pind,pSet in enumerate(pSets):
-                            if not pSet.isEmpty():
-                                self.action_mask["set"]["set_index"][pind] = 1
+            colour_ID = action_context[CTX_MY_SET_COLOUR]
+        self.action_mask["set"]["set_index"][:] = self._set_choices(internal_state, target_opponent)[colour_ID]
 
     def set_defender_phase(self, internal_state, pending):
         """Build the action mask for a defender phase (decision >= 10).
 
         Caller has yielded control to a defender via
         MonopolyDeal._yield_to_defender(); `pending` describes the in-flight
-        action and action_context["decision"] is the current
+        action and action_context[CTX_DECISION] is the current
         DECISION_DEFENDER_* code.
         """
         players, agents, agent_selection, deck, action_context = internal_state
         defender = players[agent_selection]
-        decision = action_context["decision"]
+        decision = action_context[CTX_DECISION]
 
         if decision == DECISION_DEFENDER_PAY:
             # Defender picks a card from their bank to hand over. Currently
             # money-only — paying with property cards is not yet supported.
             # TODO: extend to allow property-card payments.
-            for card in defender.money:
-                self.action_mask["hand_card"][card.id] = 1
+            self.action_mask["hand_card"][:] = np.frombuffer(defender.money, dtype=np.int8) > 0
+
+        elif decision == DECISION_DEFENDER_PAY_BUNDLE:
+            # One choice per payment bundle listed in pending["bundles"].
+            self.action_mask["payment_bundle"][:len(pending["bundles"])] = 1
 
         elif decision == DECISION_DEFENDER_FORCED_DEAL_PLACE_COLOUR:
             # Unmask any colour bucket that has at least one slot accepting
             # the incoming card.
             pCard = pending["card"]
-            for cind, (colour, pSets) in enumerate(defender.sets.items()):
-                for pSet in pSets:
-                    if pSet.canAddProperty(pCard):
-                        self.action_mask["set"]["colour"][cind] = 1
-                        break
+            self.action_mask["set"]["colour"][:] = defender.boardTree().placement(pCard).any(axis=1)
 
         elif decision == DECISION_DEFENDER_FORCED_DEAL_PLACE_INDEX:
             # Within the chosen colour, unmask each slot that accepts the card.
             pCard = pending["card"]
-            colour = decode_colour(action_context["my_set"]["colour"])
-            for pind, pSet in enumerate(defender.sets[colour]):
-                if pSet.canAddProperty(pCard):
-                    self.action_mask["set"]["set_index"][pind] = 1
+            colour_ID = action_context[CTX_MY_SET_COLOUR]
+            self.action_mask["set"]["set_index"][:] = defender.boardTree().placement(pCard)[colour_ID]
 
         elif decision == DECISION_DEFENDER_JSN or decision == DECISION_DEFENDER_PAY_DONE:
             # TODO(JSN MR): unmask JSN card / accept sentinel.
@@ -425,5 +346,4 @@ class ActionMask():
         players, agents, agent_selection, deck, action_context = internal_state
         player = players[agent_selection]
 
-        for card in player.hand:
-            self.action_mask["hand_card"][card.id] = 1
\ No newline at end of file
+        self.action_mask["hand_card"][:] = np.frombuffer(player.hand, dtype=np.int8) > 0
\ No newline at end of file
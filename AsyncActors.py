@@ -0,0 +1,131 @@
+import asyncio
+
+from MonopolyDeal import MonopolyDeal
+from Policy import RandomPolicy
+
+
+class LoopbackServer():
+    """
+    In-process stand-in for a remote policy server. infer() takes a batch of
+    observations (MonopolyDeal.observe dicts) and returns one action each,
+    after `latency` seconds, as a round trip to a real server would.
+    """
+
+    def __init__(self, policy=None, latency=0.0):
+        self.policy = policy if policy is not None else RandomPolicy()
+        self.latency = latency
+
+    async def infer(self, observations):
+        await asyncio.sleep(self.latency)
+        return self.policy(observations)
+
+
+class Batcher():
+    """
+    Coalesces the action requests of many concurrently running games into
+    batched server.infer() calls.
+
+    Every game that becomes ready in the same event-loop pass queues its
+    request before the batch is sent, so the batch size tracks how many games
+    are waiting rather than being fixed up front. A batch is sent early once
+    max_batch requests are queued.
+    """
+
+    def __init__(self, server, max_batch=1024):
+        self.server = server
+        self.max_batch = max_batch
+        self._pending = []
+        self._flush = None
+
+        self.num_batches = 0
+        self.num_requests = 0
+
+    async def act(self, observation):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((observation, future))
+        if len(self._pending) >= self.max_batch:
+            self._send()
+        elif self._flush is None:
+            self._flush = asyncio.ensure_future(self._send_soon())
+        return await future
+
+    async def _send_soon(self):
+        # one loop pass, so every game woken by the last batch queues first
+        await asyncio.sleep(0)
+        self._flush = None
+        self._send()
+
+    def _send(self):
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            asyncio.ensure_future(self._serve(batch))
+
+    async def _serve(self, batch):
+        self.num_batches += 1
+        self.num_requests += len(batch)
+        try:
+            actions = await self.server.infer([observation for observation, future in batch])
+        except Exception as error:
+            for observation, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        # a caller may have cancelled its act() while the batch was in flight
+        for (observation, future), action in zip(batch, actions):
+            if not future.done():
+                future.set_result(action)
+        if len(actions) < len(batch):
+            error = RuntimeError(f"server returned {len(actions)} actions for {len(batch)} requests")
+            for observation, future in batch[len(actions):]:
+                if not future.done():
+                    future.set_exception(error)
+
+    def mean_batch_size(self):
+        return self.num_requests / self.num_batches if self.num_batches else 0.0
+
+
+async def play_game(env, act, seed=None):
+    """
+    Play one game of `env` to the end, awaiting act(observation) for every
+    decision. Returns (winner or None, number of steps).
+    """
+    env.reset(seed=seed)
+    steps = 0
+    for agent in env.agent_iter():
+        observation, reward, termination, truncation, info = env.last()
+        if termination or truncation:
+            action = None
+        else:
+            # observe() writes into this env's own buffers, which stay
+            # untouched while the request is in flight
+            action = await act(observation)
+        env.step(action)
+        steps += 1
+    winner = next((info["winner"] for info in env.infos.values() if "winner" in info), None)
+    return winner, steps
+
+
+async def run_games(num_games, batcher, seed=0, **env_kwargs):
+    """
+    Run `num_games` games concurrently as coroutines in the current event
+    loop, all sharing `batcher`. Returns the list of play_game results.
+    """
+    games = [play_game(MonopolyDeal(**env_kwargs), batcher.act, seed=seed + i) for i in range(num_games)]
+    return await asyncio.gather(*games)
+
+
+if __name__ == "__main__":
+    # End-to-end run against the loopback server.
+    import os, time
+
+    num_games = int(os.environ.get("ACTOR_GAMES", "200"))
+    batcher = Batcher(LoopbackServer(RandomPolicy(seed=0), latency=0.001))
+
+    start = time.perf_counter()
+    results = asyncio.run(run_games(num_games, batcher, max_steps=500))
+    elapsed = time.perf_counter() - start
+
+    steps = sum(steps for winner, steps in results)
+    wins = sum(winner is not None for winner, steps in results)
+    print(f"{num_games} games ({wins} won) in {elapsed:.2f}s, {steps / elapsed:.0f} steps/s")
+    print(f"{batcher.num_batches} batches, mean batch size {batcher.mean_batch_size():.1f}")
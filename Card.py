@@ -1,5 +1,13 @@
 
+def card_by_id(card_id):
+    # Cards with the same id are interchangeable, so pickled cards are
+    # restored as the shared cardsdb objects rather than new copies.
+    from cardsdb import CARDS_BY_ID
+    return CARDS_BY_ID[card_id]
+
 class Card:
+    __slots__ = ("id", "name", "value")
+
     def __init__(self, id, name, value):
         self.id = id
         self.name = name
@@ -7,17 +15,26 @@ class Card:
 
     def __repr__(self):
         return self.name
+
+    def __reduce__(self):
+        return card_by_id, (self.id,)
     
 class MoneyCard(Card):
+    __slots__ = ()
+
     def __init__(self, id, name, value):
         super().__init__(id, name, value)
     
 class ActionCard(Card):
+    __slots__ = ("action",)
+
     def __init__(self, id, name, value, action):
         super().__init__(id, name, value)
         self.action = action
 
 class PropertyCard(Card):
+    __slots__ = ("colours",)
+
     def __init__(self, id, name, value, colours):
         super().__init__(id, name, value)
         self.colours = colours
@@ -26,6 +43,8 @@ class PropertyCard(Card):
         return self.colours[0] == "Wild"
     
 class RentCard(Card):
+    __slots__ = ("colours",)
+
     def __init__(self, id, name, value, colours):
         super().__init__(id, name, value)
         self.colours = colours
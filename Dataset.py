@@ -0,0 +1,434 @@
+import json
+import multiprocessing
+import os
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ActionMask import ACTION_MASK_LAYOUTS
+from InferenceServer import ACTION_FIELDS
+from MonopolyDeal import OBSERVATION_LAYOUTS, MonopolyDeal
+from Policy import RandomPolicy
+from mappings import *
+
+# done column: how the acting seat's trajectory ends at this row
+NOT_DONE = 0
+TERMINATED = 1              # the game was won; nothing to bootstrap from
+TRUNCATED = 2               # cut at max_steps; bootstraps from the row's value
+
+META = "meta.json"
+
+
+def dataset_columns(num_players=NUM_PLAYERS):
+    """Column name → (dtype, per-row shape) of a recorded dataset."""
+    return {
+        "observation": ("int8", (OBSERVATION_LAYOUTS[num_players].size,)),
+        "action_mask": ("int8", (ACTION_MASK_LAYOUTS[num_players].size,)),
+        "decision": ("int8", ()),
+        "action": ("int16", (len(ACTION_FIELDS),)),
+        "reward": ("float32", ()),
+        "seat": ("int8", ()),
+        "episode": ("int32", ()),
+        "done": ("int8", ()),
+    }
+
+
+def flatten_action(action):
+    """Nested action dict → its components in ACTION_FIELDS order (inverse of
+    InferenceServer.unflatten_action)."""
+    row = []
+    for path in ACTION_FIELDS:
+        node = action
+        for key in path:
+            node = node[key]
+        row.append(node)
+    return row
+
+
+class DatasetWriter():
+    """
+    Appends whole episodes to a dataset directory: one raw, row-major binary
+    file per column (<name>.bin) plus meta.json with the dtypes, shapes and
+    row count. Opening an existing directory appends to it. meta.json is
+    only rewritten on close(), so readers never see a half-written episode.
+    """
+
+    def __init__(self, path, num_players=NUM_PLAYERS):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, META)
+        # derived columns (Dataset.add_column) are not carried over: they
+        # would not cover the appended rows
+        self.columns = dataset_columns(num_players)
+        self.rows = self.episodes = 0
+        self.seeds = []
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["num_players"] != num_players:
+                raise ValueError(f"{path} holds {meta['num_players']}-player games")
+            self.rows = meta["rows"]
+            self.episodes = meta["episodes"]
+            self.seeds = meta.get("seeds", [None] * self.episodes)
+        self.num_players = num_players
+        self._files = {name: open(os.path.join(path, name + ".bin"), "ab") for name in self.columns}
+        for name, f in self._files.items():
+            # drop anything written after the last close()
+            dtype, shape = self.columns[name]
+            f.truncate(self.rows * np.dtype(dtype).itemsize * int(np.prod(shape, dtype=np.int64)))
+
+    def add_episode(self, episode, seed=None):
+        """Append one episode: a dict of equal-length arrays for every column
+        but "episode", which is numbered here. seed, the reset seed the
+        episode was played from, goes in meta["seeds"] so it can be replayed
+        (see HtmlReplay.export_dataset)."""
+        rows = len(episode["decision"])
+        episode = dict(episode, episode=np.full(rows, self.episodes))
+        for name, (dtype, shape) in self.columns.items():
+            data = np.ascontiguousarray(episode[name], dtype=dtype)
+            if data.shape != (rows,) + shape:
+                raise ValueError(f"column {name} has shape {data.shape}, expected {(rows,) + shape}")
+            self._files[name].write(data.tobytes())
+        self.rows += rows
+        self.episodes += 1
+        self.seeds.append(seed)
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        _write_meta(self.path, {"num_players": self.num_players, "rows": self.rows, "episodes": self.episodes,
+                                "seeds": self.seeds,
+                                "columns": {name: [dtype, list(shape)] for name, (dtype, shape) in self.columns.items()}})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _write_meta(path, meta):
+    tmp = os.path.join(path, META + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, META))
+
+
+def record_episode(env, policy, seed=None, options=None):
+    """
+    Play one game of `env` with `policy` (see Policy.py), from reset(seed,
+    options) so e.g. a Scenario can set the start, and return its columns
+    for DatasetWriter.add_episode. Each row is one decision of the
+    seat that made it; its reward is everything that seat received until
+    its next decision (PettingZoo's cumulative reward), so the final win /
+    loss lands on each seat's last row together with its done code.
+    """
+    env.reset(seed=seed, options=options)
+    observations, masks, decisions, actions, rewards, seats, dones = [], [], [], [], [], [], []
+    last_row = {}
+    for agent in env.agent_iter():
+        observation, reward, termination, truncation, info = env.last()
+        if agent in last_row:
+            rewards[last_row[agent]] += reward
+        if termination or truncation:
+            if agent in last_row:
+                dones[last_row[agent]] = TERMINATED if termination else TRUNCATED
+            env.step(None)
+            continue
+
+        action = policy([observation])[0]
+        last_row[agent] = len(decisions)
+        observations.append(env.observation_buffers[agent].copy())
+        masks.append(env.action_mask_buffers[agent].copy())
+        decisions.append(env.action_context[CTX_DECISION])
+        actions.append(flatten_action(action))
+        rewards.append(0.0)
+        seats.append(env.agent_name_mapping[agent])
+        dones.append(NOT_DONE)
+        env.step(action)
+
+    return {
+        "observation": np.stack(observations),
+        "action_mask": np.stack(masks),
+        "decision": decisions,
+        "action": actions,
+        "reward": rewards,
+        "seat": seats,
+        "done": dones,
+    }
+
+
+def record_games(path, num_games, policy=None, seed=0, **env_kwargs):
+    """Record num_games self-play games (seeds seed, seed+1, ...) into `path`."""
+    env = MonopolyDeal(**env_kwargs)
+    policy = policy if policy is not None else RandomPolicy(seed=seed)
+    with DatasetWriter(path, env.num_players) as writer:
+        for i in range(num_games):
+            writer.add_episode(record_episode(env, policy, seed=seed + i), seed=seed + i)
+
+
+class Dataset():
+    """
+    Read side of a dataset directory: dataset[name] is a read-only
+    np.memmap of that column, shape (rows,) + per-row shape, so nothing is
+    loaded until it is indexed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META)) as f:
+            self.meta = json.load(f)
+        self.num_rows = self.meta["rows"]
+        self.columns = {}
+        for name, (dtype, shape) in self.meta["columns"].items():
+            self.columns[name] = np.memmap(os.path.join(path, name + ".bin"), dtype=dtype, mode="r",
+                                           shape=(self.num_rows,) + tuple(shape)) if self.num_rows else np.empty((0,) + tuple(shape), dtype=dtype)
+
+    def __len__(self):
+        return self.num_rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def add_column(self, name, data):
+        """Store a derived per-row column (e.g. returns, advantages) next to
+        the recorded ones, so DataLoader can serve it."""
+        data = np.ascontiguousarray(data)
+        if len(data) != self.num_rows:
+            raise ValueError(f"column {name} has {len(data)} rows, dataset has {self.num_rows}")
+        data.tofile(os.path.join(self.path, name + ".bin"))
+        self.meta["columns"][name] = [data.dtype.name, list(data.shape[1:])]
+        _write_meta(self.path, self.meta)
+        self.columns[name] = np.memmap(os.path.join(self.path, name + ".bin"), dtype=data.dtype, mode="r", shape=data.shape)
+
+    def next_index(self):
+        """Row of the same seat's next decision in the same episode, -1 at
+        the end of its trajectory (see next_in_trajectory)."""
+        return next_in_trajectory(self["episode"], self["seat"])
+
+
+def next_in_trajectory(episode, seat):
+    """
+    Per row, the index of the next row with the same (episode, seat), or -1.
+    Seats' decisions interleave within an episode, so returns are computed
+    along these links rather than along the rows.
+    """
+    order = np.lexsort((seat, episode))     # stable, so each trajectory stays in play order
+    same = (episode[order[1:]] == episode[order[:-1]]) & (seat[order[1:]] == seat[order[:-1]])
+    next_index = np.full(len(episode), -1, dtype=np.int64)
+    next_index[order[:-1][same]] = order[1:][same]
+    return next_index
+
+
+def discounted_sum(x, next_index, discount):
+    """
+    y[t] = x[t] + discount * y[next_index[t]] along every trajectory at once,
+    by pointer jumping: log2(longest trajectory) vectorized passes instead of
+    a Python loop per step. discount may be a scalar or per row.
+    """
+    n = len(x)
+    end = next_index < 0
+    link = np.append(np.where(end, n, next_index), n)
+    y = np.append(np.asarray(x, dtype=np.float64), 0.0)
+    g = np.append(np.where(end, 0.0, discount), 0.0)
+    while (link[:-1] != n).any():
+        y = y + g * y[link]
+        g = g * g[link]
+        link = link[link]
+    return y[:-1]
+
+
+def _bootstrap(values, next_index, done):
+    # value of the state after each row: the next row's, or at a trajectory
+    # end 0 if the game was won, the row's own value if it was truncated
+    after = np.where(next_index >= 0, values[np.maximum(next_index, 0)], 0.0)
+    return np.where((next_index < 0) & (done == TRUNCATED), values, after)
+
+
+def n_step_returns(rewards, values, next_index, done, gamma=0.99, n=5):
+    """
+    G[t] = r[t] + gamma r[t+1] + ... + gamma^(n-1) r[t+n-1] + gamma^n V[t+n]
+    along each seat's trajectory, cut short at its end (see _bootstrap).
+    """
+    rewards = np.asarray(rewards, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    bootstrap = _bootstrap(values, next_index, done)
+    returns = np.zeros(len(rewards))
+    index = np.arange(len(rewards))
+    alive = np.ones(len(rewards), dtype=np.bool_)
+    scale = 1.0
+    for k in range(n):
+        returns += np.where(alive, scale * rewards[index], 0.0)
+        following = next_index[index]
+        ended = alive & (following < 0)
+        returns += np.where(ended, scale * gamma * bootstrap[index], 0.0)
+        alive &= following >= 0
+        index = np.where(alive, following, index)
+        scale *= gamma
+    return returns + np.where(alive, scale * values[index], 0.0)
+
+
+def gae(rewards, values, next_index, done, gamma=0.99, lam=0.95):
+    """Generalized advantage estimates and their returns (advantage + value)
+    along each seat's trajectory."""
+    values = np.asarray(values, dtype=np.float64)
+    deltas = np.asarray(rewards, dtype=np.float64) + gamma * _bootstrap(values, next_index, done) - values
+    advantages = discounted_sum(deltas, next_index, gamma * lam)
+    return advantages, advantages + values
+
+
+def _slot_views(buf, dtypes, batch_size):
+    # column name → (batch_size,) + shape view into one shared-memory slot
+    views, offset = {}, 0
+    for name, (dtype, shape) in dtypes.items():
+        size = batch_size * dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+        views[name] = np.ndarray((batch_size,) + shape, dtype=dtype, buffer=buf, offset=offset)
+        offset += size
+    return views
+
+
+def _slot_size(dtypes, batch_size):
+    return sum(batch_size * dtype.itemsize * int(np.prod(shape, dtype=np.int64)) for dtype, shape in dtypes.values())
+
+
+def _loader_worker(path, names, slot_names, batch_size, tasks, done):
+    # Gather each requested batch straight from the memmaps into its
+    # shared-memory slot; only the row indices travel through the queues.
+    dataset = Dataset(path)
+    dtypes = {name: (dataset[name].dtype, dataset[name].shape[1:]) for name in names}
+    slots = [shared_memory.SharedMemory(name=slot_name) for slot_name in slot_names]
+    views = [_slot_views(slot.buf, dtypes, batch_size) for slot in slots]
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slot, indices = task
+            for name in names:
+                np.take(dataset[name], indices, axis=0, out=views[slot][name][:len(indices)])
+            done.put((seq, slot, len(indices)))
+    finally:
+        del views
+        for slot in slots:
+            slot.close()
+
+
+class DataLoader():
+    """
+    Shuffled batches of a Dataset, prefetched by worker processes.
+
+    Shuffling: each epoch visits the dataset in blocks of `block` contiguous
+    rows in random order, and rows are fully shuffled within each window of
+    `shuffle_buffer` rows, so reads stay local to a few MB of the files while
+    batches still mix many episodes. The plan is drawn from `seed` in the
+    main process, so the batch sequence does not depend on the workers.
+
+    With workers > 0 every batch is gathered by a worker directly into one
+    of `prefetch` shared-memory slots and yielded as views of that slot; the
+    views are only valid until the next batch is requested, so copy what
+    you keep. workers=0 gathers in-process into fresh arrays. A worker that
+    dies raises RuntimeError in the iterating process.
+    """
+
+    def __init__(self, path, batch_size=1024, columns=None, shuffle_buffer=1 << 16, block=4096,
+                 workers=2, prefetch=8, epochs=1, seed=None, drop_last=True):
+        self.path = path
+        self.dataset = Dataset(path)
+        self.names = list(columns) if columns is not None else list(self.dataset.columns)
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.block = block
+        self.workers = workers
+        self.prefetch = max(prefetch, workers)
+        self.epochs = epochs
+        self.drop_last = drop_last
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        batches = len(self.dataset) // self.batch_size if self.drop_last else -(-len(self.dataset) // self.batch_size)
+        return batches * self.epochs
+
+    def _order(self):
+        # one epoch's row order: random block order, shuffled within windows
+        n = len(self.dataset)
+        starts = self.rng.permutation(np.arange(0, n, self.block))
+        order = np.concatenate([np.arange(start, min(start + self.block, n)) for start in starts]) if n else np.arange(0)
+        for start in range(0, n, self.shuffle_buffer):
+            self.rng.shuffle(order[start:start + self.shuffle_buffer])
+        return order
+
+    def _plan(self):
+        for epoch in range(self.epochs):
+            order = self._order()
+            stop = len(order) - len(order) % self.batch_size if self.drop_last else len(order)
+            for start in range(0, stop, self.batch_size):
+                yield order[start:start + self.batch_size]
+
+    def __iter__(self):
+        if self.workers == 0:
+            for indices in self._plan():
+                yield {name: np.take(self.dataset[name], indices, axis=0) for name in self.names}
+            return
+        yield from self._iter_workers()
+
+    def _iter_workers(self):
+        dtypes = {name: (self.dataset[name].dtype, self.dataset[name].shape[1:]) for name in self.names}
+        size = max(_slot_size(dtypes, self.batch_size), 1)
+        slots = [shared_memory.SharedMemory(create=True, size=size) for _ in range(self.prefetch)]
+        views = [_slot_views(slot.buf, dtypes, self.batch_size) for slot in slots]
+        context = multiprocessing.get_context()
+        tasks, done = context.Queue(), context.Queue()
+        workers = [context.Process(target=_loader_worker, daemon=True,
+                                   args=(self.path, self.names, [slot.name for slot in slots], self.batch_size, tasks, done))
+                   for _ in range(self.workers)]
+        for worker in workers:
+            worker.start()
+
+        plan = self._plan()
+        free = list(range(self.prefetch))
+        ready = {}
+        sent = received = 0
+        try:
+            while True:
+                # keep every free slot busy
+                while free:
+                    indices = next(plan, None)
+                    if indices is None:
+                        break
+                    tasks.put((sent, free.pop(), indices))
+                    sent += 1
+                if received == sent:
+                    break
+                # batches come back in any order; yield them in plan order
+                while received not in ready:
+                    try:
+                        seq, slot, rows = done.get(timeout=1.0)
+                    except queue.Empty:
+                        # a worker that died (killed, out of memory, a bad
+                        # file) never answers; fail instead of waiting forever
+                        dead = [worker for worker in workers if not worker.is_alive()]
+                        if dead:
+                            raise RuntimeError(f"DataLoader worker exited with code {dead[0].exitcode}")
+                        continue
+                    ready[seq] = (slot, rows)
+                slot, rows = ready.pop(received)
+                yield {name: view[:rows] for name, view in views[slot].items()}
+                free.append(slot)
+                received += 1
+        finally:
+            for worker in workers:
+                tasks.put(None)
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+            del views
+            for slot in slots:
+                slot.unlink()
+                try:
+                    slot.close()
+                except BufferError:
+                    # the caller still holds the last batch; the mapping
+                    # goes away with it
+                    pass
@@ -1,26 +1,63 @@
-import random
+from array import array
+
+import numpy as np
+
 from cardsdb import ALL_CARDS
+from mappings import *
+from Zobrist import DISCARD_KEYS
+
+EMPTY_COUNTS = array("b", [0] * NUM_UNIQUE_CARDS)
 
 class Deck:
-    def __init__(self):
-        self.deck = ALL_CARDS
-        self.shuffle()
+    def __init__(self, rng=None, seats=None):
+        # Shuffles draw from this game's own np.random.Generator (the env's),
+        # never the global one, so games on different threads don't share
+        # RNG state.
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # the game's SeatArrays, told when the discard pile is reshuffled
+        # back in so its unseen-card counts stay right
+        self.seats = seats
+        self.deck = []
         self.discard_pile = []
+        # discard pile as counts by card id, and their Zobrist hash
+        self.discard_counts = array("b", EMPTY_COUNTS)
+        self.zobrist = 0
+        self.reset()
+
+    def reset(self):
+        # refill in place from the card template; ALL_CARDS itself is never
+        # shuffled or drawn from
+        self.deck[:] = ALL_CARDS
+        self.clearDiscard()
+        self.shuffle()
+
+    def clearDiscard(self):
+        self.discard_pile.clear()
+        self.discard_counts[:] = EMPTY_COUNTS
+        self.zobrist = 0
 
     def shuffle(self):
-        random.shuffle(self.deck)
+        self.rng.shuffle(self.deck)
     
     def draw(self):
         if len(self.deck) == 0 and len(self.discard_pile) > 0:
-            self.deck = self.discard_pile
-            self.discard_pile = []
+            if self.seats is not None:
+                self.seats.reshuffled(self.discard_counts)
+            self.deck, self.discard_pile = self.discard_pile, self.deck
+            self.clearDiscard()
             self.shuffle()
         elif len(self.deck) == 0 and len(self.discard_pile) == 0:
             # no more cards
             return
-        return self.deck.pop(0)
+        return self.deck.pop()
 
     def getCards(self, n):
+        deck = self.deck
+        if len(deck) >= n:
+            # the top n in draw() order, in one slice
+            cards = deck[:-n-1:-1]
+            del deck[-n:]
+            return cards
         cards = []
         for i in range(n):
             card = self.draw()
@@ -31,9 +68,12 @@ class Deck:
 
     def discardCard(self, card):
         self.discard_pile.append(card)
+        count = self.discard_counts[card.id]
+        self.zobrist ^= DISCARD_KEYS[card.id][count] ^ DISCARD_KEYS[card.id][count+1]
+        self.discard_counts[card.id] = count + 1
 
     def deckSize(self):
         return len(self.deck)
 
     def discardSize(self):
-        return len(self.discard_pile)
\ No newline at end of file
+        return len(self.discard_pile)
@@ -0,0 +1,86 @@
+import gymnasium as gym
+import numpy as np
+
+from Card import RentCard
+from cardsdb import CARDS_BY_ID
+from mappings import *
+
+# Per-seat features: one float32 row per seat in SeatArrays.features, kept
+# up to date by the Player mutators that change them (slotChanged,
+# updateCompleted, the bank and hand mutators)
+SEAT_FEATURES = {
+    "completed": NUM_UNIQUE_COLOURS,     # completed sets of each colour
+    "needed": NUM_UNIQUE_COLOURS,        # cards short of each colour's fullest set
+    "rent": NUM_UNIQUE_COLOURS,          # best rent each colour charges now
+    "sets_to_win": 1,                    # completed colours still missing
+    "bank": 1,                           # bank total in M
+    "hand_size": 1,
+}
+SEAT_OFFSETS = {}
+SEAT_SIZE = 0
+for name, size in SEAT_FEATURES.items():
+    SEAT_OFFSETS[name] = SEAT_SIZE
+    SEAT_SIZE += size
+FEATURE_COMPLETED = SEAT_OFFSETS["completed"]
+FEATURE_NEEDED = SEAT_OFFSETS["needed"]
+FEATURE_RENT = SEAT_OFFSETS["rent"]
+FEATURE_SETS_TO_WIN = SEAT_OFFSETS["sets_to_win"]
+FEATURE_BANK = SEAT_OFFSETS["bank"]
+FEATURE_HAND_SIZE = SEAT_OFFSETS["hand_size"]
+
+# a seat's row with an empty hand, bank and board
+EMPTY_SEAT_FEATURES = np.zeros(SEAT_SIZE, dtype=np.float32)
+EMPTY_SEAT_FEATURES[FEATURE_NEEDED:FEATURE_NEEDED+NUM_UNIQUE_COLOURS] = list(SET_LENGTH.values())
+EMPTY_SEAT_FEATURES[FEATURE_SETS_TO_WIN] = SETS_TO_WIN
+
+# Observer-only features after the seat rows, derived when written out
+OWN_FEATURES = {
+    "max_rent": 1,                       # best rent the observer's rent cards can charge
+    "unseen_threats": 4,                 # THREAT_IDS the observer has not seen
+}
+OWN_SIZE = sum(OWN_FEATURES.values())
+
+CARD_IDS = {card.name: card_id for card_id, card in CARDS_BY_ID.items()}
+# action cards that take from the board or bank
+THREAT_IDS = [CARD_IDS[name] for name in ("Deal Breaker", "Sly Deal", "Forced Deal", "Debt Collector")]
+
+# RENT_COVERAGE[card_id, cind]: rent card card_id charges for colour cind
+RENT_COVERAGE = {
+    card_id: np.array([card.isWild() or colour in card.colours for colour in SET_LENGTH])
+    for card_id, card in sorted(CARDS_BY_ID.items()) if isinstance(card, RentCard)
+}
+
+
+def feature_size(num_players=NUM_PLAYERS):
+    return num_players * SEAT_SIZE + OWN_SIZE
+
+
+def feature_space(num_players=NUM_PLAYERS):
+    return gym.spaces.Box(low=0, high=np.inf, shape=(feature_size(num_players),), dtype=np.float32)
+
+
+def write_features(out, seats, seat_order, hand, unseen):
+    """
+    Fill `out` (feature_size float32) with the strategic features of the
+    observer at seat_order[0], whose opponents still in play are
+    seat_order[1:]: one SEAT_FEATURES row per seat in that order (zeros for
+    seats no longer in play), then OWN_FEATURES. hand and unseen are the
+    observer's count vectors.
+
+    The seat rows are already up to date in SeatArrays.features, so this is
+    one gather plus a couple of lookups, not a walk over Player.sets.
+    """
+    live = len(seat_order)
+    rows = out[:seats.num_players * SEAT_SIZE].reshape(seats.num_players, SEAT_SIZE)
+    rows[:live] = seats.features[list(seat_order)]
+    rows[live:] = 0
+
+    tail = out[seats.num_players * SEAT_SIZE:]
+    rent_cards = [card_id for card_id in RENT_COVERAGE if hand[card_id]]
+    if rent_cards:
+        charged = np.logical_or.reduce([RENT_COVERAGE[card_id] for card_id in rent_cards])
+        tail[0] = rows[0, FEATURE_RENT:FEATURE_RENT+NUM_UNIQUE_COLOURS][charged].max()
+    else:
+        tail[0] = 0
+    tail[1:] = [unseen[card_id] for card_id in THREAT_IDS]
+    return out
@@ -0,0 +1,68 @@
+import gymnasium as gym
+import numpy as np
+
+
+class FlatLayout():
+    """
+    Lays out every leaf of a (nested) gym Dict space back to back in one
+    contiguous 1-D buffer.
+
+    views(buffer) returns a nested dict shaped like the space whose leaves are
+    numpy views into that buffer (Discrete leaves are 0-d views), so writing
+    an observation through the dict fills the flat buffer in place and the
+    buffer can be handed to torch.from_numpy / DLPack without a copy.
+    """
+
+    def __init__(self, space, dtype=np.int8):
+        self.dtype = dtype
+        self.fields = {}    # path tuple → (offset, shape)
+        self.size = self._build(space, (), 0)
+
+    def _build(self, space, path, offset):
+        if isinstance(space, gym.spaces.Dict):
+            for key, subspace in space.spaces.items():
+                offset = self._build(subspace, path + (key,), offset)
+            return offset
+
+        if isinstance(space, gym.spaces.Discrete):
+            shape = ()
+        elif isinstance(space, (gym.spaces.Box, gym.spaces.MultiBinary)):
+            shape = tuple(space.shape)
+        else:
+            raise TypeError(f"Cannot flatten space {space}")
+
+        self.fields[path] = (offset, shape)
+        return offset + int(np.prod(shape, dtype=np.int64))
+
+    def empty(self):
+        return np.zeros(self.size, dtype=self.dtype)
+
+    def views(self, buffer):
+        root = {}
+        for path, (offset, shape) in self.fields.items():
+            node = root
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            size = int(np.prod(shape, dtype=np.int64))
+            node[path[-1]] = buffer[offset:offset+size].reshape(shape)
+        return root
+
+    def pack(self, tree, out=None):
+        # Inverse of views(): copy a nested dict shaped like the space (e.g.
+        # an observe() dict) into a flat buffer, `out` or a new one.
+        if out is None:
+            out = self.empty()
+        for path, (offset, shape) in self.fields.items():
+            node = tree
+            for key in path:
+                node = node[key]
+            size = int(np.prod(shape, dtype=np.int64))
+            out[offset:offset+size] = np.ravel(node)
+        return out
+
+    def slice(self, *path):
+        # Slice of the flat buffer holding the field at `path`, e.g.
+        # layout.slice("property", "Blue", "cards").
+        offset, shape = self.fields[path]
+        return slice(offset, offset + int(np.prod(shape, dtype=np.int64)))
+
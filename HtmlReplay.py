@@ -0,0 +1,142 @@
+import html
+import io
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+from Dataset import Dataset
+from InferenceServer import unflatten_action
+from MonopolyDeal import MonopolyDeal
+from mappings import *
+
+# One page per game: the frames as JSON plus a few lines of script to step
+# through them, so a replay is a single file with no external assets.
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: monospace; margin: 1em; }}
+pre {{ background: #f4f4f4; padding: 0.5em; }}
+#log {{ color: #a03000; }}
+</style></head>
+<body>
+<h3>{title}</h3>
+<div>
+<button onclick="show(0)">&lt;&lt;</button>
+<button onclick="show(frame - 1)">&lt;</button>
+<input id="slider" type="range" min="0" max="{last}" value="0" oninput="show(+this.value)" style="width: 40em">
+<button onclick="show(frame + 1)">&gt;</button>
+<button onclick="show({last})">&gt;&gt;</button>
+<span id="title"></span>
+</div>
+<pre id="log"></pre>
+<pre id="table"></pre>
+<script>
+const frames = {frames};
+let frame = 0;
+function show(i) {{
+  frame = Math.max(0, Math.min(frames.length - 1, i));
+  document.getElementById("slider").value = frame;
+  document.getElementById("title").textContent = frames[frame][0];
+  document.getElementById("log").textContent = frames[frame][1];
+  document.getElementById("table").textContent = frames[frame][2];
+}}
+document.addEventListener("keydown", e => {{
+  if (e.key === "ArrowLeft") show(frame - 1);
+  if (e.key === "ArrowRight") show(frame + 1);
+}});
+show(0);
+</script>
+</body></html>
+"""
+
+
+def replay_frames(seed, actions, options=None, **env_kwargs):
+    """
+    Replay one recorded game (its reset seed and options, and the flat
+    ACTION_FIELDS rows Dataset.record_episode logged) and return its frames:
+    (title, log, table) per step, where log is the plain TextRender output
+    of that step and table every player's hand, money and properties after
+    it. env_kwargs must match the env that recorded the game.
+    """
+    env = MonopolyDeal(render_mode="text", **env_kwargs)
+    stream = env.renderer.stream = io.StringIO()
+    env.reset(seed=seed, options=options)
+    frames = [("start", "", env.renderer.format_table(env._get_internal_state()))]
+    row = 0
+    for agent in env.agent_iter():
+        _, _, termination, truncation, _ = env.last()
+        if termination or truncation:
+            env.step(None)
+            continue
+        if row == len(actions):
+            break
+        decision = env.action_context[CTX_DECISION]
+        env.step(unflatten_action(actions[row]))
+        row += 1
+        frames.append((f"{row}: {agent}, decision {decision}", stream.getvalue(),
+                       env.renderer.format_table(env._get_internal_state())))
+        stream.seek(0)
+        stream.truncate()
+    return frames
+
+
+def write_html(path, frames, title="MonopolyDeal replay"):
+    # "</" is escaped so no frame text can close the <script> block
+    data = json.dumps(frames).replace("</", "<\\/")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(PAGE.format(title=html.escape(title), last=len(frames) - 1, frames=data))
+    return path
+
+
+def export_game(path, seed, actions, options=None, title=None, **env_kwargs):
+    """Replay one game and write it to `path` as a static HTML page."""
+    frames = replay_frames(seed, actions, options, **env_kwargs)
+    return write_html(path, frames, title if title is not None else f"MonopolyDeal replay, seed {seed}")
+
+
+def _export_task(task):
+    path, seed, actions, options, env_kwargs = task
+    return export_game(path, seed, actions, options, **env_kwargs)
+
+
+def export_games(out_dir, games, names=None, workers=None, chunksize=4, **env_kwargs):
+    """
+    Export many games to out_dir/<name>.html, one per (seed, actions) or
+    (seed, actions, options) in `games`; names default to game_0, game_1,
+    ... Games are replayed on a pool of `workers` processes (os.cpu_count()
+    if None; 0 exports in-process). Returns the written paths in game order.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = []
+    for i, game in enumerate(games):
+        name = names[i] if names is not None else f"game_{i}"
+        seed, actions = game[0], np.asarray(game[1], dtype=np.int16)
+        options = game[2] if len(game) > 2 else None
+        tasks.append((os.path.join(out_dir, name + ".html"), seed, actions, options, env_kwargs))
+    if workers == 0:
+        return [_export_task(task) for task in tasks]
+    with multiprocessing.get_context().Pool(workers) as pool:
+        return pool.map(_export_task, tasks, chunksize=chunksize)
+
+
+def export_dataset(path, out_dir, episodes=None, workers=None, **env_kwargs):
+    """
+    Export episodes of a Dataset directory (all by default) to
+    out_dir/episode_<i>.html. Only episodes written with their reset seed
+    (DatasetWriter.add_episode(..., seed=...), as record_games does) can be
+    replayed; the others are skipped. env_kwargs must match the recording
+    env. Returns the written paths.
+    """
+    dataset = Dataset(path)
+    seeds = dataset.meta.get("seeds", [None] * dataset.meta["episodes"])
+    episode, actions = np.asarray(dataset["episode"]), dataset["action"]
+    # rows are appended a whole episode at a time, so each is one run
+    starts = np.searchsorted(episode, np.arange(len(seeds) + 1))
+    if episodes is None:
+        episodes = range(len(seeds))
+    episodes = [i for i in episodes if seeds[i] is not None]
+    games = [(seeds[i], np.array(actions[starts[i]:starts[i + 1]])) for i in episodes]
+    return export_games(out_dir, games, names=[f"episode_{i}" for i in episodes], workers=workers,
+                        num_players=dataset.meta["num_players"], **env_kwargs)
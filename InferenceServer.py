@@ -0,0 +1,354 @@
+import asyncio
+import json
+import struct
+import time
+
+import numpy as np
+
+from ActionMask import ACTION_MASK_LAYOUTS
+from MonopolyDeal import OBSERVATION_LAYOUTS
+from mappings import *
+
+# Wire format (all little-endian). A request is a header
+#   kind (u8), num_players (u8), rows (u32)
+# followed, for INFER, by `rows` flat observations then `rows` flat action
+# masks (int8, OBSERVATION_LAYOUTS[num_players] /
+# ACTION_MASK_LAYOUTS[num_players]). The reply to INFER is
+# rows x len(ACTION_FIELDS) int16 actions; the reply to STATS is a u32 length
+# and that many bytes of JSON. Replies on a connection come back in request
+# order, so a client may pipeline requests.
+HEADER = struct.Struct("<BBI")
+LENGTH = struct.Struct("<I")
+INFER = 0
+STATS = 1
+
+# Action components in the order they are returned, with their mask slices
+# per player count. The action mask space mirrors the action space, so its
+# fields are exactly the action components; only opponent_ID's width (and so
+# the offsets after it) depends on the player count.
+ACTION_FIELDS = list(ACTION_MASK_LAYOUTS[NUM_PLAYERS].fields)
+ACTION_SLICES = {n: [layout.slice(*path) for path in ACTION_FIELDS] for n, layout in ACTION_MASK_LAYOUTS.items()}
+
+
+def unflatten_action(row):
+    """One row of a reply → the nested action dict MonopolyDeal.step() takes."""
+    action = {}
+    for path, value in zip(ACTION_FIELDS, row):
+        node = action
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = int(value)
+    return action
+
+
+def sample_masked_batch(logits, masks, rng, num_players=NUM_PLAYERS):
+    """
+    Sample every action component for a batch: Gumbel-max over `logits`
+    (list of (batch, n) arrays, one per ACTION_FIELDS entry) restricted to the
+    unmasked entries of the flat `masks` (ACTION_MASK_LAYOUTS[num_players]).
+    A component with nothing unmasked gets 0, as in Policy.sample_masked.
+    """
+    actions = np.zeros((len(masks), len(ACTION_FIELDS)), dtype=np.int16)
+    for index, (field_logits, field_slice) in enumerate(zip(logits, ACTION_SLICES[num_players])):
+        legal = masks[:, field_slice] > 0
+        scores = field_logits + rng.gumbel(size=legal.shape)
+        scores[~legal] = -np.inf
+        actions[:, index] = scores.argmax(axis=1)
+    return actions
+
+
+class UniformPolicy():
+    """
+    CPU policy interface: called with a (batch, OBSERVATION_LAYOUTS[num_players].size)
+    int8 array and the player count, returns one (batch, n) logits array per
+    ACTION_FIELDS entry. This one is uniform over the legal actions.
+    """
+
+    def __call__(self, observations, num_players=NUM_PLAYERS):
+        return [np.zeros((len(observations), field_slice.stop - field_slice.start))
+                for field_slice in ACTION_SLICES[num_players]]
+
+
+class LinearPolicy():
+    """A random linear policy, standing in for a small network's CPU cost.
+    One weight matrix per player count, drawn on first use from (seed,
+    num_players)."""
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.weights = {}
+
+    def __call__(self, observations, num_players=NUM_PLAYERS):
+        if num_players not in self.weights:
+            rng = np.random.default_rng(None if self.seed is None else [self.seed, num_players])
+            shape = (OBSERVATION_LAYOUTS[num_players].size, ACTION_MASK_LAYOUTS[num_players].size)
+            self.weights[num_players] = rng.normal(scale=0.01, size=shape).astype(np.float32)
+        logits = observations.astype(np.float32) @ self.weights[num_players]
+        return [logits[:, field_slice] for field_slice in ACTION_SLICES[num_players]]
+
+
+class InferenceServer():
+    """
+    Serves masked action samples over a Unix socket with dynamic batching.
+
+    Requests from every connection go into one queue. A batch is closed once
+    it holds max_batch rows or max_wait seconds after its first request
+    arrived, run through `policy` in one call, and the replies are sent back.
+    Latency (request received → reply written) and batch fill are recorded
+    for stats().
+
+    If the policy raises, the requests of that batch fail and the server
+    keeps batching. The wire format has no error reply, so each connection
+    with a failed request is closed, and the client fails its outstanding
+    requests with ConnectionError. A request with an unknown kind or a
+    player count outside MIN_PLAYERS..MAX_PLAYERS closes its connection
+    the same way.
+    """
+
+    def __init__(self, path, policy=None, max_batch=256, max_wait=0.002, seed=None, history=100000):
+        self.path = path
+        self.policy = policy if policy is not None else UniformPolicy()
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.rng = np.random.default_rng(seed)
+
+        self._queue = asyncio.Queue()
+        self._latencies = np.zeros(history)
+        self._num_requests = 0
+        self._num_rows = 0
+        self._num_batches = 0
+        self._num_full = 0
+
+    async def serve_forever(self):
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        async with server:
+            batching = asyncio.ensure_future(self._batch_loop())
+            try:
+                await server.serve_forever()
+            finally:
+                batching.cancel()
+
+    async def _handle(self, reader, writer):
+        # Requests are answered strictly in order, so the replies are awaited
+        # in a separate task while further requests keep being read.
+        replies = asyncio.Queue()
+        sending = asyncio.ensure_future(self._send_replies(replies, writer))
+        try:
+            while True:
+                kind, num_players, rows = HEADER.unpack(await reader.readexactly(HEADER.size))
+                if kind == STATS:
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_result(json.dumps(self.stats()).encode())
+                    await replies.put((kind, future, None))
+                    continue
+                if kind != INFER or num_players not in OBSERVATION_LAYOUTS:
+                    # malformed header: the payload size is unknown, so the
+                    # connection cannot be resynchronized; drop it
+                    break
+                observation_size = OBSERVATION_LAYOUTS[num_players].size
+                mask_size = ACTION_MASK_LAYOUTS[num_players].size
+                payload = await reader.readexactly(rows * (observation_size + mask_size))
+                received = time.perf_counter()
+                data = np.frombuffer(payload, dtype=np.int8)
+                observations = data[:rows * observation_size].reshape(rows, observation_size)
+                masks = data[rows * observation_size:].reshape(rows, mask_size)
+                future = asyncio.get_running_loop().create_future()
+                await self._queue.put((num_players, observations, masks, future))
+                await replies.put((kind, future, received))
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            await replies.put(None)
+            await sending
+
+    async def _send_replies(self, replies, writer):
+        failed = False
+        while True:
+            reply = await replies.get()
+            if reply is None:
+                break
+            kind, future, received = reply
+            try:
+                result = await future
+            except Exception:
+                # no error reply on the wire: drop the connection, and keep
+                # draining so every queued request's outcome is collected
+                failed = True
+                writer.close()
+            if failed:
+                continue
+            if kind == STATS:
+                writer.write(LENGTH.pack(len(result)) + result)
+            else:
+                writer.write(result.tobytes())
+            await writer.drain()
+            if received is not None:
+                self._latencies[self._num_requests % len(self._latencies)] = time.perf_counter() - received
+                self._num_requests += 1
+        writer.close()
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            rows = len(batch[0][1])
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(request)
+                rows += len(request[1])
+
+            # one policy call per player count in the batch
+            for num_players in sorted({request[0] for request in batch}):
+                group = [request for request in batch if request[0] == num_players]
+                observations = np.concatenate([request[1] for request in group])
+                masks = np.concatenate([request[2] for request in group])
+                try:
+                    actions = sample_masked_batch(self.policy(observations, num_players), masks, self.rng, num_players)
+                except Exception as error:
+                    for *_, future in group:
+                        future.set_exception(error)
+                    continue
+
+                start = 0
+                for _, request_observations, request_masks, future in group:
+                    future.set_result(actions[start:start+len(request_observations)])
+                    start += len(request_observations)
+
+            self._num_batches += 1
+            self._num_rows += rows
+            self._num_full += rows >= self.max_batch
+
+    def stats(self):
+        latencies = self._latencies[:min(self._num_requests, len(self._latencies))]
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+        return {
+            "requests": self._num_requests,
+            "batches": self._num_batches,
+            "rows": self._num_rows,
+            "latency_p50_ms": float(p50) * 1e3,
+            "latency_p99_ms": float(p99) * 1e3,
+            "mean_batch_rows": self._num_rows / self._num_batches if self._num_batches else 0.0,
+            "mean_batch_fill": self._num_rows / (self._num_batches * self.max_batch) if self._num_batches else 0.0,
+            "full_batches": self._num_full,
+        }
+
+
+class InferenceClient():
+    """
+    asyncio client for InferenceServer. infer(observations) takes a list of
+    MonopolyDeal.observe() dicts of num_players-player games and returns one
+    action dict each, so it can serve as the `server` of AsyncActors.Batcher;
+    infer_flat() takes and returns the flat arrays directly.
+    """
+
+    def __init__(self, path, num_players=NUM_PLAYERS):
+        self.path = path
+        self.num_players = num_players
+        self._reader = self._writer = None
+        self._waiting = asyncio.Queue()
+        self._receiving = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        self._receiving = asyncio.ensure_future(self._receive())
+        return self
+
+    async def close(self):
+        self._receiving.cancel()
+        self._writer.close()
+        await self._writer.wait_closed()
+
+    async def _receive(self):
+        while True:
+            kind, rows, future = await self._waiting.get()
+            try:
+                if kind == STATS:
+                    length, = LENGTH.unpack(await self._reader.readexactly(LENGTH.size))
+                    result = json.loads(await self._reader.readexactly(length))
+                else:
+                    data = await self._reader.readexactly(rows * len(ACTION_FIELDS) * 2)
+                    result = np.frombuffer(data, dtype=np.int16).reshape(rows, len(ACTION_FIELDS))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                # the server dropped the connection (e.g. its policy failed):
+                # fail this request and every one still waiting
+                error = ConnectionError("inference server closed the connection")
+                futures = [future] + [self._waiting.get_nowait()[2] for _ in range(self._waiting.qsize())]
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+            # the reply of a cancelled request is still read off the socket,
+            # so the next one stays in step
+            if not future.done():
+                future.set_result(result)
+
+    async def _request(self, kind, rows, payload=b""):
+        if self._receiving.done():
+            raise ConnectionError("inference server closed the connection")
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.put_nowait((kind, rows, future))
+        self._writer.write(HEADER.pack(kind, self.num_players, rows) + payload)
+        await self._writer.drain()
+        return await future
+
+    async def infer_flat(self, observations, masks):
+        return await self._request(INFER, len(observations), observations.tobytes() + masks.tobytes())
+
+    async def infer(self, observations):
+        observation_layout = OBSERVATION_LAYOUTS[self.num_players]
+        action_mask_layout = ACTION_MASK_LAYOUTS[self.num_players]
+        flat_observations = np.empty((len(observations), observation_layout.size), dtype=np.int8)
+        flat_masks = np.empty((len(observations), action_mask_layout.size), dtype=np.int8)
+        for row, observation in enumerate(observations):
+            observation_layout.pack(observation["observation"], flat_observations[row])
+            action_mask_layout.pack(observation["action_mask"], flat_masks[row])
+        actions = await self.infer_flat(flat_observations, flat_masks)
+        return [unflatten_action(row) for row in actions]
+
+    async def stats(self):
+        return await self._request(STATS, 0)
+
+
+def run_server(path, **kwargs):
+    asyncio.run(InferenceServer(path, **kwargs).serve_forever())
+
+
+if __name__ == "__main__":
+    # End to end: a server process on a temporary socket, actor games from
+    # AsyncActors in this process, then the server's latency / fill stats.
+    import multiprocessing, os, tempfile
+    from AsyncActors import Batcher, run_games
+
+    num_games = int(os.environ.get("ACTOR_GAMES", "200"))
+    num_players = int(os.environ.get("ACTOR_PLAYERS", str(NUM_PLAYERS)))
+    path = os.path.join(tempfile.mkdtemp(), "inference.sock")
+    server = multiprocessing.Process(target=run_server, args=(path,), kwargs={"policy": LinearPolicy(seed=0), "seed": 0}, daemon=True)
+    server.start()
+
+    async def main():
+        while not os.path.exists(path):
+            await asyncio.sleep(0.01)
+        client = await InferenceClient(path, num_players).connect()
+        batcher = Batcher(client, max_batch=64)
+        start = time.perf_counter()
+        results = await run_games(num_games, batcher, max_steps=500, num_players=num_players)
+        elapsed = time.perf_counter() - start
+        stats = await client.stats()
+        await client.close()
+        return results, elapsed, stats
+
+    results, elapsed, stats = asyncio.run(main())
+    server.terminate()
+
+    steps = sum(steps for winner, steps in results)
+    print(f"{num_games} games in {elapsed:.2f}s, {steps / elapsed:.0f} steps/s")
+    print(f"latency p50 {stats['latency_p50_ms']:.2f} ms  p99 {stats['latency_p99_ms']:.2f} ms")
+    print(f"{stats['batches']} batches, {stats['mean_batch_rows']:.1f} rows each, "
+          f"fill {stats['mean_batch_fill']:.0%}, {stats['full_batches']} full")
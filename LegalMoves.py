@@ -0,0 +1,64 @@
+import numpy as np
+
+from cardsdb import CARDS_BY_ID
+from mappings import *
+
+WILD_ID = 17
+
+# PLACEMENT[card_id, colour]: the property card may sit in a set of that
+# colour (colour order as SET_LENGTH / COLOUR_MAPPING ids).
+PLACEMENT = np.zeros((NUM_UNIQUE_PROPERTY_CARDS, NUM_UNIQUE_COLOURS), dtype=np.bool_)
+for _card_id in range(NUM_UNIQUE_PROPERTY_CARDS):
+    _colours = CARDS_BY_ID[_card_id].colours
+    PLACEMENT[_card_id] = [colour in _colours or "Wild" in _colours for colour in SET_LENGTH]
+
+
+class BoardTree():
+    """
+    One player's board as arrays: the colour → set_index → card levels of the
+    legal-move tree for every decision that picks a property or a set.
+
+    Player.boardTree() builds it once per board state and hands out the
+    cached copy until a board mutator bumps Player.board_version, so the
+    sub-decision masks in ActionMask are slices of these arrays instead of
+    rescans of the 90 PropertySets.
+    """
+
+    def __init__(self, player):
+        self.version = player.board_version
+
+        # cards[colour, set_index, card_id] = copies of that property card
+        self.cards = np.zeros((NUM_UNIQUE_COLOURS, MAX_SETS_PER_PROPERTY, NUM_UNIQUE_PROPERTY_CARDS), dtype=np.int8)
+        self.completed = np.zeros((NUM_UNIQUE_COLOURS, MAX_SETS_PER_PROPERTY), dtype=np.bool_)
+        for cind, pSets in enumerate(player.sets.values()):
+            for pind, pSet in enumerate(pSets):
+                if pSet.properties:
+                    for card in pSet.properties:
+                        self.cards[cind, pind, card.id] += 1
+                    self.completed[cind, pind] = pSet.isCompleted()
+
+        self.nonempty = self.cards.any(axis=2)
+        # slot holds something other than pure wilds (rent-earning colours)
+        self.has_non_wild = self.cards[:, :, :WILD_ID].any(axis=2)
+
+        # slots a card may be added to. With canonical slots the empty ones
+        # of a colour are interchangeable, so only the first is offered.
+        self.open = ~self.completed
+        if player.canonical:
+            spare = self.nonempty.copy()
+            has_empty = ~self.nonempty.all(axis=1)
+            spare[has_empty, (~self.nonempty[has_empty]).argmax(axis=1)] = True
+            self.open &= spare
+
+        self._placements = {}
+
+    def placement(self, card):
+        """
+        placement[colour, set_index]: True where PropertySet.canAddProperty
+        would accept `card`. Cached per card id for the life of the tree.
+        """
+        placement = self._placements.get(card.id)
+        if placement is None:
+            placement = PLACEMENT[card.id][:, None] & self.open
+            self._placements[card.id] = placement
+        return placement
@@ -0,0 +1,68 @@
+import gc
+import sys
+import types
+
+import cardsdb
+
+
+def shared_objects():
+    """
+    Objects every game references but none owns (the card objects in
+    cardsdb). Excluded from per-game sizes.
+    """
+    return {id(card) for card in cardsdb.ALL_CARDS}
+
+
+def game_nbytes(env, exclude=None):
+    """
+    Bytes reachable from `env` (a MonopolyDeal or anything else), following
+    gc referents and summing sys.getsizeof. Classes, modules, functions and
+    the objects in `exclude` (default: shared_objects()) are not counted or
+    traversed, so the result is what one more live game costs.
+    """
+    skip = shared_objects() if exclude is None else set(exclude)
+    seen = set()
+    total = 0
+    stack = [env]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or id(obj) in skip:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)):
+            continue
+        total += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+def report(envs):
+    """Per-game byte counts for a list of envs: (min, mean, max)."""
+    sizes = [game_nbytes(env) for env in envs]
+    return min(sizes), sum(sizes) / len(sizes), max(sizes)
+
+
+if __name__ == "__main__":
+    # Per-game bytes for a few mid-game envs, live and suspended. Expect
+    # ~75 KB live and ~3.4 KB suspended for 2 players: only suspended games
+    # fit a budget under 20 KB per game.
+    import numpy as np
+    from MonopolyDeal import MonopolyDeal
+    from Policy import RandomPolicy
+
+    policy = RandomPolicy(seed=0)
+    envs = []
+    for seed in range(8):
+        env = MonopolyDeal(max_steps=300)
+        env.reset(seed=seed)
+        for agent in env.agent_iter():
+            observation, reward, termination, truncation, info = env.last()
+            if termination or truncation or env.num_steps >= 200:
+                break
+            env.step(policy([observation])[0])
+        envs.append(env)
+
+    print("live bytes/game      min %d  mean %d  max %d" % report(envs))
+    for env in envs:
+        env.suspend()
+    print("suspended bytes/game min %d  mean %d  max %d" % report(envs))
@@ -1,4 +1,9 @@
-import functools
+import copy
+import pickle
+import zlib
+from array import array
+from collections import namedtuple
+from functools import lru_cache
 
 import gymnasium as gym
 import numpy as np
@@ -12,8 +17,15 @@ from pettingzoo.utils import agent_selector, wrappers
 from Deck import *
 from Player import *
 from Card import *
+from cardsdb import CARDS_BY_ID
 from Render import *
 from ActionMask import *
+from Reward import *
+from Features import feature_size, feature_space, write_features
+from Flatten import FlatLayout
+from Payment import MAX_CARD_VALUE, bundle_card_ids, payment_bundles, plan_payment
+from Scenario import ScenarioBatch
+from Zobrist import CONTEXT_KEYS, pending_key
 from mappings import *
 
 def env(render_mode=None):
@@ -34,6 +46,216 @@ def env(render_mode=None):
     env = wrappers.OrderEnforcingWrapper(env)
     return env
 
+# Optional observation fields, switched on per env with
+# MonopolyDeal(observation_extras=(...)). They are appended after the
+# standard fields in this order, so the standard fields keep their flat
+# offsets whatever is enabled.
+OBSERVATION_EXTRAS = {
+    # cards the observer has not seen: still in the deck or in an opponent's hand
+    "unseen_cards": lambda num_players: gym.spaces.Box(low=0, high=MAX_ANY_CARD, shape=(NUM_UNIQUE_CARDS,), dtype=np.int8),
+    # the last HISTORY_LENGTH resolved actions (HIST_* offsets in mappings)
+    "action_history": lambda num_players: gym.spaces.Box(low=-1, high=np.tile(history_high(num_players), (HISTORY_LENGTH, 1)), shape=(HISTORY_LENGTH, HIST_SIZE), dtype=np.int8),
+}
+
+def build_observation_space(num_players=NUM_PLAYERS, extras=()):
+    """
+    Define observation space
+    """
+    num_opponents = num_players - 1
+
+    spaces = {
+        "hand": gym.spaces.Box(low=0, high=MAX_ANY_CARD, shape=(NUM_UNIQUE_CARDS,), dtype=np.int8),
+        "property": gym.spaces.Dict({
+            colour: gym.spaces.Dict({
+                "cards": gym.spaces.Box(low=-1, high=NUM_UNIQUE_PROPERTY_CARDS, shape=(MAX_SETS_PER_PROPERTY,max_cards), dtype=np.int8),
+                "full_set": gym.spaces.MultiBinary(MAX_SETS_PER_PROPERTY)
+            }) for colour,max_cards in SET_LENGTH.items()
+        }),
+        "money": gym.spaces.Box(low=0, high=MAX_ANY_CARD, shape=(NUM_UNIQUE_CARDS,), dtype=np.int8),
+        "opponent_property": gym.spaces.Dict({
+            colour: gym.spaces.Dict({
+                "cards": gym.spaces.Box(low=-1, high=NUM_UNIQUE_PROPERTY_CARDS, shape=(num_opponents,MAX_SETS_PER_PROPERTY,max_cards), dtype=np.int8),
+                "full_set": gym.spaces.MultiBinary([num_opponents,MAX_SETS_PER_PROPERTY])
+            }) for colour,max_cards in SET_LENGTH.items()
+        }),
+        "opponent_money": gym.spaces.Box(low=0, high=MAX_ANY_CARD, shape=(num_opponents,NUM_UNIQUE_CARDS), dtype=np.int8),
+        "actions_left": gym.spaces.Discrete(4),
+        "discard_pile": gym.spaces.Box(low=0, high=MAX_ANY_CARD, shape=(NUM_UNIQUE_CARDS,), dtype=np.int8),
+        "action_context": gym.spaces.Box(low=-1, high=np.array(ctx_high(num_players)), shape=(CTX_SIZE,), dtype=np.int8),
+        # per-value card counts of each offered bundle at DECISION_DEFENDER_PAY_BUNDLE
+        "payment_bundles": gym.spaces.Box(low=0, high=np.iinfo(np.int8).max, shape=(MAX_PAYMENT_BUNDLES,MAX_CARD_VALUE+1), dtype=np.int8)
+    }
+    for name in extras:
+        spaces[name] = OBSERVATION_EXTRAS[name](num_players)
+    return gym.spaces.Dict(spaces)
+
+def build_action_space(num_players=NUM_PLAYERS):
+    """
+    Define action space
+    0: Skip
+    1: Move property
+    2: Play money
+    3: Play property
+    4: Play wild property
+    5: Sly Deal
+    6: Forced Deal
+    7: Debt Collector
+    8: It's My Birthday
+    9: Deal Breaker
+    10: Rent, Red/Yellow
+    11: Rent, Green/Dark Blue
+    12: Rent, Pink/Orange
+    13: Rent, Black/Light Green
+    14: Rent, Brown/Light Blue
+    15: Rent, Wild
+    16: Counter (JSN)
+    """
+
+    return gym.spaces.Dict(
+        {   
+            "action_ID": gym.spaces.Discrete(NUM_ACTIONS),                         # Choose an action
+            "hand_card": gym.spaces.Discrete(NUM_UNIQUE_CARDS),                    # Choose a card from hand
+            "opponent_ID": gym.spaces.Discrete(num_players),                          # Choose an opponent
+            "property_card": gym.spaces.Dict({                                          # Choose a card
+                "colour": gym.spaces.Discrete(NUM_UNIQUE_COLOURS),
+                "set_index": gym.spaces.Discrete(MAX_SETS_PER_PROPERTY),
+                "card": gym.spaces.Discrete(NUM_UNIQUE_PROPERTY_CARDS)
+            }),
+            "set": gym.spaces.Dict({                                              # Choose a set
+                "colour": gym.spaces.Discrete(NUM_UNIQUE_COLOURS),
+                "set_index": gym.spaces.Discrete(MAX_SETS_PER_PROPERTY)
+            }),
+            "payment_bundle": gym.spaces.Discrete(MAX_PAYMENT_BUNDLES)            # Choose a payment bundle
+        }
+    )
+
+# Spaces depend only on the player count, so they are built once here for
+# every supported count; the layouts derived from them are shared by every
+# env. The spaces themselves are templates: a gymnasium space carries its
+# own sampling RNG, so envs hand out their own instances (see
+# MonopolyDeal.action_space()). The unsuffixed names are the default
+# NUM_PLAYERS ones.
+PLAYER_COUNTS = range(MIN_PLAYERS, MAX_PLAYERS+1)
+OBSERVATION_SPACES = {n: build_observation_space(n) for n in PLAYER_COUNTS}
+ACTION_SPACES = {n: build_action_space(n) for n in PLAYER_COUNTS}
+OBSERVATION_LAYOUTS = {n: FlatLayout(OBSERVATION_SPACES[n]) for n in PLAYER_COUNTS}
+OBSERVATION_SPACE = OBSERVATION_SPACES[NUM_PLAYERS]
+ACTION_SPACE = ACTION_SPACES[NUM_PLAYERS]
+OBSERVATION_LAYOUT = OBSERVATION_LAYOUTS[NUM_PLAYERS]
+ACTION_CONTEXT_RESET = array("b", [-1] * CTX_SIZE)
+# rows of the action_history ring, newest first, for each write position
+HISTORY_ORDER = (np.arange(HISTORY_LENGTH)[:, None] - 1 - np.arange(HISTORY_LENGTH)) % HISTORY_LENGTH
+
+# reset(seed=...) state for the game's PCG64: splitmix64 of the seed for the
+# 128-bit state, one fixed odd increment. np.random.PCG64(seed) runs a
+# SeedSequence first and costs ~15 us; this costs ~4 us. Seeds outside
+# 0..2**64-1 (or not ints) still go through PCG64(seed).
+MASK64 = (1 << 64) - 1
+GOLDEN64 = 0x9E3779B97F4A7C15
+PCG64_INCREMENT = 0xDA3E39CB94B95BDB4F1BBCDCBFA53E0B | 1
+
+def splitmix64(x):
+    x = (x + GOLDEN64) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+def pcg64_state(seed):
+    if not isinstance(seed, (int, np.integer)) or not 0 <= seed <= MASK64:
+        return np.random.PCG64(seed).state
+    seed = int(seed)
+    return {
+        "bit_generator": "PCG64",
+        "state": {"state": splitmix64(seed) << 64 | splitmix64(seed ^ MASK64), "inc": PCG64_INCREMENT},
+        "has_uint32": 0,
+        "uinteger": 0,
+    }
+
+@lru_cache(maxsize=None)
+def extended_observation_space(num_players, extras):
+    """Observation space with the optional fields `extras` (a tuple in
+    OBSERVATION_EXTRAS order), a shared template like OBSERVATION_SPACES."""
+    if not extras:
+        return OBSERVATION_SPACES[num_players]
+    return build_observation_space(num_players, extras)
+
+def fresh_space(template):
+    """
+    A copy of a template space with its own, not yet seeded, sampling RNG.
+    Shallow: bounds arrays are shared with the template, and only the Dict
+    nodes and the RNGs are new, so it costs a fraction of building or
+    deep-copying the space.
+    """
+    space = copy.copy(template)
+    space._np_random = None
+    if isinstance(space, gym.spaces.Dict):
+        space.spaces = {key: fresh_space(subspace) for key, subspace in template.spaces.items()}
+    return space
+
+@lru_cache(maxsize=None)
+def extended_observation_layout(num_players, extras):
+    if not extras:
+        return OBSERVATION_LAYOUTS[num_players]
+    return FlatLayout(extended_observation_space(num_players, extras))
+
+# Flat observation offsets (dst) of every board / completed / bank entry
+# observe() copies out of SeatArrays, and where each comes from (src, flat
+# indices into SeatArrays.boards / .completed / .money). blank_cards and
+# blank_zero are the opponent rows with no live opponent behind them.
+# relative_seat maps a seat to the observer's numbering (0 = observer, i =
+# i-th opponent), -1 for seats not in play and for index -1 itself.
+SeatGather = namedtuple("SeatGather", "board_dst board_src completed_dst completed_src money_dst money_src blank_cards blank_zero relative_seat")
+
+@lru_cache(maxsize=None)
+def seat_gather(num_players, seat_order, extras=()):
+    """
+    SeatGather for an observer at seat_order[0] whose opponents are
+    seat_order[1:], in turn order, into the layout with optional fields
+    `extras` (which can shift every other field's offset). Cached per
+    (count, order, extras), so observe() is three fancy-indexed copies
+    whatever the number of players.
+    """
+    layout = extended_observation_layout(num_players, extras)
+    boards = np.arange(num_players * NUM_UNIQUE_COLOURS * MAX_SETS_PER_PROPERTY * MAX_SET_SIZE).reshape(num_players, NUM_UNIQUE_COLOURS, MAX_SETS_PER_PROPERTY, MAX_SET_SIZE)
+    completed = np.arange(num_players * NUM_UNIQUE_COLOURS * MAX_SETS_PER_PROPERTY).reshape(num_players, NUM_UNIQUE_COLOURS, MAX_SETS_PER_PROPERTY)
+    money = np.arange(num_players * NUM_UNIQUE_CARDS).reshape(num_players, NUM_UNIQUE_CARDS)
+
+    def dst(*path):
+        field = layout.slice(*path)
+        return np.arange(field.start, field.stop)
+
+    seat, opponents = seat_order[0], list(seat_order[1:])
+    live = len(opponents)
+    gathered = {name: ([], []) for name in ("board", "completed", "money")}
+    blank_cards, blank_zero = [], []
+
+    def gather(name, field_dst, source):
+        gathered[name][0].append(field_dst)
+        gathered[name][1].append(source.ravel())
+
+    for cind,(colour,max_cards) in enumerate(SET_LENGTH.items()):
+        gather("board", dst("property", colour, "cards"), boards[seat, cind, :, :max_cards])
+        gather("completed", dst("property", colour, "full_set"), completed[seat, cind])
+
+        cards = dst("opponent_property", colour, "cards").reshape(num_players - 1, -1)
+        full_set = dst("opponent_property", colour, "full_set").reshape(num_players - 1, -1)
+        gather("board", cards[:live], boards[opponents, cind, :, :max_cards])
+        gather("completed", full_set[:live], completed[opponents, cind])
+        blank_cards.append(cards[live:].ravel())
+        blank_zero.append(full_set[live:].ravel())
+
+    gather("money", dst("money"), money[seat])
+    opponent_money = dst("opponent_money").reshape(num_players - 1, -1)
+    gather("money", opponent_money[:live], money[opponents])
+    blank_zero.append(opponent_money[live:].ravel())
+
+    arrays = []
+    for name in ("board", "completed", "money"):
+        arrays += [np.concatenate([d.ravel() for d in gathered[name][0]]), np.concatenate(gathered[name][1])]
+    relative_seat = np.full(num_players + 1, -1, dtype=np.int8)
+    relative_seat[list(seat_order)] = np.arange(len(seat_order))
+    return SeatGather(*arrays, np.concatenate(blank_cards), np.concatenate(blank_zero), relative_seat)
+
 class MonopolyDeal(AECEnv):
     """
     The metadata holds environment constants. From gymnasium, we inherit the "render_modes",
@@ -42,109 +264,99 @@ class MonopolyDeal(AECEnv):
     The "name" metadata allows the environment to be pretty printed.
     """
 
-    metadata = {"render_modes": ["human"], "name": "MD"}
+    metadata = {"render_modes": ["human", "ansi", "text"], "name": "MD"}
 
-    def __init__(self, render_mode=None):
+    def __init__(self, render_mode=None, reward_fn=None, max_steps=None, payment="cards", num_players=NUM_PLAYERS,
+                 observation_extras=(), features=False, canonical_slots=False):
+        """
+        reward_fn: a Reward hook (see Reward.py), TerminalReward() by default.
+        max_steps: truncate the episode after this many step() calls, or None
+        to only end on a win.
+        payment: how defenders pay rent / debt / birthday.
+            "cards"  - one DECISION_DEFENDER_PAY step per bank card handed over
+            "bundle" - one DECISION_DEFENDER_PAY_BUNDLE step choosing among
+                       the distinct minimal payment bundles (see Payment.py)
+            "auto"   - settled internally with the least-overpay bundle
+        num_players: MIN_PLAYERS to MAX_PLAYERS seats.
+        observation_extras: names of optional observation fields to add (see
+        OBSERVATION_EXTRAS), e.g. ("unseen_cards",).
+        features: also return the float32 strategic features (Features.py)
+        under "features" in each observation, next to "observation" and
+        "action_mask"; see features_flat().
+        canonical_slots: keep each colour's slots in canonical order (see
+        Player.canonicalize), so symmetric boards observe and hash the same;
+        to_canonical() / from_canonical() translate set indices.
+        """
+        if payment not in ("cards", "bundle", "auto"):
+            raise ValueError(f"Unknown payment mode {payment!r}")
+        if num_players not in PLAYER_COUNTS:
+            raise ValueError(f"num_players must be {MIN_PLAYERS}-{MAX_PLAYERS}, got {num_players}")
+        unknown = set(observation_extras) - set(OBSERVATION_EXTRAS)
+        if unknown:
+            raise ValueError(f"Unknown observation extras {sorted(unknown)}")
         
-        self.possible_agents = ["player_" + str(r) for r in range(NUM_PLAYERS)]
+        self.num_players = num_players
+        self.possible_agents = ["player_" + str(r) for r in range(num_players)]
 
         # a mapping between agent name and ID
         self.agent_name_mapping = dict(zip(self.possible_agents, list(range(len(self.possible_agents)))))
 
-        self.renderer = Render()
+        # "human" renders rich tables through Render; "ansi" / "text" print
+        # the same steps as ANSI-coloured / plain lines through TextRender,
+        # which formats from the seat arrays in microseconds. render() is a
+        # no-op otherwise.
+        self.render_mode = render_mode
+        if render_mode == "human":
+            self.renderer = Render()
+        elif render_mode in ("ansi", "text"):
+            self.renderer = TextRender(colour=render_mode == "ansi")
+        else:
+            self.renderer = None
+
+        self.reward_fn = reward_fn if reward_fn is not None else TerminalReward()
+        self.max_steps = max_steps
+        self.payment = payment
+        self.observation_extras = tuple(name for name in OBSERVATION_EXTRAS if name in observation_extras)
+        self.features = features
+        self.canonical_slots = canonical_slots
+
+        # All of this game's randomness (seat order, shuffles) comes from its
+        # own generator, reseeded by reset(seed=...). Nothing touches the
+        # global random / np.random state, so one env per thread is safe.
+        # PCG64 rather than random.Random: its state pickles to a few hundred
+        # bytes instead of ~3 KB, which matters for suspend().
+        self.rng = np.random.default_rng()
+        # per-agent spaces, built on first use: each has its own sampling
+        # RNG, so seeding one never shifts another agent's or env's samples
+        self._observation_spaces = {}
+        self._action_spaces = {}
+
+    # flat int8 layouts behind observe() and the action masks, shared by
+    # every env with this player count; see observe_flat() / action_mask_flat()
+    @property
+    def observation_layout(self):
+        return extended_observation_layout(self.num_players, self.observation_extras)
+
+    @property
+    def action_mask_layout(self):
+        return ACTION_MASK_LAYOUTS[self.num_players]
 
     # Observation space should be defined here.
-    @functools.lru_cache(maxsize=None)
     def observation_space(self, agent):
-        """
-        Define observation space
-        """
-        
-        return gym.spaces.Dict({
-            "hand": gym.spaces.Box(low=0, high=MAX_ANY_CARD, shape=(NUM_UNIQUE_CARDS,), dtype=np.int8),
-            "property": gym.spaces.Dict({
-                colour: gym.spaces.Dict({
-                    "cards": gym.spaces.Box(low=-1, high=NUM_UNIQUE_PROPERTY_CARDS, shape=(MAX_SETS_PER_PROPERTY,max_cards), dtype=np.int8),
-                    "full_set": gym.spaces.MultiBinary(MAX_SETS_PER_PROPERTY)
-                }) for colour,max_cards in SET_LENGTH.items()
-            }),
-            "money": gym.spaces.Box(low=0, high=MAX_ANY_CARD, shape=(NUM_UNIQUE_CARDS,), dtype=np.int8),
-            "opponent_property": gym.spaces.Dict({
-                colour: gym.spaces.Dict({
-                    "cards": gym.spaces.Box(low=-1, high=NUM_UNIQUE_PROPERTY_CARDS, shape=(MAX_SETS_PER_PROPERTY,max_cards,NUM_OPPONENTS), dtype=np.int8),
-                    "full_set": gym.spaces.MultiBinary([MAX_SETS_PER_PROPERTY,NUM_OPPONENTS])
-                }) for colour,max_cards in SET_LENGTH.items()
-            }),
-            "opponent_money": gym.spaces.Box(low=0, high=MAX_ANY_CARD, shape=(NUM_UNIQUE_CARDS,NUM_OPPONENTS), dtype=np.int8),
-            "actions_left": gym.spaces.Discrete(4),
-            "discard_pile": gym.spaces.Box(low=0, high=MAX_ANY_CARD, shape=(NUM_UNIQUE_CARDS,), dtype=np.int8),
-            "action_context": gym.spaces.Dict({
-                "decision": gym.spaces.Discrete(MAX_DECISIONS+2, start=-1),
-                "action": gym.spaces.Discrete(NUM_ACTIONS+1, start=-1),
-                "hand_card": gym.spaces.Discrete(NUM_UNIQUE_CARDS+1, start=-1),
-                "target_ID": gym.spaces.Discrete(NUM_PLAYERS+1, start=-1),
-                "opponent_ID": gym.spaces.Discrete(NUM_OPPONENTS+1, start=-1),
-                "opponent_property": gym.spaces.Dict({
-                    "colour": gym.spaces.Discrete(NUM_UNIQUE_COLOURS+1, start=-1),
-                    "set_index": gym.spaces.Discrete(MAX_SETS_PER_PROPERTY+1, start=-1),
-                    "card": gym.spaces.Discrete(NUM_UNIQUE_PROPERTY_CARDS+1, start=-1)
-                }),
-                "opponent_set": gym.spaces.Dict({
-                    "colour": gym.spaces.Discrete(NUM_UNIQUE_COLOURS+1, start=-1),
-                    "set_index": gym.spaces.Discrete(MAX_SETS_PER_PROPERTY+1, start=-1)
-                }),
-                "my_property": gym.spaces.Dict({
-                    "colour": gym.spaces.Discrete(NUM_UNIQUE_COLOURS+1, start=-1),
-                    "set_index": gym.spaces.Discrete(MAX_SETS_PER_PROPERTY+1, start=-1),
-                    "card": gym.spaces.Discrete(NUM_UNIQUE_PROPERTY_CARDS+1, start=-1)
-                }),
-                "my_set": gym.spaces.Dict({
-                    "colour": gym.spaces.Discrete(NUM_UNIQUE_COLOURS+1, start=-1),
-                    "set_index": gym.spaces.Discrete(MAX_SETS_PER_PROPERTY+1, start=-1)
-                })
-            })
-        })
+        space = self._observation_spaces.get(agent)
+        if space is None:
+            space = self._observation_spaces[agent] = fresh_space(extended_observation_space(self.num_players, self.observation_extras))
+        return space
+
+    def feature_space(self, agent):
+        return feature_space(self.num_players)
 
     # Action space should be defined here.
-    @functools.lru_cache(maxsize=None)
     def action_space(self, agent):
-        """
-        Define action space
-        0: Skip
-        1: Move property
-        2: Play money
-        3: Play property
-        4: Play wild property
-        5: Sly Deal
-        6: Forced Deal
-        7: Debt Collector
-        8: It's My Birthday
-        9: Deal Breaker
-        10: Rent, Red/Yellow
-        11: Rent, Green/Dark Blue
-        12: Rent, Pink/Orange
-        13: Rent, Black/Light Green
-        14: Rent, Brown/Light Blue
-        15: Rent, Wild
-        16: Counter (JSN)
-        """
-
-        return gym.spaces.Dict(
-            {   
-                "action_ID": gym.spaces.Discrete(NUM_ACTIONS),                         # Choose an action
-                "hand_card": gym.spaces.Discrete(NUM_UNIQUE_CARDS),                    # Choose a card from hand
-                "opponent_ID": gym.spaces.Discrete(NUM_OPPONENTS+1),                      # Choose an opponent
-                "property_card": gym.spaces.Dict({                                          # Choose a card
-                    "colour": gym.spaces.Discrete(NUM_UNIQUE_COLOURS),
-                    "set_index": gym.spaces.Discrete(MAX_SETS_PER_PROPERTY),
-                    "card": gym.spaces.Discrete(NUM_UNIQUE_PROPERTY_CARDS)
-                }),
-                "set": gym.spaces.Dict({                                              # Choose a set
-                    "colour": gym.spaces.Discrete(NUM_UNIQUE_COLOURS),
-                    "set_index": gym.spaces.Discrete(MAX_SETS_PER_PROPERTY)
-                })
-            }
-        )
+        space = self._action_spaces.get(agent)
+        if space is None:
+            space = self._action_spaces[agent] = fresh_space(ACTION_SPACES[self.num_players])
+        return space
 
     def reset(self, seed=None, options=None):
         """
@@ -159,32 +371,56 @@ class MonopolyDeal(AECEnv):
         And must set up the environment so that render(), step(), and observe()
         can be called without issues.
         Here it sets up the state dictionary which is used by step() and the observations dictionary which is used by step() and observe()
+
+        options={"scenario": s} starts from a Scenario (built with this env's
+        rng) instead of a fresh deal; options={"scenario": batch, "row": i}
+        starts from row i of a ScenarioBatch. See Scenario.py.
         """
+        if seed is not None:
+            self.rng.bit_generator.state = pcg64_state(seed)
+        scenario = options.get("scenario") if options else None
+
         # initialise list of agents, shuffle for random order
         self.agents = self.possible_agents[:]
-        np.random.shuffle(self.agents)
+        self.rng.shuffle(self.agents)
+
+        # The first reset builds the deck, players, dicts and buffers; every
+        # later reset recycles the same objects in place (boards cleared, deck
+        # refilled from the card template, masks zeroed), which keeps
+        # auto-resetting rollouts cheap. Observation buffers are overwritten
+        # whole by observe() or the fresh-deal template below.
+        # A scenario replaces the deal, so nothing is dealt for it.
+        recycled = hasattr(self, "players")
+        if not recycled:
+            self._build_game()
+        else:
+            if scenario is None:
+                self.deck.reset()
+                for player in self.players.values():
+                    player.clear(seat_rows=False)
+                self.seats.clear()
+            for agent in self.possible_agents:
+                self.action_mask_buffers[agent].fill(0)
 
         # Our agent_selector utility allows easy cyclic stepping through the agents list.
-        self._agent_selector = agent_selector.agent_selector(self.agents)
+        self._agent_selector.reinit(self.agents)
         self.agent_selection = self._agent_selector.next()
 
-        # initialise rewards, cumulative rewards
-        self.rewards = {agent: 0 for agent in self.agents}
-        self.cumulative_rewards = {agent: 0 for agent in self.agents}
-        self.truncations = {agent: False for agent in self.agents}
-        self._cumulative_rewards = {agent: 0 for agent in self.agents}
-
-        # intialise termination
-        self.terminations = {agent: False for agent in self.agents}
-
-        # initialise dummy infos
-        self.infos = {agent: {} for agent in self.agents}
+        # initialise rewards, cumulative rewards, truncation, termination and
+        # dummy infos (keys may have been dropped by dead steps last episode)
+        for agent in self.agents:
+            self.rewards[agent] = 0
+            self.cumulative_rewards[agent] = 0
+            self._cumulative_rewards[agent] = 0
+            self.truncations[agent] = False
+            self.terminations[agent] = False
+            self.infos[agent] = {}
+            self.actions_left[agent] = 3
 
         # initialise state
-        self.deck = Deck()
-        self.players = {agent: Player(agent,self.deck) for agent in self.agents}
-        self.actions_left = {agent: 3 for agent in self.agents}
-        self.action_context = self.reset_action_context()
+        self.reset_action_context()
+        self.action_history.fill(-1)
+        self.history_position = 0
 
         # Cross-player action in flight (e.g. rent, JSN, forced-deal placement).
         # None during normal attacker turns. While set, agent_selection has been
@@ -192,26 +428,181 @@ class MonopolyDeal(AECEnv):
         # _advance_or_return_to_attacker() drains the defender list.
         self.pending = None
 
-        # initialise observation dictionary
-        self.observations = {agent: {"observation": None, "action_mask": None} for agent in self.agents} 
-        self.observations = {
-            agent: {
-                "observation": self.observe(agent),
-                "action_mask": ActionMask().action_mask
-            } for agent in self.agents
-        }
+        # steps taken this episode, for truncation at max_steps
+        self.num_steps = 0
+
+        if scenario is not None:
+            if not isinstance(scenario, ScenarioBatch):
+                scenario = scenario.build(1, self.rng)
+            self._load_scenario(scenario, options.get("row", 0))
+            self.reward_fn.reset(self)
+            return self._observe_all()
+
+        if recycled:
+            # the observation every seat sees of an empty table; only hands
+            # (and so unseen cards and features) differ once dealt
+            fresh = self._fresh_observation
+            if fresh is None:
+                fresh = self._fresh_observation = self.observe_flat(self.agent_selection).copy()
+            for player in self.players.values():
+                player.addHandCards(self.deck.getCards(5))
+        self.reward_fn.reset(self)
 
         # draw 2 cards for first agent
         player = self.players[self.agent_selection]
         player.drawTwo()
 
         # set action mask for first agent
-        action_mask = ActionMask()
-        action_mask.set_action_ID(self._get_internal_state())
-        self.observations[self.agent_selection]["action_mask"] = action_mask.action_mask
-        
+        action_mask = self._new_action_mask()
+        action_mask.set_opening_action_ID(player)
+        np.copyto(self.action_mask_buffers[self.agent_selection], action_mask.buffer)
+
+        if not recycled:
+            return self._observe_all()
+        for agent in self.agents:
+            player = self.players[agent]
+            observation = self.observations[agent]["observation"]
+            np.copyto(self.observation_buffers[agent], fresh)
+            observation["hand"][:] = player.hand
+            if "unseen_cards" in observation:
+                observation["unseen_cards"][:] = self.seats.unseenRow(player.seat)
+            if self.features:
+                self._write_features(agent)
+        return self.observations, self.infos
+
+    def _observe_all(self):
+        # reset() hands back every agent's observation filled in, as views
+        # into the reused buffers (see observe())
+        for agent in self.agents:
+            self.observe(agent)
         return self.observations, self.infos
 
+    def _load_scenario(self, batch, row):
+        """Replace the freshly reset game with row `row` of a ScenarioBatch:
+        hands, banks, boards, deck and discard pile through the usual
+        mutators (so hashes and seat arrays stay in step), then turn order,
+        actions_left and any pending defender phase."""
+        scenario = batch.scenario
+        if scenario.num_players != self.num_players:
+            raise ValueError(f"Scenario is for {scenario.num_players} players, env has {self.num_players}")
+
+        self.deck.clearDiscard()
+        self.deck.deck[:] = [CARDS_BY_ID[card_id] for card_id in batch.decks[row].tolist()]
+        for card_id in scenario.discard:
+            self.deck.discardCard(CARDS_BY_ID[card_id])
+
+        colours = list(SET_LENGTH)
+        for agent in self.possible_agents:
+            seat = self.agent_name_mapping[agent]
+            player = self.players[agent]
+            player.clear()
+            player.addHandCards([CARDS_BY_ID[card_id] for card_id, count in enumerate(batch.hands[row, seat].tolist()) for _ in range(count)])
+            for card_id, count in enumerate(batch.banks[row, seat].tolist()):
+                for _ in range(count):
+                    player.addMoney(CARDS_BY_ID[card_id])
+            # argwhere is row-major, so each slot fills in position order
+            for cind, set_index, position in np.argwhere(batch.boards[seat] >= 0).tolist():
+                player.addProperty(colours[cind], set_index, CARDS_BY_ID[int(batch.boards[seat, cind, set_index, position])])
+
+        # turn order starts at the seat to act
+        start = scenario.order.index(scenario.to_act)
+        self.agents = [self.possible_agents[seat] for seat in scenario.order[start:] + scenario.order[:start]]
+        self._agent_selector.reinit(self.agents)
+        self.agent_selection = self._agent_selector.next()
+        self.actions_left[self.agent_selection] = scenario.actions_left
+
+        for agent in self.possible_agents:
+            self.action_mask_buffers[agent].fill(0)
+        self.reward_fn.reset(self)
+
+        action_mask = self._new_action_mask()
+        action_mask.set_action_ID(self._get_internal_state())
+        pending = scenario.pending
+        if pending is not None and pending["type"] == "PAYMENT":
+            action_mask = self._start_payment(self.agent_selection, [self.possible_agents[seat] for seat in pending["defenders"]], pending["amount"])
+        elif pending is not None:
+            defender = self.players[self.possible_agents[pending["defender"]]]
+            card = CARDS_BY_ID[pending["card"]]
+            if not defender.boardTree().placement(card).any():
+                raise ValueError(f"{defender} has nowhere to place {card.name}")
+            action_mask = self._start_forced_deal_placement(self.agent_selection, defender.name, card)
+        np.copyto(self.action_mask_buffers[self.agent_selection], action_mask.buffer)
+
+        # the loaded hands were counted as seen by their owners; everything
+        # face up (banks, boards, discard pile, a forced-deal card in
+        # transit) has been seen by every seat
+        face_up = list(scenario.discard)
+        if pending is not None and pending["type"] == "FORCED_DEAL_PLACEMENT":
+            face_up.append(pending["card"])
+        public = self.seats.moneyArray().sum(axis=0, dtype=np.int64)
+        public += np.bincount(batch.boards[batch.boards >= 0], minlength=NUM_UNIQUE_CARDS)
+        public += np.bincount(np.array(face_up, dtype=np.int64), minlength=NUM_UNIQUE_CARDS)
+        self.seats.unseenArray()[:] -= public.astype(np.int8)
+
+        if self.canonical_slots:
+            self._canonicalize()
+
+    def _build_game(self):
+        """Allocate everything reset() recycles: deck, players, the per-agent
+        dicts and the flat observation / action mask buffers."""
+        # banks and boards of every seat, stacked; each Player owns one row
+        self.seats = SeatArrays(self.num_players)
+        self.deck = Deck(self.rng, self.seats)
+        self.players = {agent: Player(agent,self.deck,self.agent_name_mapping[agent],self.seats) for agent in self.possible_agents}
+        for player in self.players.values():
+            player.canonical = self.canonical_slots
+        self._agent_selector = agent_selector.AgentSelector(self.agents)
+
+        self.rewards = {}
+        self.cumulative_rewards = {}
+        self._cumulative_rewards = {}
+        self.truncations = {}
+        self.terminations = {}
+        self.infos = {}
+        self.actions_left = {}
+
+        # action_context is an array.array so step() reads plain ints out of
+        # it; action_context_view() gives numpy a zero-copy view of it
+        self.action_context = array("b", ACTION_CONTEXT_RESET)
+
+        # ring buffer of the last HISTORY_LENGTH resolved actions (HIST_*
+        # offsets, absolute seats), next write at history_position
+        self.action_history = np.full((HISTORY_LENGTH, HIST_SIZE), -1, dtype=np.int8)
+        self.history_position = 0
+
+        # Each agent gets one flat buffer for its observation and one for its
+        # action mask; the nested dicts are views into them, filled in place.
+        self.observation_buffers = {agent: self.observation_layout.empty() for agent in self.possible_agents}
+        self.action_mask_buffers = {agent: self.action_mask_layout.empty() for agent in self.possible_agents}
+        self._build_feature_buffers()
+        self._build_observation_views()
+
+        # scratch mask that step() rebuilds each decision before copying it
+        # into the acting agent's buffer
+        self._action_mask = ActionMask(num_players=self.num_players)
+        # flat observation of a table with nothing dealt, taken by the first
+        # recycled reset() (see there)
+        self._fresh_observation = None
+
+    def _build_feature_buffers(self):
+        if self.features:
+            self.feature_buffers = {agent: np.zeros(feature_size(self.num_players), dtype=np.float32) for agent in self.possible_agents}
+
+    def _build_observation_views(self):
+        self.observations = {
+            agent: {
+                "observation": self.observation_layout.views(self.observation_buffers[agent]),
+                "action_mask": self.action_mask_layout.views(self.action_mask_buffers[agent])
+            } for agent in self.possible_agents
+        }
+        if self.features:
+            for agent in self.possible_agents:
+                self.observations[agent]["features"] = self.feature_buffers[agent]
+
+    def _new_action_mask(self):
+        self._action_mask.initialise_action_mask()
+        return self._action_mask
+
     def step(self, action):
         """
         step(action) takes in an action for the current agent (specified by
@@ -225,87 +616,92 @@ class MonopolyDeal(AECEnv):
         And any internal state used by observe() or render()
         """
 
+        if self.terminations[self.agent_selection] or self.truncations[self.agent_selection]:
+            self._was_dead_step(action)
+            return
+
         # extract useful values
         agent = self.agent_selection
         player = self.players[agent]
-        decision = self.action_context["decision"]
-        action_ID = self.action_context["action"]
+        self._cumulative_rewards[agent] = 0
+        decision = self.action_context[CTX_DECISION]
+        action_ID = self.action_context[CTX_ACTION]
 
-        action_mask = ActionMask()
+        action_mask = self._new_action_mask()
 
         if decision == -1:
             # action chosen
             action_ID = action["action_ID"]
-            self.action_context["action"] = action_ID
+            self.action_context[CTX_ACTION] = action_ID
             
             if action_ID == 0:      
                 # skip
-                self.action_context["decision"] = 7
+                self.action_context[CTX_DECISION] = 7
             elif action_ID == 1:    
                 # move property → choose (my) property colour
-                self.action_context["decision"] = 2
-                self.action_context["target_ID"] = self.agents.index(agent)
+                self.action_context[CTX_DECISION] = 2
+                self.action_context[CTX_TARGET_ID] = self.agents.index(agent)
                 # unmask (my) properties
                 action_mask.set_property_colour(self._get_internal_state(), target_opponent=False)
             else:                   
                 # the rest → unmask hand_card action
-                self.action_context["decision"] = 0
+                self.action_context[CTX_DECISION] = 0
                 action_mask.set_hand_card(self._get_internal_state())
 
         elif decision == 0:
             # hand card chosen
             hand_card = action["hand_card"]
-            self.action_context["hand_card"] = hand_card
+            self.action_context[CTX_HAND_CARD] = hand_card
 
             if action_ID == 2 or action_ID == 16:
                 # play money or just say no → end of turn
-                self.action_context["decision"] = 7
+                self.action_context[CTX_DECISION] = 7
             elif action_ID == 3 or action_ID == 4 or action_ID == 10 or action_ID == 11 or action_ID == 12 or action_ID == 13 or action_ID == 14 or action_ID == 15:
                 # play property, wild property or any rent → choose (my) set
-                self.action_context["decision"] = 5
-                self.action_context["target_ID"] = self.agents.index(agent)
+                self.action_context[CTX_DECISION] = 5
+                self.action_context[CTX_TARGET_ID] = self.agents.index(agent)
                 # unmask (my) sets
                 action_mask.set_set_colour(self._get_internal_state(), target_opponent=False)
             elif action_ID == 5 or action_ID == 6 or action_ID == 7 or action_ID == 8 or action_ID == 9:
                 # sly deal or forced deal or debt collector or it's my birthday or deal breaker → choose opponent
-                self.action_context["decision"] = 1
+                self.action_context[CTX_DECISION] = 1
                 # unmask opponents
                 action_mask.set_opponent(self._get_internal_state())
             
         elif decision == 1:
             # opponent chosen
             opponent_ID = action["opponent_ID"]
-            self.action_context["opponent_ID"] = opponent_ID
+            self.action_context[CTX_OPPONENT_ID] = opponent_ID
             opponent = self.agents[opponent_ID] 
 
             if action_ID == 5 or action_ID == 6:
                 # sly deal or forced deal → choose (opponent) property colour
-                self.action_context["decision"] = 2
-                self.action_context["target_ID"] = opponent_ID
+                self.action_context[CTX_DECISION] = 2
+                self.action_context[CTX_TARGET_ID] = opponent_ID
                 # unmask (opponent) properties
                 action_mask.set_property_colour(self._get_internal_state(), target_opponent=True)
             elif action_ID == 7 or action_ID == 8 or action_ID == 15:
                 # debt collector, it's my birthday or wild rent → end of turn
-                self.action_context["decision"] = 7
+                self.action_context[CTX_DECISION] = 7
             elif action_ID == 9:
                 # deal breaker → choose (opponent) set colour
-                self.action_context["decision"] = 5
-                self.action_context["target_ID"] = opponent_ID
+                self.action_context[CTX_DECISION] = 5
+                self.action_context[CTX_TARGET_ID] = opponent_ID
                 # unmask (opponent) sets
                 action_mask.set_set_colour(self._get_internal_state(), target_opponent=True)
 
         elif decision == 2:
             # property colour chosen → choose property set index
             property_colour = action["property_card"]["colour"]
-            if self.action_context["target_ID"] == self.action_context["opponent_ID"]:
-                self.action_context["opponent_property"]["colour"] = property_colour
+            if self.action_context[CTX_TARGET_ID] == self.action_context[CTX_OPPONENT_ID]:
+                self.action_context[CTX_OPPONENT_PROPERTY_COLOUR] = property_colour
                 target_opponent = True
             else:
-                self.action_context["my_property"]["colour"] = property_colour
+                self.action_context[CTX_MY_PROPERTY_COLOUR] = property_colour
                 target_opponent = False
 
             # next decision is always 3
-            self.action_context["decision"] = 3
+            self.action_context[CTX_DECISION] = 3
 
             # unmask my property set index
             action_mask.set_property_set_index(self._get_internal_state(), target_opponent)
@@ -313,15 +709,15 @@ class MonopolyDeal(AECEnv):
         elif decision == 3:
             # property set index chosen → choose property card
             property_set_index = action["property_card"]["set_index"]
-            if self.action_context["target_ID"] == self.action_context["opponent_ID"]:
-                self.action_context["opponent_property"]["set_index"] = property_set_index
+            if self.action_context[CTX_TARGET_ID] == self.action_context[CTX_OPPONENT_ID]:
+                self.action_context[CTX_OPPONENT_PROPERTY_SET_INDEX] = property_set_index
                 target_opponent = True
             else:
-                self.action_context["my_property"]["set_index"] = property_set_index
+                self.action_context[CTX_MY_PROPERTY_SET_INDEX] = property_set_index
                 target_opponent = False
 
             # next decision is always 4
-            self.action_context["decision"] = 4
+            self.action_context[CTX_DECISION] = 4
 
             # unmask my property set index
             action_mask.set_property_card(self._get_internal_state(), target_opponent)
@@ -329,36 +725,36 @@ class MonopolyDeal(AECEnv):
         elif decision == 4:
             # property card chosen
             property_card = action["property_card"]["card"]
-            if self.action_context["target_ID"] == self.action_context["opponent_ID"]:
-                self.action_context["opponent_property"]["card"] = property_card
+            if self.action_context[CTX_TARGET_ID] == self.action_context[CTX_OPPONENT_ID]:
+                self.action_context[CTX_OPPONENT_PROPERTY_CARD] = property_card
             else:
-                self.action_context["my_property"]["card"] = property_card
+                self.action_context[CTX_MY_PROPERTY_CARD] = property_card
             
-            if action_ID == 1 or action_ID == 5 or (action_ID == 6 and self.action_context["my_property"]["colour"] != -1):
+            if action_ID == 1 or action_ID == 5 or (action_ID == 6 and self.action_context[CTX_MY_PROPERTY_COLOUR] != -1):
                 # move property, sly deal → choose (my) set colour
-                self.action_context["decision"] = 5
-                self.action_context["target_ID"] = self.agents.index(agent)
+                self.action_context[CTX_DECISION] = 5
+                self.action_context[CTX_TARGET_ID] = self.agents.index(agent)
                 # unmask (my) sets
                 action_mask.set_set_colour(self._get_internal_state(), target_opponent=False)
-            elif action_ID == 6 and self.action_context["my_property"]["colour"] == -1:
+            elif action_ID == 6 and self.action_context[CTX_MY_PROPERTY_COLOUR] == -1:
                 # forced deal → choose (my) property colour
-                self.action_context["decision"] = 2
-                self.action_context["target_ID"] = self.agents.index(agent)
+                self.action_context[CTX_DECISION] = 2
+                self.action_context[CTX_TARGET_ID] = self.agents.index(agent)
                 # unmask (my) properties
                 action_mask.set_property_colour(self._get_internal_state(), target_opponent=False)
 
         elif decision == 5:
             # set colour chosen
             set_colour = action["set"]["colour"]
-            if self.action_context["target_ID"] == self.action_context["opponent_ID"]:
-                self.action_context["opponent_set"]["colour"] = set_colour
+            if self.action_context[CTX_TARGET_ID] == self.action_context[CTX_OPPONENT_ID]:
+                self.action_context[CTX_OPPONENT_SET_COLOUR] = set_colour
                 target_opponent = True
             else:
-                self.action_context["my_set"]["colour"] = set_colour
+                self.action_context[CTX_MY_SET_COLOUR] = set_colour
                 target_opponent = False
 
             # next decision is always 6
-            self.action_context["decision"] = 6
+            self.action_context[CTX_DECISION] = 6
 
             # unmask set index
             colour = decode_colour(set_colour)
@@ -367,19 +763,19 @@ class MonopolyDeal(AECEnv):
         elif decision == 6:
             # set index just chosen
             set_index = action["set"]["set_index"]
-            if self.action_context["target_ID"] == self.action_context["opponent_ID"]:
-                self.action_context["opponent_set"]["set_index"] = set_index
-                target = self.players[self.agents[self.action_context["opponent_ID"]]]
+            if self.action_context[CTX_TARGET_ID] == self.action_context[CTX_OPPONENT_ID]:
+                self.action_context[CTX_OPPONENT_SET_INDEX] = set_index
+                target = self.players[self.agents[self.action_context[CTX_OPPONENT_ID]]]
             else:
-                self.action_context["my_set"]["set_index"] = set_index
+                self.action_context[CTX_MY_SET_INDEX] = set_index
                 target = player
 
             if action_ID in [1,3,4,5,6,9,10,11,12,13,14]:
                 # move property, play property, play wild, sly deal, forced deal, deal breaker, any rent except wild → end of turn
-                self.action_context["decision"] = 7
+                self.action_context[CTX_DECISION] = 7
             elif action_ID == 15:
                 # wild rent → choose opponent
-                self.action_context["decision"] = 1
+                self.action_context[CTX_DECISION] = 1
                 # unmask opponents
                 action_mask.set_opponent(self._get_internal_state())
 
@@ -395,27 +791,28 @@ class MonopolyDeal(AECEnv):
             # wipes action_context), and finalize is what would otherwise own
             # this render.
             self.render(mode='action')
+            self._record_action(player, action_ID)
+
+            # set by the actions that open a defender phase
+            action_mask = None
 
             if action_ID == 0:
                 # skip
                 pass
             elif action_ID == 1:
                 # move property
-                my_property = self.action_context["my_property"]
-                my_set = self.action_context["my_set"]
-
                 # decode colours
-                p_colour = decode_colour(my_property["colour"])
-                s_colour = decode_colour(my_set["colour"])
+                p_colour = decode_colour(self.action_context[CTX_MY_PROPERTY_COLOUR])
+                s_colour = decode_colour(self.action_context[CTX_MY_SET_COLOUR])
 
                 # get property
-                pCard = player.removePropertyById(p_colour,my_property["set_index"],my_property["card"])
+                pCard = player.removePropertyById(p_colour,self.action_context[CTX_MY_PROPERTY_SET_INDEX],self.action_context[CTX_MY_PROPERTY_CARD])
 
                 # add property to new set
-                player.addProperty(s_colour,my_set["set_index"],pCard)
+                player.addProperty(s_colour,self.action_context[CTX_MY_SET_INDEX],pCard)
             elif action_ID == 2:
                 # play money
-                hand_card = self.action_context["hand_card"]
+                hand_card = self.action_context[CTX_HAND_CARD]
 
                 # get money hand card
                 mCard = player.removeHandCardById(hand_card)
@@ -424,37 +821,32 @@ class MonopolyDeal(AECEnv):
                 player.addMoney(mCard)
             elif action_ID == 3 or action_ID == 4:
                 # play property or wild property
-                hand_card = self.action_context["hand_card"]
-                my_set = self.action_context["my_set"]
+                hand_card = self.action_context[CTX_HAND_CARD]
 
                 # decode colour
-                s_colour = decode_colour(my_set["colour"])
+                s_colour = decode_colour(self.action_context[CTX_MY_SET_COLOUR])
 
                 # get property hand card
                 pCard =  player.removeHandCardById(hand_card)
                 
                 # add property to new set
-                player.addProperty(s_colour,my_set["set_index"],pCard)
+                player.addProperty(s_colour,self.action_context[CTX_MY_SET_INDEX],pCard)
             elif action_ID == 5:
                 # sly deal
-                opponent = self.players[self.agents[self.action_context["opponent_ID"]]]
-                opponent_property = self.action_context["opponent_property"]
-
-                my_set = self.action_context["my_set"]
-                my_property = self.action_context["my_property"]
+                opponent = self.players[self.agents[self.action_context[CTX_OPPONENT_ID]]]
 
                 # decode colours
-                p_colour = decode_colour(opponent_property["colour"])
-                s_colour = decode_colour(my_set["colour"])
+                p_colour = decode_colour(self.action_context[CTX_OPPONENT_PROPERTY_COLOUR])
+                s_colour = decode_colour(self.action_context[CTX_MY_SET_COLOUR])
 
                 # steal property
-                pCard = opponent.removePropertyById(p_colour,opponent_property["set_index"],opponent_property["card"])
+                pCard = opponent.removePropertyById(p_colour,self.action_context[CTX_OPPONENT_PROPERTY_SET_INDEX],self.action_context[CTX_OPPONENT_PROPERTY_CARD])
 
                 # add property to new set
-                player.addProperty(s_colour,my_set["set_index"],pCard)
+                player.addProperty(s_colour,self.action_context[CTX_MY_SET_INDEX],pCard)
 
                 # remove card from hand
-                hand_card = self.action_context["hand_card"]
+                hand_card = self.action_context[CTX_HAND_CARD]
                 card = player.removeHandCardById(hand_card)
 
                 # add to discard pile
@@ -463,35 +855,32 @@ class MonopolyDeal(AECEnv):
                 # forced deal: swap one of attacker's properties for one of
                 # the defender's. Both sides change hands; defender picks
                 # where to place the incoming card via a follow-up decision.
-                opponent_name = self.agents[self.action_context["opponent_ID"]]
+                opponent_name = self.agents[self.action_context[CTX_OPPONENT_ID]]
                 opponent = self.players[opponent_name]
-                opponent_property = self.action_context["opponent_property"]
-                my_property = self.action_context["my_property"]
-                my_set = self.action_context["my_set"]
 
-                p_colour_opp = decode_colour(opponent_property["colour"])
-                s_colour_mine = decode_colour(my_set["colour"])
-                p_colour_mine = decode_colour(my_property["colour"])
+                p_colour_opp = decode_colour(self.action_context[CTX_OPPONENT_PROPERTY_COLOUR])
+                s_colour_mine = decode_colour(self.action_context[CTX_MY_SET_COLOUR])
+                p_colour_mine = decode_colour(self.action_context[CTX_MY_PROPERTY_COLOUR])
 
                 # steal opponent's property → attacker's set
-                stolen = opponent.removePropertyById(p_colour_opp, opponent_property["set_index"], opponent_property["card"])
-                player.addProperty(s_colour_mine, my_set["set_index"], stolen)
+                stolen = opponent.removePropertyById(p_colour_opp, self.action_context[CTX_OPPONENT_PROPERTY_SET_INDEX], self.action_context[CTX_OPPONENT_PROPERTY_CARD])
+                player.addProperty(s_colour_mine, self.action_context[CTX_MY_SET_INDEX], stolen)
 
                 # remove attacker's offered property → queue for defender to place
-                given = player.removePropertyById(p_colour_mine, my_property["set_index"], my_property["card"])
+                given = player.removePropertyById(p_colour_mine, self.action_context[CTX_MY_PROPERTY_SET_INDEX], self.action_context[CTX_MY_PROPERTY_CARD])
 
                 # discard the action card
-                hand_card = self.action_context["hand_card"]
+                hand_card = self.action_context[CTX_HAND_CARD]
                 self.deck.discardCard(player.removeHandCardById(hand_card))
 
                 # yield to defender for placement
                 action_mask = self._start_forced_deal_placement(agent, opponent_name, given)
             elif action_ID == 7:
                 # debt collector: chosen opponent owes $5M.
-                opponent_name = self.agents[self.action_context["opponent_ID"]]
+                opponent_name = self.agents[self.action_context[CTX_OPPONENT_ID]]
 
                 # discard the action card
-                hand_card = self.action_context["hand_card"]
+                hand_card = self.action_context[CTX_HAND_CARD]
                 self.deck.discardCard(player.removeHandCardById(hand_card))
 
                 action_mask = self._start_payment(agent, [opponent_name], amount=5)
@@ -500,29 +889,25 @@ class MonopolyDeal(AECEnv):
                 opponents = [a for a in self.agents if a != agent]
 
                 # discard the action card
-                hand_card = self.action_context["hand_card"]
+                hand_card = self.action_context[CTX_HAND_CARD]
                 self.deck.discardCard(player.removeHandCardById(hand_card))
 
                 action_mask = self._start_payment(agent, opponents, amount=2)
             elif action_ID == 9:
                 # deal breaker
-                opponent = self.players[self.agents[self.action_context["opponent_ID"]]]
-                opponent_set = self.action_context["opponent_set"]
+                opponent = self.players[self.agents[self.action_context[CTX_OPPONENT_ID]]]
 
                 # decode colours
-                s_colour = decode_colour(opponent_set["colour"])
+                s_colour = decode_colour(self.action_context[CTX_OPPONENT_SET_COLOUR])
 
                 # steal set: opponent's slot is replaced with a fresh empty
                 # PropertySet, and the populated original is transferred into
                 # the attacker's first empty slot.
-                pSet_taken = opponent.removeSetByID(s_colour, opponent_set["set_index"])
-                for pind, pSet in enumerate(player.sets[s_colour]):
-                    if pSet.isEmpty():
-                        player.sets[s_colour][pind] = pSet_taken
-                        break
+                pSet_taken = opponent.removeSetByID(s_colour, self.action_context[CTX_OPPONENT_SET_INDEX])
+                player.addSet(s_colour, pSet_taken)
 
                 # remove card from hand
-                hand_card = self.action_context["hand_card"]
+                hand_card = self.action_context[CTX_HAND_CARD]
                 card = player.removeHandCardById(hand_card)
 
                 # add to discard pile
@@ -530,25 +915,23 @@ class MonopolyDeal(AECEnv):
             elif action_ID > 9 and action_ID < 15:
                 # coloured rent: every opponent owes the rent value of the
                 # chosen set (computed from set completion + houses/hotels).
-                my_set = self.action_context["my_set"]
-                s_colour = decode_colour(my_set["colour"])
-                rent_amount = player.sets[s_colour][my_set["set_index"]].rentValue()
+                s_colour = decode_colour(self.action_context[CTX_MY_SET_COLOUR])
+                rent_amount = player.sets[s_colour][self.action_context[CTX_MY_SET_INDEX]].rentValue()
                 opponents = [a for a in self.agents if a != agent]
 
                 # discard the rent card
-                hand_card = self.action_context["hand_card"]
+                hand_card = self.action_context[CTX_HAND_CARD]
                 self.deck.discardCard(player.removeHandCardById(hand_card))
 
                 action_mask = self._start_payment(agent, opponents, amount=rent_amount)
             elif action_ID == 15:
                 # wild rent: only the chosen opponent pays.
-                my_set = self.action_context["my_set"]
-                s_colour = decode_colour(my_set["colour"])
-                rent_amount = player.sets[s_colour][my_set["set_index"]].rentValue()
-                opponent_name = self.agents[self.action_context["opponent_ID"]]
+                s_colour = decode_colour(self.action_context[CTX_MY_SET_COLOUR])
+                rent_amount = player.sets[s_colour][self.action_context[CTX_MY_SET_INDEX]].rentValue()
+                opponent_name = self.agents[self.action_context[CTX_OPPONENT_ID]]
 
                 # discard the rent card
-                hand_card = self.action_context["hand_card"]
+                hand_card = self.action_context[CTX_HAND_CARD]
                 self.deck.discardCard(player.removeHandCardById(hand_card))
 
                 action_mask = self._start_payment(agent, [opponent_name], amount=rent_amount)
@@ -558,7 +941,7 @@ class MonopolyDeal(AECEnv):
                 # TODO: implement rebuttal stuff  
 
                 # remove card from hand
-                hand_card = self.action_context["hand_card"]
+                hand_card = self.action_context[CTX_HAND_CARD]
                 card = player.removeHandCardById(hand_card)
                 
                 # add to discard pile
@@ -567,8 +950,10 @@ class MonopolyDeal(AECEnv):
             # If the action triggered a defender phase (rent, JSN, forced-deal
             # placement, etc.), control has been yielded to the defender via
             # _yield_to_defender() and pending is set. Skip finalize; it will
-            # run once the defender drain completes.
-            if self.pending is None:
+            # run once the defender drain completes. If no defender had to
+            # act (nobody could pay, or payment="auto" settled it), the drain
+            # has already finalized and returned the attacker's mask.
+            if action_mask is None:
                 action_mask = self._finalize_attacker_action()
 
         elif decision == 8:
@@ -576,7 +961,7 @@ class MonopolyDeal(AECEnv):
 
             # remove card from hand
             hand_card = action["hand_card"]
-            self.action_context["hand_card"] = hand_card
+            self.action_context[CTX_HAND_CARD] = hand_card
 
             self.render(mode='discard')
 
@@ -585,11 +970,11 @@ class MonopolyDeal(AECEnv):
             # add to discard pile
             self.deck.discardCard(card)
 
-            if len(player.hand) > 7:
+            if player.hand_size > 7:
                 action_mask.initialise_action_mask()
                 action_mask.set_hand_card_discard(self._get_internal_state())
             else:
-                self.action_context["decision"] = 9                
+                self.action_context[CTX_DECISION] = 9                
 
         elif decision == 9:
             # render post action state
@@ -605,10 +990,10 @@ class MonopolyDeal(AECEnv):
             player.drawTwo()
 
             # Reset action context
-            self.action_context = self.reset_action_context()
+            self.reset_action_context()
 
             # Unmask valid actions
-            action_mask = ActionMask()
+            action_mask = self._new_action_mask()
             action_mask.set_action_ID(self._get_internal_state())
 
         elif decision == DECISION_DEFENDER_PAY:
@@ -619,50 +1004,96 @@ class MonopolyDeal(AECEnv):
             defender = player  # agent_selection has been overridden to defender
             attacker_player = self.players[self.pending["attacker"]]
 
-            paid_card = None
-            for c in defender.money:
-                if c.id == card_id:
-                    paid_card = c
-                    break
-
-            defender.removeMoney(paid_card)
+            paid_card = defender.removeMoneyById(card_id)
             attacker_player.addMoney(paid_card)
 
             self.pending["remaining"] -= paid_card.value
 
-            if self.pending["remaining"] <= 0 or not defender.money:
+            if self.pending["remaining"] <= 0 or not defender.bank_value:
+                self._record_payment(defender)
                 action_mask = self._advance_or_return_to_attacker()
             else:
                 # Keep paying — refresh the defender's mask.
-                action_mask = ActionMask()
+                action_mask = self._new_action_mask()
                 action_mask.set_defender_phase(self._get_internal_state(), self.pending)
 
+        elif decision == DECISION_DEFENDER_PAY_BUNDLE:
+            # Defender chose a whole payment bundle. Hand over its cards and
+            # move on to the next defender or back to the attacker.
+            bundle = self.pending["bundles"][action["payment_bundle"]]
+            defender = player  # agent_selection has been overridden to defender
+            attacker_player = self.players[self.pending["attacker"]]
+
+            for card_id in bundle_card_ids(defender.money, bundle):
+                paid_card = defender.removeMoneyById(card_id)
+                attacker_player.addMoney(paid_card)
+                self.pending["remaining"] -= paid_card.value
+            self._record_payment(defender)
+
+            action_mask = self._advance_or_return_to_attacker()
+
         elif decision == DECISION_DEFENDER_FORCED_DEAL_PLACE_COLOUR:
             # Defender picked the colour bucket for the incoming property.
             set_colour = action["set"]["colour"]
-            self.action_context["my_set"]["colour"] = set_colour
-            self.action_context["decision"] = DECISION_DEFENDER_FORCED_DEAL_PLACE_INDEX
-            action_mask = ActionMask()
+            self.action_context[CTX_MY_SET_COLOUR] = set_colour
+            self.action_context[CTX_DECISION] = DECISION_DEFENDER_FORCED_DEAL_PLACE_INDEX
+            action_mask = self._new_action_mask()
             action_mask.set_defender_phase(self._get_internal_state(), self.pending)
 
         elif decision == DECISION_DEFENDER_FORCED_DEAL_PLACE_INDEX:
             # Defender picked the set_index. Place the card and hand control
             # back to the attacker.
             set_index = action["set"]["set_index"]
-            colour = decode_colour(self.action_context["my_set"]["colour"])
+            colour = decode_colour(self.action_context[CTX_MY_SET_COLOUR])
             defender = player
             defender.addProperty(colour, set_index, self.pending["card"])
+            self._record(HISTORY_PLACEMENT, defender.seat, self.players[self.pending["attacker"]].seat,
+                         -1, self.pending["card"].id, self.action_context[CTX_MY_SET_COLOUR], -1)
             action_mask = self._advance_or_return_to_attacker()
 
         elif decision in (DECISION_DEFENDER_JSN, DECISION_DEFENDER_PAY_DONE):
             # TODO(JSN MR): defender chooses to play Just Say No or accept the action.
             action_mask = self._advance_or_return_to_attacker()
 
+        # Re-sort the slots this step touched. No mask armed above depends on
+        # set indices (those are only armed at steps that don't move cards),
+        # so none of them goes stale.
+        if self.canonical_slots:
+            self._canonicalize()
+
         # Update action mask for whoever holds the turn now (may differ from
         # the agent we entered step() with if a defender phase was yielded to
         # or a turn just advanced).
-        self.observations[self.agent_selection]["action_mask"] = action_mask.action_mask
-        
+        np.copyto(self.action_mask_buffers[self.agent_selection], action_mask.buffer)
+
+        self._update_episode_status()
+
+    def _update_episode_status(self):
+        """Win / truncation check and reward hook, run once at the end of every step.
+
+        Only reads Player.num_completed_colours, which the board mutators keep
+        up to date, so the check is O(players) rather than a rescan of every
+        PropertySet.
+        """
+        self.num_steps += 1
+
+        winner = None
+        for agent in self.agents:
+            if self.players[agent].hasWon():
+                winner = agent
+                break
+
+        self.rewards = self.reward_fn(self, winner)
+        self._accumulate_rewards()
+
+        if winner is not None:
+            for agent in self.agents:
+                self.terminations[agent] = True
+                self.infos[agent]["winner"] = winner
+        elif self.max_steps is not None and self.num_steps >= self.max_steps:
+            for agent in self.agents:
+                self.truncations[agent] = True
+
     def _finalize_attacker_action(self):
         """Run the post-resolution cleanup for the attacker's just-completed action:
         decrement actions_left, reset action_context, and arm the next
@@ -671,27 +1102,27 @@ class MonopolyDeal(AECEnv):
         Called both on the normal in-line path (decision 7 with no pending) and
         when the last defender of a pending action finishes. The action-mode
         render fires earlier (in step()) before any defender yield, since
-        action_context["action"] is reset by _yield_to_defender.
+        action_context[CTX_ACTION] is reset by _yield_to_defender.
         """
         agent = self.agent_selection
         player = self.players[agent]
 
         self.actions_left[agent] -= 1
 
-        self.action_context = self.reset_action_context()
+        self.reset_action_context()
 
-        action_mask = ActionMask()
+        action_mask = self._new_action_mask()
         action_mask.set_action_ID(self._get_internal_state())
 
         # Round done
         if self.actions_left[agent] == 0:
-            if len(player.hand) > 7:
+            if player.hand_size > 7:
                 # Discard
-                self.action_context["decision"] = 8
+                self.action_context[CTX_DECISION] = 8
                 action_mask.initialise_action_mask()
                 action_mask.set_hand_card_discard(self._get_internal_state())
             else:
-                self.action_context["decision"] = 9
+                self.action_context[CTX_DECISION] = 9
 
         return action_mask
 
@@ -704,10 +1135,10 @@ class MonopolyDeal(AECEnv):
         returns to the attacker before then, the cycle stays correct.
         """
         self.agent_selection = defender_agent
-        self.action_context = self.reset_action_context()
-        self.action_context["decision"] = decision_code
+        self.reset_action_context()
+        self.action_context[CTX_DECISION] = decision_code
 
-        action_mask = ActionMask()
+        action_mask = self._new_action_mask()
         action_mask.set_defender_phase(self._get_internal_state(), self.pending)
         return action_mask
 
@@ -735,8 +1166,21 @@ class MonopolyDeal(AECEnv):
                 # to give, skip them entirely.
                 # TODO: extend to allow paying with property cards, not just bank money.
                 self.pending["remaining"] = self.pending["amount"]
-                if not self.players[next_defender].money:
+                if not self.players[next_defender].hasAtLeastOneMoneyOnBoard():
                     continue
+                if self.payment == "auto":
+                    self._auto_pay(next_defender)
+                    continue
+                if self.payment == "bundle":
+                    # nothing owed (rent on an all-wild set): no choice to make
+                    if self.pending["remaining"] <= 0:
+                        continue
+                    # a bank of only zero-value cards (e.g. a banked Wild)
+                    # cannot pay anything: skip them like an empty bank
+                    bundles = payment_bundles(self.players[next_defender].money, self.pending["remaining"])
+                    if not bundles:
+                        continue
+                    self.pending["bundles"] = bundles
 
             first_decision = self.pending.get("defender_first_decision", DECISION_DEFENDER_JSN)
             return self._yield_to_defender(next_defender, first_decision)
@@ -746,13 +1190,59 @@ class MonopolyDeal(AECEnv):
         self.agent_selection = attacker
         return self._finalize_attacker_action()
 
+    def _auto_pay(self, defender):
+        """Settle the pending payment for `defender` in one go, with the
+        least-overpay combination of their bank cards."""
+        defender_player = self.players[defender]
+        attacker_player = self.players[self.pending["attacker"]]
+        for card_id in plan_payment(defender_player.money, self.pending["remaining"]):
+            paid_card = defender_player.removeMoneyById(card_id)
+            attacker_player.addMoney(paid_card)
+            self.pending["remaining"] -= paid_card.value
+        self._record_payment(defender_player)
+
+    def _record(self, *entry):
+        # one action_history row, HIST_* fields in order
+        self.action_history[self.history_position] = entry
+        self.history_position = (self.history_position + 1) % HISTORY_LENGTH
+
+    def _record_action(self, player, action_ID):
+        """Record the attacker's action as it resolves at decision 7, while
+        action_context still holds its choices (a defender phase wipes them)."""
+        ctx = self.action_context
+        target = card = amount = -1
+        colour = ctx[CTX_MY_SET_COLOUR]
+        if action_ID in (5, 6, 7, 9, 15):
+            target = self.players[self.agents[ctx[CTX_OPPONENT_ID]]].seat
+        if action_ID == 1:
+            card = ctx[CTX_MY_PROPERTY_CARD]
+        elif action_ID == 3 or action_ID == 4:
+            card = ctx[CTX_HAND_CARD]
+        elif action_ID == 5 or action_ID == 6:
+            card = ctx[CTX_OPPONENT_PROPERTY_CARD]
+        elif action_ID == 7:
+            amount = 5
+        elif action_ID == 8:
+            amount = 2
+        elif action_ID == 9:
+            colour = ctx[CTX_OPPONENT_SET_COLOUR]
+        elif action_ID > 9 and action_ID < 16:
+            amount = player.sets[decode_colour(colour)][ctx[CTX_MY_SET_INDEX]].rentValue()
+        self._record(action_ID, player.seat, target, ctx[CTX_HAND_CARD], card, colour, amount)
+
+    def _record_payment(self, defender):
+        # remaining counts down from the amount owed, past zero on overpay
+        paid = self.pending["amount"] - self.pending["remaining"]
+        self._record(HISTORY_PAYMENT, defender.seat, self.players[self.pending["attacker"]].seat, -1, -1, -1, paid)
+
     def _start_payment(self, attacker, defenders, amount):
         """Initiate a payment-shaped pending action (rent, debt collector,
         birthday). Each defender owes `amount` to the attacker, or all their
         bank money if less. Yields control to the first solvent defender.
 
         If no defender has anything to give, control returns to the attacker
-        immediately.
+        immediately. With payment="auto" every defender is settled here and
+        control never leaves the attacker.
         """
         self.pending = {
             "type": "PAYMENT",
@@ -760,7 +1250,7 @@ class MonopolyDeal(AECEnv):
             "defenders": list(defenders),
             "amount": amount,
             "remaining": 0,  # set per-defender by _advance_or_return_to_attacker
-            "defender_first_decision": DECISION_DEFENDER_PAY,
+            "defender_first_decision": DECISION_DEFENDER_PAY_BUNDLE if self.payment == "bundle" else DECISION_DEFENDER_PAY,
         }
         return self._advance_or_return_to_attacker()
 
@@ -781,112 +1271,189 @@ class MonopolyDeal(AECEnv):
     def observe(self,agent):
         """
         Observe the internal state representation to the gymnasium observation space
+
+        The arrays are views into this agent's flat observation buffer and are
+        overwritten in place on the next observe(); copy them to keep them.
         """
 
         player = self.players[agent]
+        observation = self.observations[agent]["observation"]
 
         # Observe hand
-        hand = np.zeros((NUM_UNIQUE_CARDS), dtype=np.int8)
-        for card in player.hand:
-            hand[card.id] += 1
-
-        # Observe properties
-        property = {}
-        for colour,size in SET_LENGTH.items():
-            property[colour] = {}
-            cards = np.full((MAX_SETS_PER_PROPERTY,size), -1, dtype=np.int8)
-            full_set = np.zeros((MAX_SETS_PER_PROPERTY), dtype=np.int8)
-
-            for pind,pSet in enumerate(player.sets[colour]):
-                for cind,card in enumerate(pSet.properties):
-                    cards[pind,cind] = card.id
-                full_set[pind] = pSet.isCompleted()
-
-            property[colour]["cards"] = cards
-            property[colour]["full_set"] = full_set
-        
-        # Observe money
-        money = np.zeros((NUM_UNIQUE_CARDS), dtype=np.int8)
-        for card in player.money:
-            money[card.id] += 1
-
-        # Observe opponent properties
-        opponent_property = {}
-        opponents = [a for a in self.agents if a != agent]
-        for colour,size in SET_LENGTH.items():
-            opponent_property[colour] = {}
-            cards = np.full((NUM_OPPONENTS,MAX_SETS_PER_PROPERTY,size), -1, dtype=np.int8)
-            full_set = np.zeros((NUM_OPPONENTS,MAX_SETS_PER_PROPERTY), dtype=np.int8)
-            
-            for oind,opponent in enumerate(opponents):
-                for pind,pSet in enumerate(self.players[opponent].sets[colour]):
-                    for cind,card in enumerate(pSet.properties):
-                        cards[oind,pind,cind] = card.id
-                    full_set[oind,pind] = pSet.isCompleted()
-                
-            opponent_property[colour]["cards"] = cards
-            opponent_property[colour]["full_set"] = full_set
-        
-        # Observe opponent money
-        opponent_money = np.zeros((NUM_OPPONENTS,NUM_UNIQUE_CARDS), dtype=np.int8)
-        for oind,opponent in enumerate(opponents):
-            for card in self.players[opponent].money:
-                opponent_money[oind,card.id] += 1
+        observation["hand"][:] = player.hand
+
+        # Observe properties, money, opponent properties and opponent money:
+        # every seat's board and bank are rows of SeatArrays, gathered into
+        # the flat buffer in one copy each (see seat_gather). Opponent rows
+        # past the live opponents (agents already removed at the end of a
+        # game) read as empty.
+        buffer = self.observation_buffers[agent]
+        gather = seat_gather(self.num_players, (player.seat, *opponent_seats(self.players, self.agents, agent)), self.observation_extras)
+        buffer[gather.board_dst] = self.seats.boards.ravel()[gather.board_src]
+        buffer[gather.completed_dst] = self.seats.completed.ravel()[gather.completed_src]
+        buffer[gather.money_dst] = np.frombuffer(self.seats.money, dtype=np.int8)[gather.money_src]
+        if len(gather.blank_zero):
+            buffer[gather.blank_cards] = -1
+            buffer[gather.blank_zero] = 0
         
         # Observe actions left
-        actions_left = self.actions_left[agent]
+        observation["actions_left"][...] = self.actions_left[agent]
+
+        # Observe the payment bundles on offer (only to the defender choosing)
+        payment_bundles = observation["payment_bundles"]
+        payment_bundles.fill(0)
+        if agent == self.agent_selection and self.pending is not None and "bundles" in self.pending:
+            bundles = self.pending["bundles"]
+            if bundles:
+                payment_bundles[:len(bundles)] = bundles
 
         # Observe discard pile
-        discard_pile = np.zeros((NUM_UNIQUE_CARDS), dtype=np.int8)
-        for card in self.deck.discard_pile:
-            discard_pile[card.id] += 1
+        observation["discard_pile"][:] = self.deck.discard_counts
         
         # Observe action context
-        action_context = self.action_context
-
-        self.observations[agent]["observation"] = {
-            "hand": hand,
-            "property": property,
-            "money": money,
-            "opponent_property": opponent_property,
-            "opponent_money": opponent_money,
-            "actions_left": actions_left,
-            "discard_pile": discard_pile,
-            "action_context": action_context
-        }
+        observation["action_context"][:] = self.action_context
+
+        # Optional fields
+        if "unseen_cards" in observation:
+            observation["unseen_cards"][:] = self.seats.unseenRow(player.seat)
+        if "action_history" in observation:
+            history = observation["action_history"]
+            history[:] = self.action_history[HISTORY_ORDER[self.history_position]]
+            seats = history[:, HIST_ACTOR:HIST_TARGET+1]
+            seats[:] = gather.relative_seat[seats]
+
+        if self.features:
+            self._write_features(agent)
+
         return self.observations[agent]
+
+    def observe_flat(self, agent):
+        """
+        Observe `agent` and return its flat int8 observation buffer. The
+        buffer is stable for the episode, so torch.from_numpy() / DLPack on it
+        shares memory with the env; see observation_layout for field offsets.
+        """
+        self.observe(agent)
+        return self.observation_buffers[agent]
+
+    def _canonicalize(self):
+        for player in self.players.values():
+            player.canonicalize()
+
+    def to_canonical(self, agent, colour, set_index):
+        """
+        With canonical_slots: the set_index that `agent`'s slot of `colour`
+        (a SET_LENGTH name) chosen at set_index during the last step has now
+        been sorted to. from_canonical() is the inverse.
+        """
+        return self.players[agent].toCanonical(colour, set_index)
+
+    def from_canonical(self, agent, colour, set_index):
+        return self.players[agent].fromCanonical(colour, set_index)
+
+    def features_flat(self, agent):
+        """
+        Strategic features of `agent` (see Features.py) in its float32
+        feature buffer, which is stable for the episode like observe_flat()'s.
+        Needs MonopolyDeal(features=True).
+        """
+        return self._write_features(agent)
+
+    def _write_features(self, agent):
+        player = self.players[agent]
+        order = (player.seat, *opponent_seats(self.players, self.agents, agent))
+        return write_features(self.feature_buffers[agent], self.seats, order, player.hand, self.seats.unseenRow(player.seat))
+
+    def action_mask_flat(self, agent):
+        """Flat int8 action mask buffer of `agent` (layout: action_mask_layout)."""
+        return self.action_mask_buffers[agent]
         
     def reset_action_context(self):
-        action_context = {
-            "decision": np.int8(-1),
-            "action": np.int8(-1),
-            "hand_card": np.int8(-1),
-            "target_ID": np.int8(-1),
-            "opponent_ID": np.int8(-1),
-            "opponent_property": {
-                "colour": np.int8(-1),
-                "set_index": np.int8(-1),
-                "card": np.int8(-1)
-            },
-            "opponent_set": {
-                "colour": np.int8(-1),
-                "set_index": np.int8(-1)
-            },
-            "my_property": {
-                "colour": np.int8(-1),
-                "set_index": np.int8(-1),
-                "card": np.int8(-1)
-            },
-            "my_set": {
-                "colour": np.int8(-1),
-                "set_index": np.int8(-1)
-            }
-        }
+        # one fill over the preallocated context, no per-field objects
+        self.action_context[:] = ACTION_CONTEXT_RESET
+
+    def unseen_cards(self, agent):
+        """
+        Zero-copy int8 view of the cards `agent` has not seen, by card id:
+        the deck plus every opponent's hand, as far as `agent` can tell.
+        Maintained incrementally (see SeatArrays), so this is O(1).
+        """
+        return self.seats.unseenArray()[self.players[agent].seat]
+
+    def action_context_view(self):
+        """Zero-copy int8 numpy view of action_context (offsets: CTX_* in mappings)."""
+        return np.frombuffer(self.action_context, dtype=np.int8)
+
+    def state_hash(self):
+        """
+        64-bit Zobrist hash of the game state: every player's hand and bank
+        counts and board (colour, slot, position, card), the discard pile,
+        actions_left, whose decision it is, action_context (decision code and
+        the sub-choices made so far) and pending. Hands, banks, boards and
+        the discard pile are hashed incrementally by Player / Deck; the few
+        scalars are folded in here. Keys are fixed (Zobrist.py), so hashes
+        are comparable across processes. The deck's order is not hashed.
+        """
+        h = self.deck.zobrist
+        for agent, player in self.players.items():
+            h ^= player.zobrist ^ player.keys().actions_left[self.actions_left[agent]]
+        h ^= self.players[self.agent_selection].keys().to_act
+        for offset, value in enumerate(self.action_context):
+            h ^= CONTEXT_KEYS[offset][value + 1]
+        return h ^ pending_key(self.pending, self.agent_name_mapping)
 
-        return action_context
-                        
     def render(self, mode):
+        if self.renderer is None:
+            return
         self.renderer.render(mode, self._get_internal_state())
+
+    # Attributes that are configuration or shared between games, and so stay
+    # on a suspended env; everything else in __dict__ is game state.
+    _NOT_SUSPENDED = (
+        "possible_agents", "agent_name_mapping", "render_mode", "renderer",
+        "reward_fn", "max_steps", "payment", "num_players", "observation_extras", "features",
+        "canonical_slots", "suspended", "_observation_spaces", "_action_spaces",
+    )
+
+    def suspend(self):
+        """
+        Compact mode for parked games: pickle the game state into
+        self.suspended (zlib-compressed, a few KB) and drop the live objects,
+        i.e. the 2x90 PropertySets, hands, deck and observation buffers.
+        Cards pickle as ids (Card.__reduce__). Call resume() before touching
+        the env again.
+
+        Only suspended games are small: python Memory.py measures ~3.4 KB per
+        suspended 2-player game against ~75 KB live, of which the
+        PropertySets are ~27 KB and the nested observation views ~25 KB. A
+        per-game budget under 20 KB holds for suspended games only.
+        """
+        # observations are views into observation_buffers, which observe()
+        # rebuilds from scratch, _action_mask is scratch space and
+        # _fresh_observation a cache, so none of them are worth keeping
+        self.__dict__.pop("observations", None)
+        self.__dict__.pop("observation_buffers", None)
+        self.__dict__.pop("feature_buffers", None)
+        self.__dict__.pop("_action_mask", None)
+        self.__dict__.pop("_fresh_observation", None)
+        state = {name: value for name, value in self.__dict__.items() if name not in self._NOT_SUSPENDED}
+        # rebuilt rather than deleted from: a dict never shrinks its table,
+        # and the live game's one is several times what the config needs
+        kept = {name: value for name, value in self.__dict__.items() if name in self._NOT_SUSPENDED}
+        self.__dict__.clear()
+        self.__dict__.update(kept)
+        self.suspended = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def resume(self):
+        """Inverse of suspend(): unpack the game state and rebuild the observation views."""
+        self.__dict__.update(pickle.loads(zlib.decompress(self.suspended)))
+        self.suspended = None
+
+        self.observation_buffers = {agent: self.observation_layout.empty() for agent in self.possible_agents}
+        self._build_feature_buffers()
+        self._build_observation_views()
+        self._action_mask = ActionMask(num_players=self.num_players)
+        self._fresh_observation = None
     
     def _get_internal_state(self):
         return self.players, self.agents, self.agent_selection, self.deck, self.action_context
\ No newline at end of file
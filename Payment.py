@@ -0,0 +1,115 @@
+from functools import lru_cache
+
+import numpy as np
+
+from cardsdb import CARDS_BY_ID
+from mappings import *
+
+MAX_CARD_VALUE = max(card.value for card in CARDS_BY_ID.values())
+
+# card ids worth each value, lowest id first; zero-value cards are never paid
+IDS_BY_VALUE = [[card_id for card_id, card in sorted(CARDS_BY_ID.items()) if card.value == value]
+                for value in range(MAX_CARD_VALUE + 1)]
+
+
+@lru_cache(maxsize=4096)
+def subset_sums(value_counts):
+    """
+    Subset-sum table over a bank given as value_counts[v] = cards worth v.
+
+    Returns {total: per-value counts} for every reachable total, keeping the
+    combination with the fewest cards for each. Memoized on the counts, so
+    banks that recur across payments and games are solved once.
+    """
+    table = {0: (0,) * len(value_counts)}
+    for value, count in enumerate(value_counts):
+        if value == 0 or count == 0:
+            continue
+        extended = dict(table)
+        for total, used in table.items():
+            for n in range(1, count + 1):
+                new_total = total + n * value
+                new_used = used[:value] + (n,) + used[value+1:]
+                best = extended.get(new_total)
+                if best is None or sum(new_used) < sum(best):
+                    extended[new_total] = new_used
+        table = extended
+    return table
+
+
+def bank_value_counts(money):
+    # bank count vector (by card id) → cards held per value
+    value_counts = [0] * (MAX_CARD_VALUE + 1)
+    for card_id, count in enumerate(money):
+        if count:
+            value_counts[CARDS_BY_ID[card_id].value] += count
+    return tuple(value_counts)
+
+
+def plan_payment(money, amount):
+    """
+    Card ids to pay `amount` out of the bank count vector `money`
+    (Player.money): the combination with the least overpay, then the fewest
+    cards. A bank worth less than `amount` pays everything it can.
+    """
+    table = subset_sums(bank_value_counts(money))
+
+    covering = [total for total in table if total >= amount]
+    used = table[min(covering) if covering else max(table)]
+    return bundle_card_ids(money, used)
+
+
+@lru_cache(maxsize=4096)
+def _bundles(value_counts, amount, limit):
+    values = np.array([value for value, count in enumerate(value_counts) if value and count])
+    if len(values) == 0:
+        return ()
+    counts = np.array([value_counts[value] for value in values])
+
+    if counts @ values < amount:
+        # the whole bank is short: the only payment is all of it
+        chosen = counts[None, :]
+    else:
+        # A minimal bundle never holds more than (amount-1)//v + 1 cards of
+        # value v, which bounds the grid by the amount owed, not the bank.
+        counts = np.minimum(counts, (amount - 1) // values + 1)
+
+        # every candidate sub-multiset by value, one row each
+        grids = np.indices(counts + 1).reshape(len(values), -1).T
+        totals = grids @ values
+
+        # covering and minimal: dropping the cheapest card used leaves it short
+        cheapest = np.where(grids > 0, values, np.iinfo(values.dtype).max).min(axis=1)
+        keep = (totals >= amount) & (totals - cheapest < amount)
+        chosen, totals = grids[keep], totals[keep]
+        order = np.lexsort((chosen.sum(axis=1), totals))[:limit]
+        chosen = chosen[order]
+
+    bundles = np.zeros((len(chosen), MAX_CARD_VALUE + 1), dtype=np.int8)
+    bundles[:, values] = chosen
+    return tuple(tuple(bundle) for bundle in bundles.tolist())
+
+
+def payment_bundles(money, amount, limit=MAX_PAYMENT_BUNDLES):
+    """
+    The distinct ways to pay `amount` out of the bank count vector `money`,
+    as per-value card counts. Bundles are deduplicated by the values paid
+    (which cards of a value go is immaterial), cover the amount, and are
+    minimal: leaving out any one card would fall short. At most `limit` are
+    returned, least overpay then fewest cards first. A bank worth less than
+    `amount` has a single bundle, all of it.
+    """
+    return _bundles(bank_value_counts(money), amount, limit)
+
+
+def bundle_card_ids(money, used):
+    """Card ids out of `money` that make up the per-value counts `used`."""
+    card_ids = []
+    for value, n in enumerate(used):
+        for card_id in IDS_BY_VALUE[value]:
+            if n == 0:
+                break
+            take = min(n, money[card_id])
+            card_ids += [card_id] * take
+            n -= take
+    return card_ids
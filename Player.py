@@ -1,20 +1,125 @@
-import copy
+from array import array
+from operator import attrgetter
+
+import numpy as np
 
 from PropertySet import *
 from Card import *
+from cardsdb import ALL_CARDS, CARDS_BY_ID
+from Features import EMPTY_SEAT_FEATURES, FEATURE_BANK, FEATURE_COMPLETED, FEATURE_HAND_SIZE, FEATURE_NEEDED, FEATURE_RENT, FEATURE_SETS_TO_WIN
+from LegalMoves import BoardTree
 from mappings import *
+from Zobrist import seat_keys, set_key
+
+EMPTY_COUNTS = array("b", [0]*NUM_UNIQUE_CARDS)
+# copies of each card id in a full deck
+DECK_COUNTS = array("b", np.bincount([card.id for card in ALL_CARDS], minlength=NUM_UNIQUE_CARDS).tolist())
+
+# card ids by kind, for the hand queries below
+MONEY_IDS = [card_id for card_id, card in sorted(CARDS_BY_ID.items()) if isinstance(card, MoneyCard)]
+RENT_IDS = [card_id for card_id, card in sorted(CARDS_BY_ID.items()) if isinstance(card, RentCard)]
+CARD_IDS = {card.name: card_id for card_id, card in CARDS_BY_ID.items()}
+COLOUR_IDS = {colour: cind for cind, colour in enumerate(SET_LENGTH)}
+NO_COMPLETED_SETS = {colour: 0 for colour in SET_LENGTH}
+CARD_ID = attrgetter("id")
+
+def slot_sort_key(pSet):
+    # canonical slot order: non-empty slots first, by their (sorted) card ids
+    return (not pSet.properties, [card.id for card in pSet.properties])
+
+class SeatArrays:
+    """
+    The public per-player state of a game (banks and boards) stacked along a
+    leading seat axis, so opponent observations and masks are single NumPy
+    operations over every seat instead of per-player Python loops. Each
+    Player writes its own row through views taken in bindSeat().
+
+    unseen holds, per seat, the cards that seat has not seen: those still in
+    the deck or in an opponent's hand. It is kept by events rather than
+    recounted: a draw is seen by the drawer (Player.addHandCards), a card
+    leaving a hand is seen by everyone else (reveal), and a reshuffled
+    discard pile is unseen again (reshuffled, called by Deck.draw).
+    """
+
+    def __init__(self, num_players):
+        self.num_players = num_players
+        # array.array so the per-player memoryview rows read plain ints
+        self.money = array("b", bytes(num_players * NUM_UNIQUE_CARDS))
+        # card id at each (colour, set_index, position), -1 where empty
+        self.boards = np.full((num_players, NUM_UNIQUE_COLOURS, MAX_SETS_PER_PROPERTY, MAX_SET_SIZE), -1, dtype=np.int8)
+        self.completed = np.zeros((num_players, NUM_UNIQUE_COLOURS, MAX_SETS_PER_PROPERTY), dtype=np.bool_)
+        # cards held and rent charged by each slot, and each seat's row of
+        # strategic features (Features.py) kept up to date from them
+        self.slot_size = np.zeros((num_players, NUM_UNIQUE_COLOURS, MAX_SETS_PER_PROPERTY), dtype=np.int8)
+        self.slot_rent = np.zeros((num_players, NUM_UNIQUE_COLOURS, MAX_SETS_PER_PROPERTY), dtype=np.int8)
+        self.features = np.tile(EMPTY_SEAT_FEATURES, (num_players, 1))
+        self.unseen = DECK_COUNTS * num_players
+
+    def clear(self):
+        # every seat's bank, board and features empty, and the whole deck
+        # unseen by all, in one pass per array (see Player.clear)
+        self.money[:] = EMPTY_COUNTS * self.num_players
+        self.boards.fill(-1)
+        self.completed.fill(False)
+        self.slot_size.fill(0)
+        self.slot_rent.fill(0)
+        self.features[:] = EMPTY_SEAT_FEATURES
+        self.unseen[:] = DECK_COUNTS * self.num_players
+
+    def moneyRow(self, seat):
+        return memoryview(self.money)[seat*NUM_UNIQUE_CARDS:(seat+1)*NUM_UNIQUE_CARDS]
+
+    def moneyArray(self):
+        # (num_players, NUM_UNIQUE_CARDS) zero-copy numpy view of every bank
+        return np.frombuffer(self.money, dtype=np.int8).reshape(self.num_players, NUM_UNIQUE_CARDS)
+
+    def unseenRow(self, seat):
+        return memoryview(self.unseen)[seat*NUM_UNIQUE_CARDS:(seat+1)*NUM_UNIQUE_CARDS]
+
+    def unseenArray(self):
+        # (num_players, NUM_UNIQUE_CARDS) zero-copy numpy view of every seat's unseen counts
+        return np.frombuffer(self.unseen, dtype=np.int8).reshape(self.num_players, NUM_UNIQUE_CARDS)
+
+    def reveal(self, seat, card_id):
+        # a card left seat's hand face up: every other seat has now seen it
+        unseen = self.unseen
+        for other in range(self.num_players):
+            if other != seat:
+                unseen[other*NUM_UNIQUE_CARDS + card_id] -= 1
+
+    def reshuffled(self, discard_counts):
+        # the discard pile went back into the deck, unseen by everyone
+        self.unseenArray()[:] += np.frombuffer(discard_counts, dtype=np.int8)
+
+    def hasProperty(self, seats):
+        return (self.boards[seats, :, :, 0] >= 0).any(axis=(1, 2))
+
+    def hasMoney(self, seats):
+        return self.moneyArray()[seats].any(axis=1)
+
+    def hasSet(self, seats):
+        return self.completed[seats].any(axis=(1, 2))
+
 
 class Player:
-    def __init__(self, name, deck):
+    def __init__(self, name, deck, seat=0, seats=None):
         # initialise name, empty hand, empty properties, empty money
+        # hand and money are count vectors indexed by card id; hand_size and
+        # bank_value are kept in step with them. money and the board arrays
+        # are rows of the game's SeatArrays (a private one if none is given).
         self.name = name
-        self.hand = []
-        self.money = []
+        self.hand = array("b", EMPTY_COUNTS)
+        self.hand_size = 0
+        self.bank_value = 0
         self.deck = deck
 
-        # draw 5 cards to hand
-        cards = self.deck.getCards(5)
-        self.hand += cards
+        # Zobrist hash of hand, bank and board, updated by every mutator
+        # below (see Zobrist.py); seat picks this player's key tables
+        self.seat = seat
+        self.zobrist = 0
+
+        self.seats = seats if seats is not None else SeatArrays(seat + 1)
+        self.bindSeat()
 
         self.sets = {
             colour: [PropertySet(colour,maxSize),PropertySet(colour,maxSize),PropertySet(colour,maxSize),
@@ -22,48 +127,234 @@ class Player:
                      PropertySet(colour,maxSize),PropertySet(colour,maxSize),PropertySet(colour,maxSize)] for colour,maxSize in SET_LENGTH.items()
         }
 
+        # completed sets per colour, kept in step with every board mutation
+        # below so win detection never has to rescan the 90 PropertySets
+        self.completed_sets = {colour: 0 for colour in SET_LENGTH}
+        self.num_completed_colours = 0
+
+        # bumped by every board mutator; invalidates the cached BoardTree
+        self.board_version = 0
+        self._tree = None
+
+        # canonical slot order (see canonicalize): colours changed since
+        # the last canonicalize(), and the slot moves it made
+        self.canonical = False
+        self.dirty_colours = set()
+        self.slot_moves = {}
+
+        # draw 5 cards to hand
+        self.addHandCards(self.deck.getCards(5))
+
+    def reset(self):
+        # Start a new game with the same objects: empty hand, bank and every
+        # PropertySet in place, then draw 5.
+        self.clear()
+        self.addHandCards(self.deck.getCards(5))
+
+    def clear(self, seat_rows=True):
+        # empty hand, bank and board, without drawing (see Scenario).
+        # seat_rows=False leaves this player's SeatArrays rows alone, for
+        # callers that clear every seat at once with SeatArrays.clear()
+        # afterwards (the occupied slots are read from board_size first)
+        self.hand[:] = EMPTY_COUNTS
+        self.hand_size = 0
+        self.bank_value = 0
+        # only the occupied slots, as board_size records them
+        cinds, set_indices = self.board_size.nonzero()
+        for cind, set_index in zip(cinds.tolist(), set_indices.tolist()):
+            self.sets[COLOUR_MAPPING[cind]][set_index].clearSet()
+        self.completed_sets.update(NO_COMPLETED_SETS)
+        self.num_completed_colours = 0
+        self.board_version += 1
+        self.dirty_colours.clear()
+        self.slot_moves.clear()
+        self.zobrist = 0
+        if seat_rows:
+            self.money[:] = EMPTY_COUNTS
+            self.seats.unseenRow(self.seat)[:] = DECK_COUNTS
+            self.board_cards.fill(-1)
+            self.board_completed.fill(False)
+            self.board_size.fill(0)
+            self.board_rent.fill(0)
+            self.feature_row[:] = EMPTY_SEAT_FEATURES
+
     def __repr__(self):
         return self.name
 
+    def keys(self):
+        return seat_keys(self.seat)
+
+    def bindSeat(self):
+        # views of this player's rows in the SeatArrays
+        self.money = self.seats.moneyRow(self.seat)
+        self.board_cards = self.seats.boards[self.seat]
+        self.board_completed = self.seats.completed[self.seat]
+        self.board_size = self.seats.slot_size[self.seat]
+        self.board_rent = self.seats.slot_rent[self.seat]
+        self.feature_row = self.seats.features[self.seat]
+
+    def __getstate__(self):
+        # the cached BoardTree is derived state, rebuilt on demand; the seat
+        # views would pickle as copies, so they are re-taken on unpickling
+        state = self.__dict__.copy()
+        state["_tree"] = None
+        for name in ("money", "board_cards", "board_completed", "board_size", "board_rent", "feature_row"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.bindSeat()
+
+    def boardTree(self):
+        # Array form of the board (see LegalMoves.BoardTree), rebuilt only
+        # after the board has changed.
+        if self._tree is None or self._tree.version != self.board_version:
+            self._tree = BoardTree(self)
+        return self._tree
+
     def drawTwo(self):
-        cards = self.deck.getCards(2)
-        self.hand += cards
+        self.addHandCards(self.deck.getCards(2))
+
+    def addHandCards(self, cards):
+        keys = self.keys().hand
+        unseen = self.seats.unseen
+        base = self.seat * NUM_UNIQUE_CARDS
+        for card in cards:
+            count = self.hand[card.id]
+            self.zobrist ^= keys[card.id][count] ^ keys[card.id][count+1]
+            self.hand[card.id] = count + 1
+            unseen[base + card.id] -= 1
+        self.hand_size += len(cards)
+        self.feature_row[FEATURE_HAND_SIZE] = self.hand_size
 
     def removeHandCardById(self, card_id):
-        for i,card in enumerate(self.hand):
-            if card.id == card_id:
-                return self.hand.pop(i)
+        count = self.hand[card_id]
+        if count:
+            keys = self.keys().hand[card_id]
+            self.zobrist ^= keys[count] ^ keys[count-1]
+            self.hand[card_id] = count - 1
+            self.hand_size -= 1
+            self.feature_row[FEATURE_HAND_SIZE] = self.hand_size
+            # every card leaves a hand face up (played, banked or discarded)
+            self.seats.reveal(self.seat, card_id)
+            return CARDS_BY_ID[card_id]
     
     def removeHandCard(self, card):
-        for hand_card in self.hand:
-            if hand_card.id == card.id:
-                self.hand.remove(hand_card)
-                break
+        self.removeHandCardById(card.id)
 
     def getHandCardById(self, card_id):
-        for i,card in enumerate(self.hand):
-            if card.id == card_id:
-                return copy.deepcopy(card)
+        if self.hand[card_id]:
+            return CARDS_BY_ID[card_id]
+
+    def handCards(self):
+        # the hand as card objects, one per copy held
+        return [CARDS_BY_ID[card_id] for card_id, count in enumerate(self.hand) for _ in range(count)]
+
+    def moneyCards(self):
+        # the bank as card objects, one per copy held
+        return [CARDS_BY_ID[card_id] for card_id, count in enumerate(self.money) for _ in range(count)]
 
     def removeProperty(self, colour, set_index, card):
         pSet = self.sets[colour][set_index]
+        was_completed = pSet.isCompleted()
+        self.zobrist ^= self.setKey(colour, set_index)
         pSet.removeProperty(card)
+        self.slotChanged(colour, set_index)
+        self.updateCompleted(colour, was_completed, pSet.isCompleted())
 
     def addProperty(self, colour, set_index, card):
         pSet = self.sets[colour][set_index]
+        was_completed = pSet.isCompleted()
+        self.zobrist ^= self.setKey(colour, set_index)
         pSet.addProperty(card)
+        self.slotChanged(colour, set_index)
+        self.updateCompleted(colour, was_completed, pSet.isCompleted())
 
     def removePropertyById(self, colour, set_index, card):
         pSet = self.sets[colour][set_index]
         for i,pCard in enumerate(pSet.properties):
             if pCard.id == card:
-                return pSet.properties.pop(i)
+                was_completed = pSet.isCompleted()
+                self.zobrist ^= self.setKey(colour, set_index)
+                pCard = pSet.properties.pop(i)
+                self.slotChanged(colour, set_index)
+                self.updateCompleted(colour, was_completed, pSet.isCompleted())
+                return pCard
+
+    def setKey(self, colour, set_index):
+        # Zobrist key of one slot's current contents
+        return set_key(self.keys(), COLOUR_IDS[colour], set_index, self.sets[colour][set_index])
+
+    def slotChanged(self, colour, set_index):
+        # After a slot's contents changed (its old key already XORed out):
+        # hash the new contents, refresh the slot's seat-array rows and
+        # invalidate the BoardTree.
+        cind = COLOUR_IDS[colour]
+        pSet = self.sets[colour][set_index]
+        self.zobrist ^= set_key(self.keys(), cind, set_index, pSet)
+        row = self.board_cards[cind, set_index]
+        row.fill(-1)
+        for position, card in enumerate(pSet.properties):
+            row[position] = card.id
+        self.board_completed[cind, set_index] = pSet.isCompleted()
+        self.board_size[cind, set_index] = len(pSet.properties)
+        self.board_rent[cind, set_index] = pSet.rentValue()
+        features = self.feature_row
+        features[FEATURE_NEEDED + cind] = max(SET_LENGTH[colour] - self.board_size[cind].max(), 0)
+        features[FEATURE_RENT + cind] = self.board_rent[cind].max()
+        self.board_version += 1
+        if self.canonical:
+            self.dirty_colours.add(colour)
+
+    def canonicalize(self):
+        """
+        Put every colour changed since the last call back in canonical
+        order: its slots sorted by slot_sort_key (non-empty first) and each
+        slot's cards by id, so equal boards are laid out, observed, masked
+        and hashed identically whichever set_index the cards went to.
+
+        MonopolyDeal(canonical_slots=True) calls this once per step, after
+        the action has resolved, so set indices chosen for the step stay
+        valid while it resolves. slot_moves then maps, per re-sorted colour,
+        each new set_index to the one it came from (see toCanonical /
+        fromCanonical).
+        """
+        self.slot_moves.clear()
+        for colour in list(self.dirty_colours):
+            pSets = self.sets[colour]
+            before = [(pSet, [card.id for card in pSet.properties]) for pSet in pSets]
+            old_keys = [self.setKey(colour, set_index) for set_index in range(MAX_SETS_PER_PROPERTY)]
+            for pSet in pSets:
+                pSet.properties.sort(key=CARD_ID)
+            order = sorted(range(MAX_SETS_PER_PROPERTY), key=lambda set_index: slot_sort_key(pSets[set_index]))
+            pSets[:] = [pSets[set_index] for set_index in order]
+
+            moved = False
+            for set_index, pSet in enumerate(pSets):
+                if pSet is not before[set_index][0] or [card.id for card in pSet.properties] != before[set_index][1]:
+                    self.zobrist ^= old_keys[set_index]
+                    self.slotChanged(colour, set_index)
+                    moved = True
+            if moved:
+                self.slot_moves[colour] = order
+        self.dirty_colours.clear()
+
+    def toCanonical(self, colour, set_index):
+        # where the slot at set_index before the last canonicalize() is now
+        order = self.slot_moves.get(colour)
+        return set_index if order is None else order.index(set_index)
+
+    def fromCanonical(self, colour, set_index):
+        # where the slot now at set_index was before the last canonicalize()
+        order = self.slot_moves.get(colour)
+        return set_index if order is None else order[set_index]
 
     def getPropertyById(self, colour, set_index, card):
         pSet = self.sets[colour][set_index]
         for i,pCard in enumerate(pSet.properties):
             if pCard.id == card:
-                return copy.deepcopy(pCard)
+                return pCard
 
     def removeSetByID(self, colour, set_index):
         # Detach the populated PropertySet from this player and replace its
@@ -72,103 +363,106 @@ class Player:
         # critical, otherwise the new owner's slot and our slot would point
         # at the same object and any later mutation would leak across.
         pSet = self.sets[colour][set_index]
+        self.zobrist ^= self.setKey(colour, set_index)
         self.sets[colour][set_index] = PropertySet(colour, pSet.maxSize)
+        self.slotChanged(colour, set_index)
+        self.updateCompleted(colour, pSet.isCompleted(), False)
         return pSet
 
+    def addSet(self, colour, pSet):
+        # Place a whole PropertySet (taken with Deal Breaker) into the first
+        # empty slot of its colour.
+        for pind, slot in enumerate(self.sets[colour]):
+            if slot.isEmpty():
+                self.sets[colour][pind] = pSet
+                self.slotChanged(colour, pind)
+                self.updateCompleted(colour, False, pSet.isCompleted())
+                return pind
+
+    def updateCompleted(self, colour, was_completed, is_completed):
+        if was_completed == is_completed:
+            return
+        if is_completed:
+            self.completed_sets[colour] += 1
+            if self.completed_sets[colour] == 1:
+                self.num_completed_colours += 1
+        else:
+            self.completed_sets[colour] -= 1
+            if self.completed_sets[colour] == 0:
+                self.num_completed_colours -= 1
+        self.feature_row[FEATURE_COMPLETED + COLOUR_IDS[colour]] = self.completed_sets[colour]
+        self.feature_row[FEATURE_SETS_TO_WIN] = max(SETS_TO_WIN - self.num_completed_colours, 0)
+
+    def hasWon(self):
+        return self.num_completed_colours >= SETS_TO_WIN
+
     def addMoney(self, card):
-        self.money.append(card)
+        count = self.money[card.id]
+        keys = self.keys().money[card.id]
+        self.zobrist ^= keys[count] ^ keys[count+1]
+        self.money[card.id] = count + 1
+        self.bank_value += card.value
+        self.feature_row[FEATURE_BANK] = self.bank_value
 
     def removeMoney(self, card):
-        self.money.remove(card)
+        self.removeMoneyById(card.id)
+
+    def removeMoneyById(self, card_id):
+        count = self.money[card_id]
+        if count:
+            keys = self.keys().money[card_id]
+            self.zobrist ^= keys[count] ^ keys[count-1]
+            self.money[card_id] = count - 1
+            card = CARDS_BY_ID[card_id]
+            self.bank_value -= card.value
+            self.feature_row[FEATURE_BANK] = self.bank_value
+            return card
 
     def hasAtLeastOnePropertyOnBoard(self):
-        for colour,pSets in self.sets.items():
-            for pSet in pSets:
-                if pSet.properties:
-                    return True
-        return False
+        # from the slot sizes, so it needs no BoardTree rebuild
+        return bool(self.board_size.any())
     
     def hasAtLeastOneNonWildPropertyOnBoard(self):
-        for colour,pSets in self.sets.items():
-            for pSet in pSets:
-                if pSet.properties and not pSet.isOnlyWild():
-                    return True
-        return False
+        return bool(self.boardTree().has_non_wild.any())
     
     def hasAtLeastOneMoneyOnBoard(self):
-        if self.money:
-            return True
-        return False
+        return self.money != EMPTY_COUNTS
     
     def hasAtLeastOneSetOnBoard(self):
-        for colour,pSets in self.sets.items():
-            for pSet in pSets:
-                if pSet.isCompleted():
-                    return True
-        return False
+        return self.num_completed_colours > 0
 
     def whichColoursOnBoard(self):
-        colours = set()
-        for colour,pSets in self.sets.items():
-            for pSet in pSets:
-                if not pSet.isEmpty() and not pSet.isOnlyWild():
-                    colours.add(colour)
-                    break
-        return colours
+        has_non_wild = self.boardTree().has_non_wild.any(axis=1)
+        return {colour for cind,colour in enumerate(SET_LENGTH) if has_non_wild[cind]}
 
     def hasMoneyInHand(self):
-        for card in self.hand:
-            if isinstance(card,MoneyCard):
-                return True
-        return False
+        return any(self.hand[card_id] for card_id in MONEY_IDS)
         
     def hasPropertyInHand(self):
-        for card in self.hand:
-            if isinstance(card,PropertyCard):
-                return True
-        return False
+        return any(self.hand[:NUM_UNIQUE_PROPERTY_CARDS])
     
     def hasWildPropertyInHand(self):
-        for card in self.hand:
-            if isinstance(card,PropertyCard) and card.isWild():
-                return True
-        return False
+        return self.hand[CARD_IDS["Wild"]] > 0
 
     def hasSlyDeal(self):
-        for card in self.hand:
-            if card.name == "Sly Deal":
-                return True
-        return False
+        return self.hand[CARD_IDS["Sly Deal"]] > 0
     
     def hasForcedDeal(self):
-        for card in self.hand:
-            if card.name == "Forced Deal":
-                return True
-        return False
+        return self.hand[CARD_IDS["Forced Deal"]] > 0
 
     def hasDebtCollector(self):
-        for card in self.hand:
-            if card.name == "Debt Collector":
-                return True
-        return False
+        return self.hand[CARD_IDS["Debt Collector"]] > 0
 
     def hasItsMyBirthday(self):
-        for card in self.hand:
-            if card.name == "It's My Birthday":
-                return True
-        return False
+        return self.hand[CARD_IDS["It's My Birthday"]] > 0
 
     def hasDealBreaker(self):
-        for card in self.hand:
-            if card.name == "Deal Breaker":
-                return True
-        return False
+        return self.hand[CARD_IDS["Deal Breaker"]] > 0
 
     def whichRentColoursInHand(self):
         colours = set()
-        for card in self.hand:
-            if isinstance(card,RentCard):
-                for c in card.colours:
-                    colours.add(c)
+        for card_id in RENT_IDS:
+            if self.hand[card_id]:
+                colours.update(CARDS_BY_ID[card_id].colours)
         
-        return colours
\ No newline at end of file
+        return colours
@@ -0,0 +1,34 @@
+import numpy as np
+
+
+def sample_masked(mask, rng):
+    """
+    Sample one action from a (possibly nested) action mask dict, picking
+    uniformly among the unmasked entries of every component. A component with
+    nothing unmasked gets 0, the same as gym's Discrete.sample on an all-zero
+    mask.
+    """
+    if isinstance(mask, dict):
+        return {key: sample_masked(value, rng) for key, value in mask.items()}
+
+    legal = np.flatnonzero(mask)
+    if len(legal) == 0:
+        return 0
+    return int(legal[rng.integers(len(legal))])
+
+
+class RandomPolicy():
+    """
+    Opponent policy that plays uniformly random legal actions.
+
+    Policies are called with a list of observations (as returned by
+    MonopolyDeal.observe, i.e. {"observation": ..., "action_mask": ...}) and
+    return one action per observation, so a network can be swapped in and
+    run the whole list as a single batch.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, observations):
+        return [sample_masked(observation["action_mask"], self.rng) for observation in observations]
@@ -1,6 +1,8 @@
 from Card import *
 
 class PropertySet:
+    __slots__ = ("properties", "colour", "maxSize", "hasHouse", "hasHotel")
+
     def __init__(self, colour, maxSize):
         self.properties = []
         self.colour = colour
@@ -29,8 +31,9 @@ class PropertySet:
                 return self.properties.remove(p)
 
     def clearSet(self):
-        for property in self.properties:
-            self.removeProperty(property)
+        self.properties.clear()
+        self.hasHouse = False
+        self.hasHotel = False
 
     def rentValue(self):
         # Caveat: wild-only sets (empty or all pure-wild contents) earn no rent.
@@ -1,9 +1,35 @@
+import sys
+
+import numpy as np
 from rich.console import Console
 from rich.table import Table
 from rich.text import Text
 
 from mappings import *
 from Card import *
+from cardsdb import CARDS_BY_ID
+
+def card_style(card):
+    if isinstance(card, MoneyCard):
+        return "green"
+    elif isinstance(card, RentCard):
+        return "white"
+    elif isinstance(card, ActionCard):
+        return "red"
+    elif isinstance(card, PropertyCard):
+        return COLOUR_STYLE_MAP[card.colours[0]]
+
+
+def hand_order(card):
+    if isinstance(card, MoneyCard):
+        return 3
+    elif isinstance(card, RentCard):
+        return 2
+    elif isinstance(card, ActionCard):
+        return 1
+    elif isinstance(card, PropertyCard):
+        return 0
+
 
 class Render():
     def __init__(self):
@@ -24,9 +50,9 @@ class Render():
             print("Deck Size: " + str(deck.deckSize()))
             print("Discard Size: " + str(deck.discardSize()))
             print("")
-            self.render_hand(player.hand)
+            self.render_hand(player.handCards())
             print("")
-            self.render_money(player.money)
+            self.render_money(player.moneyCards())
             print("")
             print("Properties: ")
             self.render_properties(player.sets)
@@ -36,9 +62,9 @@ class Render():
             print("Deck Size: " + str(deck.deckSize()))
             print("Discard Size: " + str(deck.discardSize()))
             print("")
-            self.render_hand(player.hand)
+            self.render_hand(player.handCards())
             print("")
-            self.render_money(player.money)
+            self.render_money(player.moneyCards())
             print("")
             print("Properties: ")
             self.render_properties(player.sets)
@@ -50,7 +76,6 @@ class Render():
             self.render_discard(player, action_context)
 
     def render_properties(self, sets):
-        console = Console()
         table = Table(show_lines=True)
 
         table.add_column("PropertySet")
@@ -74,7 +99,7 @@ class Render():
                     
             table.add_row(*row)
 
-        console.print(table)
+        self.console.print(table)
 
     def render_hand(self, hand):
         # Sort cards
@@ -114,81 +139,65 @@ class Render():
         self.console.print(table)
 
     def render_action(self, agents, action_context):
-        console = Console()
-
         table = Table(title="Action", show_lines=True)
         table.add_column("Field", style="bold cyan")
         table.add_column("Value")
 
         # Always show action
-        action = action_context["action"]
+        action = action_context[CTX_ACTION]
         table.add_row("Action:", f"{ACTION_DESCRIPTION[action]}")
 
         if action == 0:
             pass
         elif action == 1:
-            table.add_row("Card:", f"{CARD_MAPPING[action_context["my_property"]["card"]]}")
-            table.add_row("Moved to Colour:", COLOUR_MAPPING[action_context["my_set"]["colour"]])
-            table.add_row("Moved to Set:", str(action_context["my_set"]["set_index"]))
+            table.add_row("Card:", f"{CARD_MAPPING[action_context[CTX_MY_PROPERTY_CARD]]}")
+            table.add_row("Moved to Colour:", COLOUR_MAPPING[action_context[CTX_MY_SET_COLOUR]])
+            table.add_row("Moved to Set:", str(action_context[CTX_MY_SET_INDEX]))
         elif action == 2:
-            card_ID = action_context["hand_card"]
+            card_ID = action_context[CTX_HAND_CARD]
             table.add_row("Card:", f"{CARD_MAPPING[card_ID]}")
         elif action in [3,4]:
-            card_ID = action_context["hand_card"]
+            card_ID = action_context[CTX_HAND_CARD]
             table.add_row("Card:", f"{CARD_MAPPING[card_ID]}")
-            table.add_row("Played to Colour:", COLOUR_MAPPING[action_context["my_set"]["colour"]])
-            table.add_row("Played to Set:", str(action_context["my_set"]["set_index"]))
+            table.add_row("Played to Colour:", COLOUR_MAPPING[action_context[CTX_MY_SET_COLOUR]])
+            table.add_row("Played to Set:", str(action_context[CTX_MY_SET_INDEX]))
         elif action == 5:
-            table.add_row("Opponent:", f"{agents[action_context["opponent_ID"]]}")
-            card_ID = action_context["opponent_property"]["card"]
+            table.add_row("Opponent:", f"{agents[action_context[CTX_OPPONENT_ID]]}")
+            card_ID = action_context[CTX_OPPONENT_PROPERTY_CARD]
             table.add_row("Stealing:", f"{CARD_MAPPING[card_ID]}")
-            table.add_row("Played to Colour:", COLOUR_MAPPING[action_context["my_set"]["colour"]])
-            table.add_row("Played to Set:", str(action_context["my_set"]["set_index"]))
+            table.add_row("Played to Colour:", COLOUR_MAPPING[action_context[CTX_MY_SET_COLOUR]])
+            table.add_row("Played to Set:", str(action_context[CTX_MY_SET_INDEX]))
         elif action == 6:
-            table.add_row("Opponent:", f"{agents[action_context["opponent_ID"]]}")
-            card_ID = action_context["my_property"]["card"]
+            table.add_row("Opponent:", f"{agents[action_context[CTX_OPPONENT_ID]]}")
+            card_ID = action_context[CTX_MY_PROPERTY_CARD]
             table.add_row("Swapping:", f"{CARD_MAPPING[card_ID]}")
-            card_ID = action_context["opponent_property"]["card"]
+            card_ID = action_context[CTX_OPPONENT_PROPERTY_CARD]
             table.add_row("For:", f"{CARD_MAPPING[card_ID]}")
-            table.add_row("Played to Colour:", COLOUR_MAPPING[action_context["my_set"]["colour"]])
-            table.add_row("Played to Set:", str(action_context["my_set"]["set_index"]))
+            table.add_row("Played to Colour:", COLOUR_MAPPING[action_context[CTX_MY_SET_COLOUR]])
+            table.add_row("Played to Set:", str(action_context[CTX_MY_SET_INDEX]))
         elif action in [7,8]:
-            table.add_row("Opponent:", f"{agents[action_context["opponent_ID"]]}")
+            table.add_row("Opponent:", f"{agents[action_context[CTX_OPPONENT_ID]]}")
         elif action == 9:
-            table.add_row("Opponent:", f"{agents[action_context["opponent_ID"]]}")
-            table.add_row("Stealing Colour:", COLOUR_MAPPING[action_context["opponent_set"]["colour"]])
-            table.add_row("Stealing Set:", str(action_context["opponent_set"]["set_index"]))
+            table.add_row("Opponent:", f"{agents[action_context[CTX_OPPONENT_ID]]}")
+            table.add_row("Stealing Colour:", COLOUR_MAPPING[action_context[CTX_OPPONENT_SET_COLOUR]])
+            table.add_row("Stealing Set:", str(action_context[CTX_OPPONENT_SET_INDEX]))
         elif action in [10,11,12,13,14]:
-            table.add_row("On Colour:", COLOUR_MAPPING[action_context["my_set"]["colour"]])
-            table.add_row("On Set:", str(action_context["my_set"]["set_index"]))
+            table.add_row("On Colour:", COLOUR_MAPPING[action_context[CTX_MY_SET_COLOUR]])
+            table.add_row("On Set:", str(action_context[CTX_MY_SET_INDEX]))
         elif action == 15:
-            table.add_row("Opponent:", f"{agents[action_context["opponent_ID"]]}")
-            table.add_row("On Colour:", COLOUR_MAPPING[action_context["my_set"]["colour"]])
-            table.add_row("On Set:", str(action_context["my_set"]["set_index"]))
+            table.add_row("Opponent:", f"{agents[action_context[CTX_OPPONENT_ID]]}")
+            table.add_row("On Colour:", COLOUR_MAPPING[action_context[CTX_MY_SET_COLOUR]])
+            table.add_row("On Set:", str(action_context[CTX_MY_SET_INDEX]))
         elif action in [16]:
             pass
         
-        console.print(table)
+        self.console.print(table)
 
     def get_card_style(self, card):
-        if isinstance(card, MoneyCard):
-            return "green"
-        elif isinstance(card, RentCard):
-            return "white"
-        elif isinstance(card, ActionCard):
-            return "red"
-        elif isinstance(card, PropertyCard):
-            return COLOUR_STYLE_MAP[card.colours[0]]
+        return card_style(card)
         
     def sort_hand(self, card):
-        if isinstance(card, MoneyCard):
-            return 3
-        elif isinstance(card, RentCard):
-            return 2
-        elif isinstance(card, ActionCard):
-            return 1
-        elif isinstance(card, PropertyCard):
-            return 0
+        return hand_order(card)
         
     def sort_money(self, card):
         if isinstance(card, MoneyCard):
@@ -201,11 +210,153 @@ class Render():
             return 3
         
     def render_discard(self, player, action_context):
-        card_ID = action_context["hand_card"]
+        card_ID = action_context[CTX_HAND_CARD]
         card = player.getHandCardById(card_ID)
         style = self.get_card_style(card)
         
         line = Text(f"DISCARD: ")
         line.append(f"[{card.name}]", style=style)
 
-        self.console.print(line)
\ No newline at end of file
+        self.console.print(line)
+
+
+# ANSI SGR codes for the rich style names in COLOUR_STYLE_MAP / card_style
+ANSI_CODES = {
+    "blue": "34",
+    "dark_goldenrod": "38;5;136",
+    "bright_green": "92",
+    "green": "32",
+    "cyan": "36",
+    "red": "31",
+    "yellow": "33",
+    "bright_red": "91",
+    "bright_magenta": "95",
+    "grey54": "38;5;245",
+    "bright_white": "97",
+    "white": "37",
+}
+
+
+def ansi(text, style):
+    return f"\x1b[{ANSI_CODES[style]}m{text}\x1b[0m"
+
+
+# CARD_TEXT[colour][card_id]: the card's name, ANSI-coloured or plain
+CARD_NAMES = [CARDS_BY_ID[card_id].name for card_id in range(NUM_UNIQUE_CARDS)]
+CARD_TEXT = {
+    False: CARD_NAMES,
+    True: [ansi(name, card_style(CARDS_BY_ID[card_id])) for card_id, name in enumerate(CARD_NAMES)],
+}
+COLOUR_TEXT = {
+    False: list(SET_LENGTH),
+    True: [ansi(colour, COLOUR_STYLE_MAP[colour]) for colour in SET_LENGTH],
+}
+# card ids in Render.sort_hand order (properties, actions, rents, money)
+HAND_ORDER = sorted(CARDS_BY_ID, key=lambda card_id: (hand_order(CARDS_BY_ID[card_id]), card_id))
+# and in Render.sort_money order (money, rents, actions, properties)
+MONEY_ORDER = sorted(CARDS_BY_ID, key=lambda card_id: (3 - hand_order(CARDS_BY_ID[card_id]), card_id))
+
+# Render.render_action's rows per action: (label, context offset, kind)
+ACTION_ROWS = {
+    1: (("Card", CTX_MY_PROPERTY_CARD, "card"), ("Moved to Colour", CTX_MY_SET_COLOUR, "colour"),
+        ("Moved to Set", CTX_MY_SET_INDEX, "index")),
+    2: (("Card", CTX_HAND_CARD, "card"),),
+    3: (("Card", CTX_HAND_CARD, "card"), ("Played to Colour", CTX_MY_SET_COLOUR, "colour"),
+        ("Played to Set", CTX_MY_SET_INDEX, "index")),
+    5: (("Opponent", CTX_OPPONENT_ID, "agent"), ("Stealing", CTX_OPPONENT_PROPERTY_CARD, "card"),
+        ("Played to Colour", CTX_MY_SET_COLOUR, "colour"), ("Played to Set", CTX_MY_SET_INDEX, "index")),
+    6: (("Opponent", CTX_OPPONENT_ID, "agent"), ("Swapping", CTX_MY_PROPERTY_CARD, "card"),
+        ("For", CTX_OPPONENT_PROPERTY_CARD, "card"), ("Played to Colour", CTX_MY_SET_COLOUR, "colour"),
+        ("Played to Set", CTX_MY_SET_INDEX, "index")),
+    7: (("Opponent", CTX_OPPONENT_ID, "agent"),),
+    9: (("Opponent", CTX_OPPONENT_ID, "agent"), ("Stealing Colour", CTX_OPPONENT_SET_COLOUR, "colour"),
+        ("Stealing Set", CTX_OPPONENT_SET_INDEX, "index")),
+    10: (("On Colour", CTX_MY_SET_COLOUR, "colour"), ("On Set", CTX_MY_SET_INDEX, "index")),
+    15: (("Opponent", CTX_OPPONENT_ID, "agent"), ("On Colour", CTX_MY_SET_COLOUR, "colour"),
+         ("On Set", CTX_MY_SET_INDEX, "index")),
+}
+ACTION_ROWS[4] = ACTION_ROWS[3]
+ACTION_ROWS[8] = ACTION_ROWS[7]
+for action in (11, 12, 13, 14):
+    ACTION_ROWS[action] = ACTION_ROWS[10]
+
+
+class TextRender():
+    """
+    Drop-in for Render that formats straight from the count arrays and the
+    SeatArrays board (no rich Table / Console) into one string per call and
+    writes it to `stream` (sys.stdout at call time if None, so stdout
+    capture still works). colour=False gives plain text, True ANSI colours.
+    Only occupied property slots are listed.
+    """
+
+    def __init__(self, colour=True, stream=None):
+        self.colour = colour
+        self.stream = stream
+        self.cards = CARD_TEXT[colour]
+        self.colours = COLOUR_TEXT[colour]
+
+    def render(self, mode, internal_state):
+        players, agents, agent_selection, deck, action_context = internal_state
+        player = players[agent_selection]
+
+        lines = []
+        if mode == 'pre' or mode == 'post':
+            if mode == 'pre':
+                lines.append("-"*20 + str(agent_selection) + "-"*20)
+            lines.append(f"Deck Size: {deck.deckSize()}  Discard Size: {deck.discardSize()}")
+            self.format_player(player, lines)
+            lines.append("")
+        elif mode == 'action':
+            lines.append(self.format_action(agents, action_context))
+        elif mode == 'discard':
+            lines.append("DISCARD: [" + self.cards[action_context[CTX_HAND_CARD]] + "]")
+        if lines:
+            (self.stream or sys.stdout).write("\n".join(lines) + "\n")
+
+    def format_player(self, player, lines):
+        cards = self.cards
+        hand = player.hand
+        lines.append("Hand: " + " ".join(f"[{cards[card_id]}]" for card_id in HAND_ORDER for _ in range(hand[card_id])))
+        money = player.money
+        lines.append("Money: " + (", ".join(f"{cards[card_id]} x{money[card_id]}" for card_id in MONEY_ORDER
+                                            if money[card_id]) or "--"))
+        lines.append("Properties:")
+        sizes = player.board_size
+        for cind, set_index in zip(*np.nonzero(sizes)):
+            row = player.board_cards[cind, set_index, :sizes[cind, set_index]].tolist()
+            pSet = player.sets[COLOUR_MAPPING[cind]][set_index]
+            line = f"  {self.colours[cind]}[{set_index}]: " + ", ".join(cards[card_id] for card_id in row)
+            if pSet.hasHouse:
+                line += " +House"
+            if pSet.hasHotel:
+                line += " +Hotel"
+            if player.board_completed[cind, set_index]:
+                line += " (complete)"
+            lines.append(line)
+        return lines
+
+    def format_action(self, agents, action_context):
+        action = action_context[CTX_ACTION]
+        parts = [f"Action: {ACTION_DESCRIPTION[action]}"]
+        for label, offset, kind in ACTION_ROWS.get(action, ()):
+            value = action_context[offset]
+            if kind == "card":
+                value = self.cards[value]
+            elif kind == "colour":
+                value = COLOUR_MAPPING[value]
+            elif kind == "agent":
+                value = agents[value]
+            parts.append(f"{label}: {value}")
+        return " | ".join(parts)
+
+    def format_table(self, internal_state):
+        """Every player's hand, money and properties, the player to act first."""
+        players, agents, agent_selection, deck, action_context = internal_state
+        lines = [f"Deck Size: {deck.deckSize()}  Discard Size: {deck.discardSize()}"]
+        order = [agent_selection] + [agent for agent in players if agent != agent_selection]
+        for agent in order:
+            lines.append("")
+            lines.append(f"== {agent}" + (" (to act)" if agent == agent_selection else ""))
+            self.format_player(players[agent], lines)
+        return "\n".join(lines)
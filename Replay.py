@@ -0,0 +1,231 @@
+import numpy as np
+
+from Dataset import next_in_trajectory
+from InferenceServer import ACTION_FIELDS, unflatten_action
+from MonopolyDeal import MonopolyDeal
+from mappings import *
+
+
+class SumTree():
+    """
+    Binary sum-tree over `capacity` priorities in one flat array: leaves at
+    [leaves, 2*leaves), node i holds tree[2i] + tree[2i+1], the total is at
+    tree[1]. Updates and prefix-sum lookups take a whole batch at once and
+    cost O(log capacity) vectorized steps.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.leaves = 1 << max(capacity - 1, 0).bit_length()
+        self.depth = self.leaves.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaves)
+
+    def total(self):
+        return self.tree[1]
+
+    def __getitem__(self, indices):
+        return self.tree[self.leaves + np.asarray(indices)]
+
+    def update(self, indices, priorities):
+        # set the leaves (last write wins on repeats), then refresh each
+        # level's touched parents in one pass per level
+        nodes = self.leaves + np.asarray(indices)
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes >> 1)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values, size=None):
+        """
+        Leaf index whose prefix-sum interval contains each value in [0,
+        total). `size` is the number of filled leaves (all of capacity if
+        None), which are [0, size) with non-zero priority.
+        """
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        for _ in range(self.depth):
+            left = self.tree[2 * nodes]
+            right = values >= left
+            values -= np.where(right, left, 0.0)
+            nodes = 2 * nodes + right
+        # rounding can walk past the last non-zero leaf onto an empty one
+        return np.minimum(nodes - self.leaves, (self.capacity if size is None else size) - 1)
+
+
+class ReplayBuffer():
+    """
+    Fixed-capacity prioritized replay, struct-of-arrays: one preallocated
+    array per field (flat int8 observations and action masks in the env's
+    layouts, int16 actions in ACTION_FIELDS order, rewards, done codes), so
+    a transition costs ~1.2 KB rather than a tree of per-field arrays.
+
+    Episodes are added whole (Dataset.record_episode output) and old rows
+    are overwritten first in, first out. A row's next state is the same
+    seat's next decision, stored as a link to that row rather than a second
+    observation; FIFO overwriting guarantees the linked row outlives it.
+
+    Sampling is proportional to priority^alpha via a SumTree, with
+    importance weights (N * P)^-beta normalized by their batch maximum; new
+    rows get the largest priority seen so far. update_priorities() takes a
+    batch of TD errors.
+
+    storage="seed" keeps only each episode's reset seed (and options) and
+    action log; observations and masks are rebuilt on sample by replaying
+    the episode in an env made with env_kwargs, which must match the env
+    that recorded it. Memory per transition drops to a few dozen bytes at
+    the cost of replaying the sampled episodes.
+
+    Rows are sized by the layouts of an env made with env_kwargs, so
+    observation_extras there widen the stored observations in either mode.
+    """
+
+    def __init__(self, capacity, num_players=NUM_PLAYERS, alpha=0.6, beta=0.4, epsilon=1e-6,
+                 storage="full", env_kwargs=None, seed=None):
+        if storage not in ("full", "seed"):
+            raise ValueError(f"Unknown storage {storage!r}")
+        self.capacity = capacity
+        self.num_players = num_players
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self.storage = storage
+        self.rng = np.random.default_rng(seed)
+
+        # the layouts of the configured env, extras included
+        env = MonopolyDeal(num_players=num_players, **(env_kwargs or {}))
+        self.observation_layout = env.observation_layout
+        self.action_mask_layout = env.action_mask_layout
+        if storage == "full":
+            self.observation = np.zeros((capacity, self.observation_layout.size), dtype=np.int8)
+            self.action_mask = np.zeros((capacity, self.action_mask_layout.size), dtype=np.int8)
+        else:
+            # episode id and decision number of every row, and per live
+            # episode its (seed, options, action log, live row count)
+            self.episode = np.zeros(capacity, dtype=np.int64)
+            self.step = np.zeros(capacity, dtype=np.int32)
+            self.episodes = {}
+            self.env = env
+        self.action = np.zeros((capacity, len(ACTION_FIELDS)), dtype=np.int16)
+        self.reward = np.zeros(capacity, dtype=np.float32)
+        self.done = np.zeros(capacity, dtype=np.int8)
+        self.next_row = np.full(capacity, -1, dtype=np.int64)
+
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+        self.size = 0
+        self.position = 0
+        self.num_episodes = 0
+
+    def __len__(self):
+        return self.size
+
+    def add_episode(self, episode, seed=None, options=None):
+        """Add every row of one recorded episode. Seed storage needs the
+        seed (and options) the episode was reset with."""
+        if self.storage == "seed" and seed is None:
+            raise ValueError("seed storage needs the episode's reset seed")
+        rows = len(episode["decision"])
+        if rows > self.capacity:
+            raise ValueError(f"episode of {rows} rows does not fit in capacity {self.capacity}")
+        slots = (self.position + np.arange(rows)) % self.capacity
+
+        if self.storage == "full":
+            self.observation[slots] = episode["observation"]
+            self.action_mask[slots] = episode["action_mask"]
+        else:
+            # until the buffer is full, rows [0, size) are the occupied ones
+            self._release(slots[slots < self.size])
+            self.episode[slots] = self.num_episodes
+            self.step[slots] = np.arange(rows)
+            self.episodes[self.num_episodes] = [seed, options, np.asarray(episode["action"], dtype=np.int16), rows]
+        self.action[slots] = episode["action"]
+        self.reward[slots] = episode["reward"]
+        self.done[slots] = episode["done"]
+        following = next_in_trajectory(np.zeros(rows, dtype=np.int64), np.asarray(episode["seat"]))
+        self.next_row[slots] = np.where(following >= 0, slots[np.maximum(following, 0)], -1)
+
+        self.tree.update(slots, self.max_priority ** self.alpha)
+        self.position = (self.position + rows) % self.capacity
+        self.size = min(self.size + rows, self.capacity)
+        self.num_episodes += 1
+
+    def _release(self, slots):
+        # rows about to be overwritten: drop episodes with no rows left
+        if not len(slots):
+            return
+        ids, counts = np.unique(self.episode[slots], return_counts=True)
+        for episode_id, count in zip(ids.tolist(), counts.tolist()):
+            entry = self.episodes[episode_id]
+            entry[3] -= count
+            if entry[3] <= 0:
+                del self.episodes[episode_id]
+
+    def sample(self, batch_size):
+        """
+        (indices, batch, weights): batch holds observation, action_mask,
+        action, reward, done, next_observation, next_action_mask (zeros at
+        a trajectory end) and has_next, one row per index.
+        """
+        total = self.tree.total()
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+        indices = self.tree.find(values, self.size)
+
+        probabilities = self.tree[indices] / total
+        weights = (self.size * probabilities) ** -self.beta
+        weights /= weights.max()
+
+        next_rows = self.next_row[indices]
+        has_next = next_rows >= 0
+        next_observation = np.zeros((batch_size, self.observation_layout.size), dtype=np.int8)
+        next_action_mask = np.zeros((batch_size, self.action_mask_layout.size), dtype=np.int8)
+        if self.storage == "full":
+            observation, action_mask = self.observation[indices], self.action_mask[indices]
+            next_observation[has_next] = self.observation[next_rows[has_next]]
+            next_action_mask[has_next] = self.action_mask[next_rows[has_next]]
+        else:
+            observation, action_mask = self._replay(np.concatenate([indices, next_rows[has_next]]))
+            next_observation[has_next] = observation[batch_size:]
+            next_action_mask[has_next] = action_mask[batch_size:]
+            observation, action_mask = observation[:batch_size], action_mask[:batch_size]
+
+        batch = {
+            "observation": observation,
+            "action_mask": action_mask,
+            "action": self.action[indices],
+            "reward": self.reward[indices],
+            "done": self.done[indices],
+            "next_observation": next_observation,
+            "next_action_mask": next_action_mask,
+            "has_next": has_next,
+        }
+        return indices, batch, weights.astype(np.float32)
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
+
+    def _replay(self, indices):
+        # Rebuild the flat observation / mask of each row by replaying its
+        # episode once, up to the last decision any of the rows needs.
+        observation = np.zeros((len(indices), self.observation_layout.size), dtype=np.int8)
+        action_mask = np.zeros((len(indices), self.action_mask_layout.size), dtype=np.int8)
+        episodes = self.episode[indices]
+        steps = self.step[indices]
+        env = self.env
+        for episode_id in np.unique(episodes).tolist():
+            seed, options, actions, live = self.episodes[episode_id]
+            wanted = np.flatnonzero(episodes == episode_id)
+            wanted = wanted[np.argsort(steps[wanted], kind="stable")]
+            env.reset(seed=seed, options=options)
+            position = 0
+            for step in range(int(steps[wanted[-1]]) + 1):
+                while position < len(wanted) and steps[wanted[position]] == step:
+                    agent = env.agent_selection
+                    observation[wanted[position]] = env.observe_flat(agent)
+                    action_mask[wanted[position]] = env.action_mask_flat(agent)
+                    position += 1
+                if position == len(wanted):
+                    break
+                env.step(unflatten_action(actions[step]))
+        return observation, action_mask
@@ -0,0 +1,60 @@
+class Reward():
+    """
+    Reward hook called by MonopolyDeal at the end of every step.
+
+    reset(env) is called once per episode, after the players are dealt.
+    __call__(env, winner) returns a reward per live agent for the step that
+    just ran; winner is the agent that completed its sets on this step, or
+    None. Hooks should only read the O(1) counters kept on Player (e.g.
+    num_completed_colours) so they stay cheap enough to run every step.
+    """
+
+    def reset(self, env):
+        pass
+
+    def __call__(self, env, winner):
+        return {agent: 0 for agent in env.agents}
+
+
+class TerminalReward(Reward):
+    """
+    +win to the winner, +loss to everyone else, 0 on every other step.
+    """
+
+    def __init__(self, win=1.0, loss=-1.0):
+        self.win = win
+        self.loss = loss
+
+    def __call__(self, env, winner):
+        if winner is None:
+            return {agent: 0 for agent in env.agents}
+        return {agent: self.win if agent == winner else self.loss for agent in env.agents}
+
+
+class ShapedReward(TerminalReward):
+    """
+    Terminal reward plus scale * (potential after step - potential before step).
+
+    potential(player) should be cheap; the default is the number of completed
+    colours, which Player maintains incrementally.
+    """
+
+    def __init__(self, scale=0.1, potential=None, win=1.0, loss=-1.0):
+        super().__init__(win, loss)
+        self.scale = scale
+        self.potential = potential if potential is not None else self.completed_colours
+        self.last_potential = {}
+
+    def completed_colours(self, player):
+        return player.num_completed_colours
+
+    def reset(self, env):
+        self.last_potential = {agent: self.potential(env.players[agent]) for agent in env.agents}
+
+    def __call__(self, env, winner):
+        rewards = super().__call__(env, winner)
+        for agent in env.agents:
+            potential = self.potential(env.players[agent])
+            rewards[agent] += self.scale * (potential - self.last_potential[agent])
+            self.last_potential[agent] = potential
+        return rewards
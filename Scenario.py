@@ -0,0 +1,226 @@
+import numpy as np
+
+from cardsdb import ALL_CARDS, CARDS_BY_ID
+from LegalMoves import PLACEMENT
+from Player import CARD_IDS, COLOUR_IDS
+from Zobrist import PENDING_TYPES
+from mappings import *
+
+# copies of each card id in a full deck; every position accounts for exactly these
+TEMPLATE_COUNTS = np.bincount([card.id for card in ALL_CARDS], minlength=NUM_UNIQUE_CARDS)
+
+
+def card_id(card):
+    """Card id from a card name (Card.name, e.g. "Just Say No") or an id."""
+    if isinstance(card, str):
+        if card not in CARD_IDS:
+            raise ValueError(f"Unknown card {card!r}")
+        return CARD_IDS[card]
+    if not 0 <= card < NUM_UNIQUE_CARDS:
+        raise ValueError(f"Card id {card} out of range")
+    return int(card)
+
+
+def _counts(cards):
+    counts = np.zeros(NUM_UNIQUE_CARDS, dtype=np.int64)
+    for card in cards:
+        counts[card_id(card)] += 1
+    return counts
+
+
+class Scenario():
+    """
+    Declarative starting position, compiled straight into env state by
+    MonopolyDeal.reset(options={"scenario": scenario}) instead of dealing.
+
+    players: one dict per seat (possible_agents order), any of
+        "hand": list of cards, or an int to deal that many at random (default 5)
+        "bank": list of cards, or an int to bank that many at random (default 0)
+        "sets": {colour: [slot, ...]}, slot i (a list of property cards) is
+                set_index i; an empty list leaves that slot empty
+    Cards are names or ids (see card_id). Random cards come from whatever the
+    spec leaves unused; the rest of those form the deck, in random order.
+
+    to_act: seat whose turn it is, with actions_left (1-3) actions to play.
+    order: turn order of the seats, default 0, 1, ...
+    deck_top: cards drawn next, first drawn first.
+    discard: the discard pile.
+    pending: a defender phase in flight, attacked by to_act:
+        {"type": "PAYMENT", "defenders": [seat, ...], "amount": M}
+        {"type": "FORCED_DEAL_PLACEMENT", "defender": seat, "card": card}
+    The forced-deal card is in transit, so it is not listed anywhere else.
+
+    The spec is checked once, on compile(); build() then makes any number of
+    positions from it with one set of array operations (see ScenarioBatch).
+    """
+
+    def __init__(self, players, to_act=0, order=None, actions_left=3, deck_top=(), discard=(), pending=None):
+        self.players = players
+        self.num_players = len(players)
+        self.to_act = to_act
+        self.order = list(order) if order is not None else list(range(self.num_players))
+        self.actions_left = actions_left
+        self.deck_top = [card_id(card) for card in deck_top]
+        self.discard = [card_id(card) for card in discard]
+        self.pending = dict(pending) if pending is not None else None
+        if self.pending is not None and "card" in self.pending:
+            self.pending["card"] = card_id(self.pending["card"])
+        self._compiled = None
+
+    def compile(self):
+        """Validate the spec and lay out its fixed part as arrays; cached."""
+        if self._compiled is None:
+            self._compiled = self._compile()
+        return self._compiled
+
+    def _compile(self):
+        P = self.num_players
+        if not MIN_PLAYERS <= P <= MAX_PLAYERS:
+            raise ValueError(f"Scenario needs {MIN_PLAYERS}-{MAX_PLAYERS} players, got {P}")
+        if sorted(self.order) != list(range(P)):
+            raise ValueError(f"order {self.order} is not a permutation of the seats")
+        if not 0 <= self.to_act < P:
+            raise ValueError(f"to_act seat {self.to_act} out of range")
+        if not 1 <= self.actions_left <= 3:
+            raise ValueError(f"actions_left must be 1-3, got {self.actions_left}")
+
+        hands = np.zeros((P, NUM_UNIQUE_CARDS), dtype=np.int64)
+        banks = np.zeros((P, NUM_UNIQUE_CARDS), dtype=np.int64)
+        boards = np.full((P, NUM_UNIQUE_COLOURS, MAX_SETS_PER_PROPERTY, MAX_SET_SIZE), -1, dtype=np.int8)
+        random_hand = np.zeros(P, dtype=np.int64)
+        random_bank = np.zeros(P, dtype=np.int64)
+        used = _counts(self.deck_top + self.discard)
+
+        for seat, spec in enumerate(self.players):
+            unknown = set(spec) - {"hand", "bank", "sets"}
+            if unknown:
+                raise ValueError(f"Unknown player fields {sorted(unknown)} for seat {seat}")
+            for name, counts, random_counts, default in (("hand", hands, random_hand, 5), ("bank", banks, random_bank, 0)):
+                cards = spec.get(name, default)
+                if isinstance(cards, int):
+                    random_counts[seat] = cards
+                else:
+                    counts[seat] = _counts(cards)
+            used += hands[seat] + banks[seat]
+
+            completed = set()
+            for colour, slots in spec.get("sets", {}).items():
+                if colour not in COLOUR_IDS:
+                    raise ValueError(f"Unknown colour {colour!r}")
+                cind = COLOUR_IDS[colour]
+                if len(slots) > MAX_SETS_PER_PROPERTY:
+                    raise ValueError(f"{colour}: at most {MAX_SETS_PER_PROPERTY} sets")
+                for set_index, slot in enumerate(slots):
+                    if len(slot) > SET_LENGTH[colour]:
+                        raise ValueError(f"{colour} set {set_index} holds {len(slot)} cards, a full set is {SET_LENGTH[colour]}")
+                    for position, card in enumerate(slot):
+                        cid = card_id(card)
+                        if cid >= NUM_UNIQUE_PROPERTY_CARDS or not PLACEMENT[cid, cind]:
+                            raise ValueError(f"{CARDS_BY_ID[cid].name} cannot be placed in a {colour} set")
+                        boards[seat, cind, set_index, position] = cid
+                        used[cid] += 1
+                    if len(slot) == SET_LENGTH[colour]:
+                        completed.add(colour)
+            if len(completed) >= SETS_TO_WIN:
+                raise ValueError(f"Seat {seat} has already won")
+
+        if self.pending is not None:
+            used += self._check_pending()
+
+        over = np.flatnonzero(used > TEMPLATE_COUNTS)
+        if len(over):
+            raise ValueError(f"More copies than the deck holds of {[CARDS_BY_ID[i].name for i in over]}")
+        pool = np.repeat(np.arange(NUM_UNIQUE_CARDS, dtype=np.int8), TEMPLATE_COUNTS - used)
+        if random_hand.sum() + random_bank.sum() > len(pool):
+            raise ValueError(f"Only {len(pool)} cards are left to deal at random")
+
+        return {
+            "hands": hands.astype(np.int8),
+            "banks": banks.astype(np.int8),
+            "boards": boards,
+            "pool": pool,
+            # which hand (seat) / bank (P + seat) each randomly dealt card goes to
+            "random_owner": np.repeat(np.arange(2 * P), np.concatenate([random_hand, random_bank])),
+        }
+
+    def _check_pending(self):
+        # returns the counts of cards the pending action holds in transit
+        pending = self.pending
+        seats = range(self.num_players)
+        if pending.get("type") not in PENDING_TYPES:
+            raise ValueError(f"pending type must be one of {PENDING_TYPES}")
+        if pending["type"] == "PAYMENT":
+            defenders = pending["defenders"]
+            if not defenders or any(seat not in seats or seat == self.to_act for seat in defenders):
+                raise ValueError(f"Bad payment defenders {defenders}")
+            if pending["amount"] <= 0:
+                raise ValueError("Payment amount must be positive")
+            return _counts([])
+        if pending["defender"] not in seats or pending["defender"] == self.to_act:
+            raise ValueError(f"Bad forced deal defender {pending['defender']}")
+        if card_id(pending["card"]) >= NUM_UNIQUE_PROPERTY_CARDS:
+            raise ValueError("A forced deal moves a property card")
+        return _counts([pending["card"]])
+
+    def build(self, n=1, rng=None):
+        """n positions from this spec as a ScenarioBatch, random parts drawn from rng."""
+        return ScenarioBatch(self, n, rng)
+
+
+class ScenarioBatch():
+    """
+    n positions of one Scenario, struct-of-arrays:
+        hands, banks: (n, num_players, NUM_UNIQUE_CARDS) int8 card counts
+        decks:        (n, deck size) int8 card ids, last one drawn first
+        boards:       (num_players, colour, set_index, position) card ids,
+                      -1 where empty, shared by every row
+    The random hands / banks and the deck order of every row are drawn with
+    one argsort over random keys, so building is array work, not per-game
+    Python. Load row i into an env with
+    env.reset(options={"scenario": batch, "row": i}).
+    """
+
+    def __init__(self, scenario, n, rng=None):
+        compiled = scenario.compile()
+        rng = rng if rng is not None else np.random.default_rng()
+        P = scenario.num_players
+        pool = compiled["pool"]
+        owner = compiled["random_owner"]
+        dealt = len(owner)
+
+        self.scenario = scenario
+        self.boards = compiled["boards"]
+
+        # one random permutation of the unused cards per row: the first
+        # `dealt` go to the random hands / banks, the rest are the deck
+        shuffled = pool[np.argsort(rng.random((n, len(pool)), dtype=np.float32), axis=1)]
+
+        # counts via one bincount over (row, hand or bank, card id)
+        index = (np.arange(n)[:, None] * (2 * P) + owner) * NUM_UNIQUE_CARDS + shuffled[:, :dealt]
+        random_counts = np.bincount(index.ravel(), minlength=n * 2 * P * NUM_UNIQUE_CARDS).astype(np.int8)
+        random_counts = random_counts.reshape(n, 2, P, NUM_UNIQUE_CARDS)
+        self.hands = compiled["hands"] + random_counts[:, 0]
+        self.banks = compiled["banks"] + random_counts[:, 1]
+
+        deck_top = np.array(scenario.deck_top[::-1], dtype=np.int8)
+        self.decks = np.concatenate([shuffled[:, dealt:], np.broadcast_to(deck_top, (n, len(deck_top)))], axis=1)
+
+    def __len__(self):
+        return len(self.hands)
+
+    def validate(self):
+        """
+        Per-row check, vectorized over the batch: every card of the deck is
+        in exactly one place (hands, banks, boards, deck, discard pile or in
+        transit). Returns a bool array, True for valid rows.
+        """
+        n = len(self)
+        fixed = np.bincount(self.boards[self.boards >= 0], minlength=NUM_UNIQUE_CARDS)
+        fixed += _counts(self.scenario.discard)
+        if self.scenario.pending is not None and self.scenario.pending["type"] == "FORCED_DEAL_PLACEMENT":
+            fixed += _counts([self.scenario.pending["card"]])
+
+        index = np.arange(n)[:, None] * NUM_UNIQUE_CARDS + self.decks
+        deck_counts = np.bincount(index.ravel(), minlength=n * NUM_UNIQUE_CARDS).reshape(n, NUM_UNIQUE_CARDS)
+        total = self.hands.sum(axis=1, dtype=np.int64) + self.banks.sum(axis=1, dtype=np.int64) + deck_counts + fixed
+        return (total == TEMPLATE_COUNTS).all(axis=1)
@@ -0,0 +1,197 @@
+from copy import deepcopy
+
+import gymnasium as gym
+import numpy as np
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space, concatenate, create_empty_array
+
+from MonopolyDeal import MonopolyDeal
+from ActionMask import action_mask_space
+from Policy import RandomPolicy
+
+
+def play_opponents(envs, policy):
+    """
+    Step every opponent seat of every SingleAgentEnv in `envs` until each one
+    is back on its learner's decision or finished.
+
+    Opponent decisions are gathered across all envs and passed to `policy` as
+    one list per round, so a network-backed policy runs one batched forward
+    pass per round instead of one per game per sub-decision.
+    """
+    while True:
+        waiting = [env for env in envs if env.needs_opponent()]
+        if not waiting:
+            return
+
+        observations = [env.env.observe(env.env.agent_selection) for env in waiting]
+        actions = policy(observations)
+        for env, action in zip(waiting, actions):
+            env.env.step(action)
+
+
+class SingleAgentEnv(gym.Env):
+    """
+    gymnasium.Env view of MonopolyDeal from a single learner seat.
+
+    Opponent seats (including their defender-phase decisions) are stepped
+    internally with `opponent_policy` (see Policy.py). Observations are the
+    learner's raw observation dict; the action mask for the current decision
+    is returned in info["action_mask"]. Both are copies: the env reuses its
+    observation buffers, so a view would change on the next step.
+    """
+
+    metadata = MonopolyDeal.metadata
+
+    def __init__(self, opponent_policy=None, learner="player_0", **env_kwargs):
+        self.env = MonopolyDeal(**env_kwargs)
+        self.learner = learner
+        self.opponent_policy = opponent_policy if opponent_policy is not None else RandomPolicy()
+
+        self.observation_space = self.env.observation_space(learner)
+        self.action_space = self.env.action_space(learner)
+
+    def needs_opponent(self):
+        return self.env.agent_selection != self.learner and not self.done()
+
+    def done(self):
+        return self.env.terminations[self.learner] or self.env.truncations[self.learner]
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        self.env.reset(seed=seed, options=options)
+        play_opponents([self], self.opponent_policy)
+        observation, _, _, _, info = self.result()
+        return observation, info
+
+    def step(self, action):
+        self.env.step(action)
+        play_opponents([self], self.opponent_policy)
+        return self.result()
+
+    def result(self, copy=True):
+        """(observation, reward, terminated, truncated, info) for the learner,
+        with reward accumulated over every step since its last action.
+        copy=False returns views of the env's buffers, valid until its next
+        step or reset."""
+        env = self.env
+        observation = env.observe(self.learner)
+        if copy:
+            observation = deepcopy(observation)
+        info = dict(env.infos[self.learner])
+        info["action_mask"] = observation["action_mask"]
+        return (
+            observation["observation"],
+            env._cumulative_rewards[self.learner],
+            env.terminations[self.learner],
+            env.truncations[self.learner],
+            info,
+        )
+
+    def render(self):
+        self.env.render(mode='pre')
+
+    def close(self):
+        self.env.close()
+
+
+class VectorSingleAgentEnv(VectorEnv):
+    """
+    num_envs SingleAgentEnvs stepped in lockstep, sharing one opponent policy.
+
+    After the learner actions are applied, opponent decisions from every
+    sub-env are batched into a single policy call per round (see
+    play_opponents). Finished sub-envs are reset in the same step; their last
+    observation and info are kept in infos["final_obs"] / infos["final_info"].
+
+    As in gymnasium's SyncVectorEnv, copy=True returns fresh batches each
+    step; copy=False returns the same preallocated batch arrays, overwritten
+    by the next step or reset. final_obs / final_info are always copies.
+    """
+
+    metadata = {"autoreset_mode": AutoresetMode.SAME_STEP}
+
+    def __init__(self, num_envs, opponent_policy=None, learner="player_0", copy=True, **env_kwargs):
+        self.copy = copy
+        self.opponent_policy = opponent_policy if opponent_policy is not None else RandomPolicy()
+        self.envs = [SingleAgentEnv(self.opponent_policy, learner, **env_kwargs) for _ in range(num_envs)]
+
+        self.num_envs = num_envs
+        self.single_observation_space = self.envs[0].observation_space
+        self.single_action_space = self.envs[0].action_space
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        self.single_action_mask_space = action_mask_space(self.envs[0].env.num_players)
+        self._observations = create_empty_array(self.single_observation_space, num_envs)
+        self._action_masks = create_empty_array(self.single_action_mask_space, num_envs)
+
+    def reset(self, seed=None, options=None):
+        if seed is None:
+            seeds = [None] * self.num_envs
+        elif isinstance(seed, int):
+            seeds = [seed + i for i in range(self.num_envs)]
+        else:
+            seeds = seed
+
+        for env, env_seed in zip(self.envs, seeds):
+            gym.Env.reset(env, seed=env_seed)
+            env.env.reset(seed=env_seed, options=options)
+        play_opponents(self.envs, self.opponent_policy)
+
+        results = [env.result(copy=False) for env in self.envs]
+        return self._output((self._batch(results)[0], self._batch_infos(results)))
+
+    def step(self, actions):
+        for i, env in enumerate(self.envs):
+            env.env.step(self._unbatch(actions, i))
+        play_opponents(self.envs, self.opponent_policy)
+
+        # views: _batch copies them into the batch arrays
+        results = [env.result(copy=False) for env in self.envs]
+
+        # autoreset finished games, then let their opponents open the new
+        # game in one more batched pass
+        finished = [i for i, env in enumerate(self.envs) if env.done()]
+        final_obs = [None] * self.num_envs
+        final_info = [None] * self.num_envs
+        for i in finished:
+            # copied before the reset below overwrites the env's buffers
+            final_obs[i], final_info[i] = deepcopy(results[i][0]), deepcopy(results[i][4])
+            self.envs[i].env.reset()
+        play_opponents([self.envs[i] for i in finished], self.opponent_policy)
+        for i in finished:
+            observation, _, _, _, info = self.envs[i].result(copy=False)
+            results[i] = (observation, results[i][1], results[i][2], results[i][3], info)
+
+        observations, rewards, terminations, truncations = self._batch(results)
+        infos = self._batch_infos(results)
+        if finished:
+            infos["final_obs"] = final_obs
+            infos["final_info"] = final_info
+        return self._output((observations, rewards, terminations, truncations, infos))
+
+    def _output(self, result):
+        return deepcopy(result) if self.copy else result
+
+    def _batch(self, results):
+        observations = concatenate(self.single_observation_space, [r[0] for r in results], self._observations)
+        rewards = np.array([r[1] for r in results], dtype=np.float64)
+        terminations = np.array([r[2] for r in results], dtype=np.bool_)
+        truncations = np.array([r[3] for r in results], dtype=np.bool_)
+        return observations, rewards, terminations, truncations
+
+    def _batch_infos(self, results):
+        masks = concatenate(self.single_action_mask_space, [r[4]["action_mask"] for r in results], self._action_masks)
+        return {"action_mask": masks}
+
+    def _unbatch(self, actions, i):
+        if isinstance(actions, dict):
+            return {key: self._unbatch(value, i) for key, value in actions.items()}
+        if isinstance(actions, (list, tuple)):
+            return actions[i]
+        return actions[i].item() if isinstance(actions, np.ndarray) else actions[i]
+
+    def close_extras(self, **kwargs):
+        for env in self.envs:
+            env.close()
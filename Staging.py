@@ -0,0 +1,67 @@
+import numpy as np
+
+# torch is optional: without it the staging buffers are plain numpy arrays,
+# which still export through DLPack (np.from_dlpack, jax, cupy, ...).
+try:
+    import torch
+except ImportError:
+    torch = None
+
+
+def to_tensor(array):
+    """Zero-copy torch view of a numpy buffer (e.g. MonopolyDeal.observe_flat())."""
+    if torch is None:
+        raise ImportError("to_tensor requires PyTorch")
+    return torch.from_numpy(array)
+
+
+class StagingBuffer():
+    """
+    Reusable batch of flat observations and action masks.
+
+    Rows are written with gather(), one memcpy per env, into buffers that are
+    allocated once. With torch installed and CUDA available the buffers are
+    pinned so tensors().to("cuda", non_blocking=True) is an async copy; on a
+    CPU-only host they are ordinary pageable memory and nothing needs a GPU.
+    Either way observations/action_masks (numpy) and tensors() (torch) share
+    the same storage.
+    """
+
+    def __init__(self, batch_size, observation_size, action_mask_size, pin_memory=None):
+        if pin_memory is None:
+            pin_memory = torch is not None and torch.cuda.is_available()
+        self.pin_memory = pin_memory
+
+        if torch is not None:
+            self._observations = torch.empty((batch_size, observation_size), dtype=torch.int8, pin_memory=pin_memory)
+            self._action_masks = torch.empty((batch_size, action_mask_size), dtype=torch.int8, pin_memory=pin_memory)
+            self.observations = self._observations.numpy()
+            self.action_masks = self._action_masks.numpy()
+        else:
+            self._observations = self._action_masks = None
+            self.observations = np.empty((batch_size, observation_size), dtype=np.int8)
+            self.action_masks = np.empty((batch_size, action_mask_size), dtype=np.int8)
+
+    @classmethod
+    def for_env(cls, env, batch_size, pin_memory=None):
+        return cls(batch_size, env.observation_layout.size, env.action_mask_layout.size, pin_memory)
+
+    def gather(self, envs, agents=None):
+        """
+        Copy the current observation and mask of each env into consecutive
+        rows. agents defaults to each env's agent_selection. Returns the
+        number of rows written.
+        """
+        for row, env in enumerate(envs):
+            agent = env.agent_selection if agents is None else agents[row]
+            np.copyto(self.observations[row], env.observe_flat(agent))
+            np.copyto(self.action_masks[row], env.action_mask_flat(agent))
+        return len(envs)
+
+    def tensors(self, rows=None):
+        """(observations, action_masks) as torch tensors over the staging memory."""
+        if torch is None:
+            raise ImportError("tensors() requires PyTorch; use observations / action_masks or DLPack")
+        if rows is None:
+            return self._observations, self._action_masks
+        return self._observations[:rows], self._action_masks[:rows]
@@ -0,0 +1,115 @@
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from mappings import *
+
+# Keys are drawn from a fixed seed, so hashes agree across processes and runs
+# (for dataset dedup) rather than depending on PYTHONHASHSEED.
+ZOBRIST_SEED = 0x6D6F6E6F706F6C79
+
+MAX_AMOUNT = 64                       # pending payment amounts hash modulo this
+MAX_SEATS = 8                         # seats the pending-defender keys cover
+PENDING_TYPES = ("PAYMENT", "FORCED_DEAL_PLACEMENT")
+
+
+def _keys(stream, *shape):
+    rng = np.random.default_rng([ZOBRIST_SEED, stream])
+    keys = rng.integers(np.iinfo(np.uint64).max, size=shape, dtype=np.uint64, endpoint=True)
+    return keys.tolist()
+
+
+def _count_keys(stream):
+    # keys[card_id][count]; count 0 hashes to 0 so an empty hand/bank/pile is 0
+    keys = _keys(stream, NUM_UNIQUE_CARDS, MAX_ANY_CARD + 1)
+    for card_keys in keys:
+        card_keys[0] = 0
+    return keys
+
+
+class SeatKeys():
+    """Zobrist keys for one seat's hand, bank and board."""
+
+    def __init__(self, seat):
+        self.hand = _count_keys(4 * seat)
+        self.money = _count_keys(4 * seat + 1)
+        # board[colour][set_index][position][card_id]
+        self.board = _keys(4 * seat + 2, NUM_UNIQUE_COLOURS, MAX_SETS_PER_PROPERTY, MAX_SET_SIZE, NUM_UNIQUE_PROPERTY_CARDS)
+        # actions_left (0..3), then "this seat is to act"
+        self.actions_left = _keys(4 * seat + 3, 5)
+        self.to_act = self.actions_left.pop()
+
+
+@lru_cache(maxsize=None)
+def seat_keys(seat):
+    return SeatKeys(seat)
+
+
+# shared keys, in streams clear of the per-seat ones
+DISCARD_KEYS = _count_keys(1000)
+CONTEXT_KEYS = _keys(1001, CTX_SIZE, 128)           # [offset][value + 1]
+PENDING_TYPE_KEYS = dict(zip(PENDING_TYPES, _keys(1002, len(PENDING_TYPES))))
+PENDING_SEAT_KEYS = _keys(1003, MAX_SEATS, MAX_SEATS)   # [attacker, defender 0, ...][seat]
+PENDING_AMOUNT_KEYS = _keys(1004, MAX_AMOUNT)
+PENDING_CARD_KEYS = _keys(1005, NUM_UNIQUE_CARDS)
+
+
+def set_key(keys, colour_ID, set_index, pSet):
+    """XOR of the board keys of every card in one PropertySet slot."""
+    h = 0
+    slot_keys = keys.board[colour_ID][set_index]
+    for position, card in enumerate(pSet.properties):
+        h ^= slot_keys[position][card.id]
+    return h
+
+
+def pending_key(pending, seat_of):
+    """Hash of MonopolyDeal.pending; seat_of maps agent names to seats."""
+    if pending is None:
+        return 0
+    h = PENDING_TYPE_KEYS[pending["type"]] ^ PENDING_SEAT_KEYS[0][seat_of[pending["attacker"]]]
+    for position, defender in enumerate(pending["defenders"]):
+        h ^= PENDING_SEAT_KEYS[1 + position][seat_of[defender]]
+    if "remaining" in pending:
+        h ^= PENDING_AMOUNT_KEYS[pending["remaining"] % MAX_AMOUNT]
+    if "card" in pending:
+        h ^= PENDING_CARD_KEYS[pending["card"].id]
+    return h
+
+
+class TranspositionTable():
+    """
+    Bounded map from state_hash() to any value, evicting the least recently
+    used entry once `capacity` entries are stored.
+    """
+
+    def __init__(self, capacity=1 << 20):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        value = self._entries.get(key, self)
+        if value is self:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,53 @@
+"""Offline dataset benchmark — records BENCH_GAMES self-play games, repeats
+them into a BENCH_ROWS-row dataset in a temporary directory, then times
+n-step returns / GAE over the whole dataset and DataLoader throughput
+(transitions/s, every column) in-process and with BENCH_WORKERS worker
+processes."""
+import os, shutil, tempfile, time
+
+import numpy as np
+
+from Dataset import Dataset, DataLoader, DatasetWriter, gae, n_step_returns, record_episode
+from MonopolyDeal import MonopolyDeal
+from Policy import RandomPolicy
+
+GAMES = int(os.environ.get("BENCH_GAMES", "20"))
+ROWS = int(os.environ.get("BENCH_ROWS", "1000000"))
+WORKERS = int(os.environ.get("BENCH_WORKERS", "2"))
+BATCH = 4096
+
+path = tempfile.mkdtemp(prefix="md_dataset_")
+try:
+    env = MonopolyDeal(render_mode=None, max_steps=500)
+    policy = RandomPolicy(seed=0)
+    start = time.perf_counter()
+    episodes = [record_episode(env, policy, seed=i) for i in range(GAMES)]
+    recorded = sum(len(episode["decision"]) for episode in episodes)
+    print(f"recorded {recorded} transitions in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    with DatasetWriter(path) as writer:
+        while writer.rows < ROWS:
+            writer.add_episode(episodes[writer.episodes % GAMES])
+    elapsed = time.perf_counter() - start
+    dataset = Dataset(path)
+    size = sum(column.nbytes for column in dataset.columns.values())
+    print(f"wrote {len(dataset)} rows ({size / 2**20:.0f} MiB) in {elapsed:.2f}s, {len(dataset) / elapsed:.0f} rows/s")
+
+    start = time.perf_counter()
+    next_index = dataset.next_index()
+    rewards, done = np.asarray(dataset["reward"]), np.asarray(dataset["done"])
+    values = np.zeros(len(dataset))
+    returns = n_step_returns(rewards, values, next_index, done, n=5)
+    advantages, _ = gae(rewards, values, next_index, done)
+    print(f"n-step returns + GAE over {len(dataset)} rows in {time.perf_counter() - start:.2f}s")
+    dataset.add_column("advantage", advantages.astype(np.float32))
+
+    for workers in sorted({0, WORKERS}):
+        loader = DataLoader(path, batch_size=BATCH, workers=workers, seed=0)
+        start = time.perf_counter()
+        rows = sum(len(batch["decision"]) for batch in loader)
+        elapsed = time.perf_counter() - start
+        print(f"DataLoader workers={workers}: {rows / elapsed:10.0f} transitions/s ({rows * size / len(dataset) / elapsed / 2**30:.2f} GiB/s)")
+finally:
+    shutil.rmtree(path)
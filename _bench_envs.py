@@ -0,0 +1,29 @@
+"""Env churn benchmark — how many MonopolyDeal envs can be created, reset,
+queried for their spaces and destroyed per second. Also a regression check
+that destroyed envs are actually freed (nothing, e.g. a per-instance space
+cache, keeps them alive)."""
+import gc, os, sys, time, weakref
+
+from MonopolyDeal import MonopolyDeal
+
+N = int(os.environ.get("BENCH_ENVS", "2000"))
+
+refs = []
+start = time.perf_counter()
+for i in range(N):
+    env = MonopolyDeal(render_mode=None)
+    env.reset(seed=i)
+    for agent in env.possible_agents:
+        env.observation_space(agent)
+        env.action_space(agent)
+    refs.append(weakref.ref(env))
+    del env
+elapsed = time.perf_counter() - start
+
+gc.collect()
+alive = sum(ref() is not None for ref in refs)
+
+print(f"{N / elapsed:.0f} envs/s created+reset+destroyed ({elapsed / N * 1e6:.1f} us each)")
+print(f"{alive} of {N} envs still alive after gc")
+if alive:
+    sys.exit(1)
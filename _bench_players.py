@@ -0,0 +1,38 @@
+"""Player-count benchmark — times step() + observe() for 2..MAX_PLAYERS seats
+with RandomPolicy, plus observe() alone, to show how per-step cost grows with
+the number of opponents now that their boards and banks are read from the
+stacked SeatArrays."""
+import os, time
+
+from MonopolyDeal import MonopolyDeal
+from Policy import RandomPolicy
+from mappings import MIN_PLAYERS, MAX_PLAYERS
+
+N = int(os.environ.get("BENCH_STEPS", "20000"))
+MAX_STEPS = 2000                                        # truncate long games
+
+for num_players in range(MIN_PLAYERS, MAX_PLAYERS + 1):
+    env = MonopolyDeal(render_mode=None, max_steps=MAX_STEPS, num_players=num_players)
+    policy = RandomPolicy(seed=0)
+    env.reset(seed=0)
+
+    step_time = observe_time = 0.0
+    for i in range(N):
+        agent = env.agent_selection
+        if env.terminations[agent] or env.truncations[agent]:
+            env.reset(seed=i)
+            agent = env.agent_selection
+
+        start = time.perf_counter()
+        observation = env.observe(agent)
+        observe_time += time.perf_counter() - start
+
+        action = policy([observation])[0]
+
+        start = time.perf_counter()
+        env.step(action)
+        step_time += time.perf_counter() - start
+
+    print(f"{num_players} players: step {step_time / N * 1e6:6.1f} us  "
+          f"observe {observe_time / N * 1e6:6.1f} us  "
+          f"({N / (step_time + observe_time):.0f} steps/s)")
@@ -0,0 +1,52 @@
+"""Render benchmark — plays one BENCH_STEPS-step self-play game per render
+mode (None, rich "human", TextRender "ansi" and "text"), output discarded,
+and reports the cost per step() on top of render_mode=None; then exports
+BENCH_GAMES recorded games to static HTML replays in a temporary directory
+in-process and on BENCH_WORKERS processes."""
+import contextlib, io, os, shutil, tempfile, time
+
+from rich.console import Console
+
+from Dataset import Dataset, record_games, record_episode
+from HtmlReplay import export_dataset
+from MonopolyDeal import MonopolyDeal
+from Policy import RandomPolicy
+
+STEPS = int(os.environ.get("BENCH_STEPS", "2000"))
+GAMES = int(os.environ.get("BENCH_GAMES", "20"))
+WORKERS = int(os.environ.get("BENCH_WORKERS", "2"))
+
+baseline = None
+for mode in (None, "human", "ansi", "text"):
+    env = MonopolyDeal(render_mode=mode, max_steps=STEPS)
+    sink = io.StringIO()
+    if mode == "human":
+        env.renderer.console = Console(file=sink)
+    elif mode is not None:
+        env.renderer.stream = sink
+    times = []
+    with contextlib.redirect_stdout(sink):
+        # best of 3 after a warm-up game
+        for _ in range(4):
+            start = time.perf_counter()
+            steps = len(record_episode(env, RandomPolicy(seed=0), seed=0)["decision"])
+            times.append(time.perf_counter() - start)
+            sink.seek(0)
+            sink.truncate()
+    per_step = min(times[1:]) / steps * 1e6
+    baseline = per_step if baseline is None else baseline
+    print(f"render_mode={str(mode):5s} {per_step:9.1f} us/step   render {per_step - baseline:9.1f} us/step")
+
+path = tempfile.mkdtemp(prefix="md_replay_")
+try:
+    record_games(path, GAMES, seed=0, max_steps=500)
+    rows = len(Dataset(path))
+    for workers in sorted({0, WORKERS}):
+        start = time.perf_counter()
+        pages = export_dataset(path, os.path.join(path, f"html_{workers}"), workers=workers, max_steps=500)
+        elapsed = time.perf_counter() - start
+        size = sum(os.path.getsize(page) for page in pages)
+        print(f"HTML export workers={workers}: {len(pages) / elapsed:6.1f} games/s  {rows / elapsed:8.0f} frames/s"
+              f"  ({size / len(pages) / 2**10:.0f} KiB/game)")
+finally:
+    shutil.rmtree(path)
@@ -0,0 +1,50 @@
+"""Replay buffer benchmark — records BENCH_GAMES self-play games, fills a
+BENCH_CAPACITY-row ReplayBuffer in full and in seed storage, and reports
+bytes per transition, add throughput, prioritized sample + priority update
+throughput, and the per-batch cost of rebuilding seed-stored observations."""
+import os, time
+
+import numpy as np
+
+from Dataset import record_episode
+from MonopolyDeal import MonopolyDeal
+from Policy import RandomPolicy
+from Replay import ReplayBuffer
+
+GAMES = int(os.environ.get("BENCH_GAMES", "20"))
+CAPACITY = int(os.environ.get("BENCH_CAPACITY", "200000"))
+BATCH = 256
+SAMPLES = 200
+
+env = MonopolyDeal(render_mode=None, max_steps=500)
+policy = RandomPolicy(seed=0)
+episodes = [record_episode(env, policy, seed=i) for i in range(GAMES)]
+rng = np.random.default_rng(0)
+
+
+def nbytes(buffer):
+    size = sum(value.nbytes for value in vars(buffer).values() if isinstance(value, np.ndarray))
+    size += buffer.tree.tree.nbytes
+    if buffer.storage == "seed":
+        size += sum(entry[2].nbytes for entry in buffer.episodes.values())
+    return size
+
+
+for storage in ("full", "seed"):
+    buffer = ReplayBuffer(CAPACITY, storage=storage, env_kwargs={"max_steps": 500}, seed=0)
+    start = time.perf_counter()
+    added = 0
+    while added < CAPACITY:
+        game = buffer.num_episodes % GAMES
+        buffer.add_episode(episodes[game], seed=game)
+        added += len(episodes[game]["decision"])
+    elapsed = time.perf_counter() - start
+    print(f"{storage:4s} {nbytes(buffer) / len(buffer):7.1f} bytes/transition   add {added / elapsed:9.0f} transitions/s")
+
+    samples = SAMPLES if storage == "full" else SAMPLES // 20
+    start = time.perf_counter()
+    for _ in range(samples):
+        indices, batch, weights = buffer.sample(BATCH)
+        buffer.update_priorities(indices, rng.random(BATCH))
+    elapsed = time.perf_counter() - start
+    print(f"{storage:4s} sample+update batch={BATCH}: {elapsed / samples * 1e3:8.2f} ms   {samples * BATCH / elapsed:9.0f} transitions/s")
@@ -0,0 +1,34 @@
+"""reset() benchmark — plays each game a little so the boards are dirty, then
+times reset() on the same env object, which is what auto-resetting rollouts
+pay between short games. Also times resets back to back, where the env's
+code and data stay in cache."""
+import os, time
+
+from MonopolyDeal import MonopolyDeal
+from Policy import RandomPolicy
+
+N = int(os.environ.get("BENCH_RESETS", "2000"))
+STEPS_BETWEEN = 50
+
+env = MonopolyDeal(render_mode=None)
+policy = RandomPolicy(seed=0)
+env.reset(seed=0)
+
+elapsed = 0.0
+for i in range(N):
+    for _ in range(STEPS_BETWEEN):
+        agent = env.agent_selection
+        if env.terminations[agent] or env.truncations[agent]:
+            break
+        env.step(policy([env.observe(agent)])[0])
+
+    start = time.perf_counter()
+    env.reset(seed=i)
+    elapsed += time.perf_counter() - start
+
+start = time.perf_counter()
+for i in range(N):
+    env.reset(seed=i)
+back_to_back = time.perf_counter() - start
+
+print(f"reset(): {elapsed / N * 1e6:.1f} us after play, {back_to_back / N * 1e6:.1f} us back to back ({N} resets)")
@@ -0,0 +1,42 @@
+"""Scenario benchmark — builds BENCH_POSITIONS positions of two targeted
+scenarios with ScenarioBatch (random hands and deck order around a fixed
+board), checks them with validate(), then times loading rows into an env
+through reset(options={"scenario": batch, "row": i})."""
+import os, time
+
+import numpy as np
+
+from MonopolyDeal import MonopolyDeal
+from Scenario import Scenario
+
+N = int(os.environ.get("BENCH_POSITIONS", "100000"))
+LOADS = 2000
+
+SCENARIOS = {
+    # opponent one card from a third set
+    "near win": Scenario([
+        {"hand": 7},
+        {"hand": 5, "bank": 3, "sets": {"Blue": [["Blue", "Blue"]], "Red": [["Red", "Red", "Red"]], "Green": [["Green", "Green"]]}},
+    ]),
+    # defender holding Just Say No with rent owed
+    "jsn rent": Scenario([
+        {"hand": 4, "bank": 2, "sets": {"Red": [["Red", "Red/Yellow"]]}},
+        {"hand": ["Just Say No", "1M"], "bank": ["3M", "2M", "1M"]},
+    ], actions_left=2, pending={"type": "PAYMENT", "defenders": [1], "amount": 5}),
+}
+
+rng = np.random.default_rng(0)
+env = MonopolyDeal(render_mode=None)
+for name, scenario in SCENARIOS.items():
+    start = time.perf_counter()
+    batch = scenario.build(N, rng)
+    valid = batch.validate()
+    elapsed = time.perf_counter() - start
+    assert valid.all()
+
+    start = time.perf_counter()
+    for row in range(LOADS):
+        env.reset(options={"scenario": batch, "row": row})
+    load = (time.perf_counter() - start) / LOADS
+
+    print(f"{name:9s} build+validate {N / elapsed:9.0f} positions/s   load into env {load * 1e6:6.1f} us")
@@ -0,0 +1,73 @@
+"""Multi-thread rollout benchmark — one MonopolyDeal and one RandomPolicy per
+thread, each stepping its own games, for 1..BENCH_THREADS threads. Prints
+steps/s and the speedup over one thread.
+
+On a free-threaded CPython build (3.13t) the whole sweep is run twice, in
+subprocesses with -X gil=1 and -X gil=0, so the two can be compared; on a
+regular build it runs once with the GIL. Also checks that a seeded game
+replays identically when other threads are playing at the same time."""
+import os, subprocess, sys, sysconfig, threading, time
+
+from MonopolyDeal import MonopolyDeal
+from Policy import RandomPolicy
+
+MAX_THREADS = int(os.environ.get("BENCH_THREADS", str(min(os.cpu_count() or 1, 8))))
+STEPS = int(os.environ.get("BENCH_STEPS", "20000"))     # per thread
+MAX_STEPS = 2000                                        # truncate long games
+
+
+def rollout(seed, steps):
+    # Play `steps` env steps with auto-reset; returns the game trace
+    # (decision, action_ID) so seeded runs can be compared.
+    env = MonopolyDeal(render_mode=None, max_steps=MAX_STEPS)
+    policy = RandomPolicy(seed=seed)
+    env.reset(seed=seed)
+    trace = []
+    for i in range(steps):
+        agent = env.agent_selection
+        if env.terminations[agent] or env.truncations[agent]:
+            env.reset(seed=seed + i)
+            agent = env.agent_selection
+        action = policy([env.observe(agent)])[0]
+        trace.append((env.action_context[0], action["action_ID"]))
+        env.step(action)
+    return trace
+
+
+def run_threads(num_threads, steps):
+    traces = [None] * num_threads
+
+    def work(index):
+        traces[index] = rollout(index, steps)
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(num_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, traces
+
+
+def sweep():
+    gil = sys._is_gil_enabled() if hasattr(sys, "_is_gil_enabled") else True
+    print(f"GIL {'enabled' if gil else 'disabled'}, {STEPS} steps per thread")
+
+    reference = rollout(0, STEPS)
+    base = None
+    for num_threads in range(1, MAX_THREADS + 1):
+        elapsed, traces = run_threads(num_threads, STEPS)
+        rate = num_threads * STEPS / elapsed
+        base = base or rate
+        print(f"{num_threads:2d} threads: {rate:9.0f} steps/s  x{rate / base:.2f}")
+        if traces[0] != reference:
+            print("seeded game diverged under concurrency")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    if sysconfig.get_config_var("Py_GIL_DISABLED") and "--sweep" not in sys.argv:
+        for flag in ("gil=1", "gil=0"):
+            subprocess.run([sys.executable, "-X", flag, __file__, "--sweep"], check=True)
+    else:
+        sweep()
@@ -1,22 +1,42 @@
-"""Bounded smoke test — same as test.py but caps the number of steps so we can
-detect regressions without waiting for an episode to end (win detection isn't
-implemented yet, so episodes don't terminate naturally). Also seeds gym's RNG
-for reproducibility."""
-import os, sys
+"""Bounded smoke test — same as test.py but caps the number of steps so a
+regression that stops games from ending can't hang the run. Also seeds gym's
+RNG for reproducibility. After the main game, short seeded games cover the
+configurations the main game never reaches; each asserts its invariants and
+prints one line."""
+import asyncio, io, os, sys, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 os.environ.setdefault("PYTHONIOENCODING", "utf-8")
 
 import numpy as np
+from AsyncActors import Batcher, LoopbackServer, run_games
+from Card import RentCard
+from cardsdb import CARDS_BY_ID
+from Dataset import TERMINATED, TRUNCATED, DataLoader, Dataset, gae, n_step_returns, record_episode, record_games
+from Features import (FEATURE_BANK, FEATURE_COMPLETED, FEATURE_HAND_SIZE, FEATURE_NEEDED, FEATURE_RENT, FEATURE_SETS_TO_WIN,
+                      SEAT_SIZE, THREAT_IDS, feature_size)
+from HtmlReplay import export_games, replay_frames
+from InferenceServer import InferenceClient, InferenceServer, LinearPolicy
 from MonopolyDeal import MonopolyDeal
+from Player import slot_sort_key
+from Policy import RandomPolicy
+from Replay import ReplayBuffer
+from Scenario import Scenario
+from mappings import MAX_PLAYERS, MIN_PLAYERS, SET_LENGTH, SETS_TO_WIN
+from SingleAgentEnv import VectorSingleAgentEnv
+from Staging import StagingBuffer, torch
+from Zobrist import CONTEXT_KEYS, DISCARD_KEYS, TranspositionTable, pending_key, set_key
 
 SEED = int(os.environ.get("SMOKE_SEED", "42"))
+MAX_STEPS = 20000
+
 np.random.seed(SEED)
-env = MonopolyDeal(render_mode=None)
+env = MonopolyDeal(render_mode=None, max_steps=MAX_STEPS)
 env.reset(seed=SEED)
 # Seed each agent's action space so sampling is deterministic
 for agent in env.possible_agents:
     env.action_space(agent).seed(SEED)
 
-MAX_STEPS = 20000
 steps = 0
 for agent in env.agent_iter():
     observation, reward, termination, truncation, info = env.last()
@@ -29,8 +49,462 @@ for agent in env.agent_iter():
 
     env.step(action)
     steps += 1
-    if steps >= MAX_STEPS:
-        print(f"OK: {steps} steps without crash")
-        break
+
+
+def leaves(tree):
+    return [leaf for value in tree.values() for leaf in leaves(value)] if isinstance(tree, dict) else [tree]
+
+
+def row(tree, i):
+    return {key: row(value, i) for key, value in tree.items()} if isinstance(tree, dict) else tree[i]
+
+
+def same(a, b):
+    return all(np.array_equal(x, y) for x, y in zip(leaves(a), leaves(b)))
+
+
+def play(env, seed, options=None):
+    """Random legal play from reset(seed, options) until the game ends; steps taken."""
+    env.reset(seed=seed, options=options)
+    for agent in env.possible_agents:
+        env.action_space(agent).seed(seed)
+    steps = 0
+    for agent in env.agent_iter():
+        observation, reward, termination, truncation, info = env.last()
+        env.step(None if termination or truncation else env.action_space(agent).sample(observation["action_mask"]))
+        steps += 1
+    return steps
+
+
+# A defender whose bank is worth nothing (a banked Wild) owes rent in every
+# payment mode: they are skipped, and the game plays on.
+zero_bank = Scenario([{"hand": 0}, {"hand": 0, "bank": ["Wild"]}, {"hand": 0, "bank": ["2M"]}],
+                     pending={"type": "PAYMENT", "defenders": [1, 2], "amount": 2})
+for payment in ("cards", "bundle", "auto"):
+    zero_env = MonopolyDeal(payment=payment, num_players=3, max_steps=300)
+    play(zero_env, SEED, {"scenario": zero_bank})
+    for seed in range(SEED, SEED + 3):
+        play(MonopolyDeal(payment=payment, num_players=5, max_steps=3000), seed)
+print("OK: zero-value banks in every payment mode")
+
+# A recycled reset() returns the same filled-in observations as a new env's.
+for num_players in (2, 4):
+    recycled = MonopolyDeal(num_players=num_players, max_steps=100)
+    for seed in range(SEED, SEED + 3):
+        play(recycled, seed)
+        observations, _ = recycled.reset(seed=seed)
+        fresh, _ = MonopolyDeal(num_players=num_players).reset(seed=seed)
+        assert all(same(observations[agent], fresh[agent]) for agent in fresh)
+        assert all(observations[agent]["observation"]["hand"].any() for agent in fresh)
+print("OK: recycled reset() observations match a fresh env")
+
+# Optional observation fields shift the flat layout; the base fields must
+# still read the same as without them, step for step.
+plain = MonopolyDeal(num_players=3, max_steps=200)
+extended = MonopolyDeal(num_players=3, max_steps=200, observation_extras=("unseen_cards", "action_history"), features=True)
+plain.reset(seed=SEED)
+extended.reset(seed=SEED)
+for agent in plain.possible_agents:
+    plain.action_space(agent).seed(SEED)
+for agent in plain.agent_iter():
+    plain_observation, _, plain_termination, plain_truncation, _ = plain.last()
+    extended_observation = extended.observe(agent)["observation"]
+    assert all(same(plain_observation["observation"][key], extended_observation[key]) for key in plain_observation["observation"])
+    action = None if plain_termination or plain_truncation else plain.action_space(agent).sample(plain_observation["action_mask"])
+    plain.step(action)
+    extended.step(action)
+print("OK: observation extras leave the base fields unchanged")
+
+# suspend() / resume() mid-game: the resumed game plays on exactly like a
+# twin that was never suspended.
+parked, twin = MonopolyDeal(num_players=3, max_steps=400), MonopolyDeal(num_players=3, max_steps=400)
+parked.reset(seed=SEED)
+twin.reset(seed=SEED)
+for agent in twin.possible_agents:
+    twin.action_space(agent).seed(SEED)
+for agent in twin.agent_iter():
+    twin_observation, _, twin_termination, twin_truncation, _ = twin.last()
+    if twin.num_steps % 50 == 0:
+        parked.suspend()
+        parked.resume()
+    assert parked.agent_selection == agent and parked.state_hash() == twin.state_hash()
+    assert same(parked.observe(agent), twin.observe(agent))
+    action = None if twin_termination or twin_truncation else twin.action_space(agent).sample(twin_observation["action_mask"])
+    twin.step(action)
+    parked.step(action)
+print("OK: suspend() / resume() round-trips mid-game")
+
+# canonical_slots: the same Red cards in different slots observe and hash
+# alike only when slots are kept canonical; over random play every colour
+# stays sorted and to_canonical / from_canonical undo each other.
+def red_start(slots, canonical_slots):
+    red_env = MonopolyDeal(num_players=2, canonical_slots=canonical_slots)
+    red_env.reset(seed=SEED, options={"scenario": Scenario([{"hand": ["1M"], "sets": {"Red": slots}}, {"hand": ["2M"]}])})
+    return red_env.state_hash(), red_env.observe_flat(red_env.agent_selection).copy()
+
+
+for canonical_slots in (False, True):
+    (hash_a, flat_a), (hash_b, flat_b) = (red_start([["Red", "Red/Yellow"]], canonical_slots),
+                                          red_start([[], [], ["Red/Yellow", "Red"]], canonical_slots))
+    assert (hash_a == hash_b) == np.array_equal(flat_a, flat_b) == canonical_slots
+canonical = MonopolyDeal(num_players=3, max_steps=600, canonical_slots=True)
+canonical.reset(seed=SEED)
+for agent in canonical.possible_agents:
+    canonical.action_space(agent).seed(SEED)
+for agent in canonical.agent_iter():
+    for player in canonical.players.values():
+        for colour, pSets in player.sets.items():
+            keys = [slot_sort_key(pSet) for pSet in pSets]
+            assert keys == sorted(keys) and all(ids == sorted(ids) for _, ids in keys)
+            for set_index in range(len(pSets)):
+                assert player.toCanonical(colour, player.fromCanonical(colour, set_index)) == set_index
+    canonical_observation, _, canonical_termination, canonical_truncation, _ = canonical.last()
+    canonical.step(None if canonical_termination or canonical_truncation
+                   else canonical.action_space(agent).sample(canonical_observation["action_mask"]))
+print("OK: canonical slots collapse symmetric boards and stay sorted")
+
+# The incrementally kept features equal a walk over every seat's board, bank
+# and hand, including the observer's best rent.
+def features_from_scratch(env, agent):
+    expected = np.zeros(feature_size(env.num_players), dtype=np.float32)
+    for position, seat_agent in enumerate([agent] + [other for other in env.agents if other != agent]):
+        player, seat_row = env.players[seat_agent], expected[position * SEAT_SIZE:(position + 1) * SEAT_SIZE]
+        for cind, (colour, length) in enumerate(SET_LENGTH.items()):
+            pSets = player.sets[colour]
+            seat_row[FEATURE_COMPLETED + cind] = sum(pSet.isCompleted() for pSet in pSets)
+            seat_row[FEATURE_NEEDED + cind] = max(length - max(len(pSet.properties) for pSet in pSets), 0)
+            seat_row[FEATURE_RENT + cind] = max(pSet.rentValue() for pSet in pSets)
+        completed_colours = sum(any(pSet.isCompleted() for pSet in pSets) for pSets in player.sets.values())
+        seat_row[FEATURE_SETS_TO_WIN] = max(SETS_TO_WIN - completed_colours, 0)
+        seat_row[FEATURE_BANK] = sum(count * CARDS_BY_ID[card_id].value for card_id, count in enumerate(player.money))
+        seat_row[FEATURE_HAND_SIZE] = sum(player.hand)
+    player = env.players[agent]
+    rents = [max(pSet.rentValue() for pSet in player.sets[colour])
+             for card_id, count in enumerate(player.hand) if count and isinstance(CARDS_BY_ID[card_id], RentCard)
+             for colour in SET_LENGTH if CARDS_BY_ID[card_id].isWild() or colour in CARDS_BY_ID[card_id].colours]
+    expected[env.num_players * SEAT_SIZE] = max(rents, default=0)
+    expected[env.num_players * SEAT_SIZE + 1:] = [env.unseen_cards(agent)[card_id] for card_id in THREAT_IDS]
+    return expected
+
+
+for num_players in (2, 4):
+    featured = MonopolyDeal(num_players=num_players, max_steps=500, features=True)
+    featured.reset(seed=SEED)
+    for agent in featured.possible_agents:
+        featured.action_space(agent).seed(SEED)
+    for agent in featured.agent_iter():
+        assert all(np.array_equal(featured.features_flat(other), features_from_scratch(featured, other)) for other in featured.agents)
+        featured_observation, _, featured_termination, featured_truncation, _ = featured.last()
+        featured.step(None if featured_termination or featured_truncation
+                      else featured.action_space(agent).sample(featured_observation["action_mask"]))
+print("OK: features match a from-scratch walk over boards, banks and hands")
+
+# The incrementally kept Zobrist hash equals one recomputed from the whole
+# state, in every payment mode; a TranspositionTable keyed on it evicts the
+# least recently used entry.
+def hash_from_scratch(env):
+    expected = 0
+    for card_id, count in enumerate(env.deck.discard_counts):
+        expected ^= DISCARD_KEYS[card_id][count]
+    for agent, player in env.players.items():
+        keys = player.keys()
+        for card_id, count in enumerate(player.hand):
+            expected ^= keys.hand[card_id][count]
+        for card_id, count in enumerate(player.money):
+            expected ^= keys.money[card_id][count]
+        for cind, pSets in enumerate(player.sets.values()):
+            for set_index, pSet in enumerate(pSets):
+                expected ^= set_key(keys, cind, set_index, pSet)
+        expected ^= keys.actions_left[env.actions_left[agent]]
+    expected ^= env.players[env.agent_selection].keys().to_act
+    for offset, value in enumerate(env.action_context):
+        expected ^= CONTEXT_KEYS[offset][value + 1]
+    return expected ^ pending_key(env.pending, env.agent_name_mapping)
+
+
+table = TranspositionTable(capacity=64)
+for payment in ("cards", "bundle", "auto"):
+    hashed = MonopolyDeal(num_players=3, max_steps=400, payment=payment)
+    hashed.reset(seed=SEED)
+    for agent in hashed.possible_agents:
+        hashed.action_space(agent).seed(SEED)
+    for agent in hashed.agent_iter():
+        assert hashed.state_hash() == hash_from_scratch(hashed)
+        table.put(hashed.state_hash(), hashed.num_steps)
+        hashed_observation, _, hashed_termination, hashed_truncation, _ = hashed.last()
+        hashed.step(None if hashed_termination or hashed_truncation
+                    else hashed.action_space(agent).sample(hashed_observation["action_mask"]))
+    hashed.reset(seed=SEED)
+    assert hashed.state_hash() == hash_from_scratch(hashed)
+assert len(table) == 64
+table = TranspositionTable(capacity=2)
+table.put(1, "a")
+table.put(2, "b")
+assert table.get(1) == "a"          # 1 is now the most recently used
+table.put(3, "c")
+assert 1 in table and 2 not in table and table.get(2, "gone") == "gone" and (table.hits, table.misses) == (1, 1)
+print("OK: Zobrist hash matches a from-scratch recompute; transposition table evicts LRU")
+
+# StagingBuffer.gather() copies each env's flat observation and mask into
+# its row, for the agent to act or for the agents given; tensors() (with
+# torch) shares that memory.
+staged_envs = [MonopolyDeal(num_players=3, max_steps=200, observation_extras=("unseen_cards",)) for _ in range(4)]
+for seed, staged_env in enumerate(staged_envs, SEED):
+    staged_env.reset(seed=seed)
+    for agent in staged_env.possible_agents:
+        staged_env.action_space(agent).seed(seed)
+    for _ in range(seed - SEED):    # a different number of steps into each game
+        staged_agent = staged_env.agent_selection
+        staged_env.step(staged_env.action_space(staged_agent).sample(staged_env.observe(staged_agent)["action_mask"]))
+staging = StagingBuffer.for_env(staged_envs[0], batch_size=8, pin_memory=False)
+for agents in (None, [staged_env.possible_agents[seed % 3] for seed, staged_env in enumerate(staged_envs)]):
+    staging.observations.fill(-1)
+    staging.action_masks.fill(-1)
+    assert staging.gather(staged_envs, agents) == len(staged_envs)
+    for i, staged_env in enumerate(staged_envs):
+        staged_agent = staged_env.agent_selection if agents is None else agents[i]
+        assert np.array_equal(staging.observations[i], staged_env.observe_flat(staged_agent))
+        assert np.array_equal(staging.action_masks[i], staged_env.action_mask_flat(staged_agent))
+    assert (staging.observations[len(staged_envs):] == -1).all()
+if torch is None:
+    try:
+        staging.tensors()
+        raise AssertionError("tensors() without torch should raise ImportError")
+    except ImportError:
+        pass
+else:
+    observation_tensor, mask_tensor = staging.tensors(len(staged_envs))
+    assert np.array_equal(observation_tensor.numpy(), staging.observations[:len(staged_envs)])
+    assert observation_tensor.data_ptr() == staging.observations.ctypes.data and mask_tensor.data_ptr() == staging.action_masks.ctypes.data
+print("OK: staging buffer rows match each env's flat observation and mask")
+
+# Seed-stored replay rebuilds exactly the rows full storage keeps, also for
+# an env with observation extras (a wider flat observation).
+replay_kwargs = {"max_steps": 150, "observation_extras": ("unseen_cards", "action_history")}
+recorder = MonopolyDeal(num_players=3, **replay_kwargs)
+episodes = [record_episode(recorder, RandomPolicy(seed=seed), seed=seed) for seed in range(SEED, SEED + 3)]
+full = ReplayBuffer(1000, num_players=3, storage="full", env_kwargs=replay_kwargs, seed=SEED)
+seeded = ReplayBuffer(1000, num_players=3, storage="seed", env_kwargs=replay_kwargs, seed=SEED)
+for seed, episode in zip(range(SEED, SEED + 3), episodes):
+    full.add_episode(episode, seed=seed)
+    seeded.add_episode(episode, seed=seed)
+full_indices, full_batch, _ = full.sample(64)
+seeded_indices, seeded_batch, _ = seeded.sample(64)
+assert np.array_equal(full_indices, seeded_indices) and same(full_batch, seeded_batch)
+print("OK: seed-stored replay matches full storage")
+
+# A partly filled buffer samples only filled rows, even for prefix sums at
+# the very top of the tree where rounding walks past the last one.
+partial = ReplayBuffer(4096, num_players=3, env_kwargs=replay_kwargs, seed=SEED)
+partial.add_episode(episodes[0])
+priority_rng = np.random.default_rng(SEED)
+for _ in range(20):
+    indices, batch, weights = partial.sample(256)
+    assert (partial.tree[indices] > 0).all() and np.isfinite(weights).all() and (weights > 0).all()
+    partial.update_priorities(indices, priority_rng.exponential(size=len(indices)))
+    total = partial.tree.total()
+    edge = partial.tree.find(np.array([total, np.nextafter(total, 0)]), partial.size)
+    assert (edge < partial.size).all() and (partial.tree[edge] > 0).all()
+print("OK: a partly filled replay buffer samples only filled rows")
+
+# Returns computed along all trajectories at once equal a plain backward
+# loop over each seat's rows, and worker processes serve the same batches
+# as in-process loading.
+with tempfile.TemporaryDirectory() as dataset_path:
+    record_games(dataset_path, 4, seed=SEED, num_players=3, max_steps=150)
+    dataset = Dataset(dataset_path)
+    rewards, done = np.asarray(dataset["reward"], dtype=np.float64), np.array(dataset["done"])
+    values = np.random.default_rng(SEED).normal(size=len(dataset))
+    next_index = dataset.next_index()
+    # random play never wins within max_steps: call every other game won so
+    # both kinds of trajectory end are covered
+    done[(next_index < 0) & (dataset["episode"] % 2 == 0)] = TERMINATED
+    returns = n_step_returns(rewards, values, next_index, done, gamma=0.9, n=3)
+    advantages, gae_returns = gae(rewards, values, next_index, done, gamma=0.9, lam=0.8)
+    assert (done == TRUNCATED).any() and (done == TERMINATED).any()
+    for episode_seat in set(zip(dataset["episode"].tolist(), dataset["seat"].tolist())):
+        rows = np.flatnonzero((dataset["episode"] == episode_seat[0]) & (dataset["seat"] == episode_seat[1]))
+        end_value = values[rows[-1]] if done[rows[-1]] == TRUNCATED else 0.0
+        following = np.append(values[rows[1:]], end_value)
+        advantage = 0.0
+        for t in reversed(range(len(rows))):
+            advantage = rewards[rows[t]] + 0.9 * following[t] - values[rows[t]] + 0.9 * 0.8 * advantage
+            assert abs(advantages[rows[t]] - advantage) < 1e-9
+            expected = sum(0.9 ** k * rewards[rows[t + k]] for k in range(min(3, len(rows) - t)))
+            expected += 0.9 ** 3 * values[rows[t + 3]] if t + 3 < len(rows) else 0.9 ** (len(rows) - t) * end_value
+            assert abs(returns[rows[t]] - expected) < 1e-9
+    assert np.allclose(gae_returns, advantages + values)
+    loaded = [[{name: column.copy() for name, column in batch.items()}
+               for batch in DataLoader(dataset_path, batch_size=64, block=128, shuffle_buffer=512, workers=workers, epochs=2, seed=SEED)]
+              for workers in (0, 2)]
+    assert len(loaded[0]) == len(loaded[1]) > 0 and all(same(a, b) for a, b in zip(*loaded))
+print("OK: n-step returns and GAE match a per-trajectory loop; worker batches match in-process")
+
+# Every game draws from its own generator: the same seeds give the same
+# games whether played one after another or interleaved on threads.
+def seeded_game(seed):
+    episode = record_episode(MonopolyDeal(max_steps=300), RandomPolicy(seed=seed), seed=seed)
+    return np.asarray(episode["action"])
+
+sequential = [seeded_game(seed) for seed in range(SEED, SEED + 4)]
+with ThreadPoolExecutor(4) as pool:
+    threaded = list(pool.map(seeded_game, range(SEED, SEED + 4)))
+assert all(np.array_equal(a, b) for a, b in zip(sequential, threaded))
+
+# Spaces sample from their own RNG per env and agent: seeding or sampling
+# another one never shifts this one's draws.
+def space_draws(env, agent, meddle=None):
+    env.action_space(agent).seed(SEED)
+    if meddle is not None:
+        meddle.seed(SEED + 1)
+        meddle.sample()
+    return [leaves(env.action_space(agent).sample()) for _ in range(8)]
+
+space_env, other_env = MonopolyDeal(), MonopolyDeal()
+assert space_env.action_space("player_0") is not other_env.action_space("player_0")
+assert space_draws(space_env, "player_0") == space_draws(space_env, "player_0", other_env.action_space("player_1"))
+assert space_draws(space_env, "player_0") == space_draws(space_env, "player_0", space_env.action_space("player_1"))
+print("OK: seeded games are identical across threads; spaces are per env and agent")
+
+# Text rendering: a recorded game replayed from its seed ends on the table
+# the recording env ended on, and exports as an HTML page per game.
+rendered = MonopolyDeal(render_mode="text", num_players=3, max_steps=200)
+rendered.renderer.stream = io.StringIO()
+episode = record_episode(rendered, RandomPolicy(seed=SEED), seed=SEED)
+assert "Action: " in rendered.renderer.stream.getvalue()
+frames = replay_frames(SEED, episode["action"], num_players=3, max_steps=200)
+assert len(frames) == len(episode["decision"]) + 1
+assert frames[-1][2] == rendered.renderer.format_table(rendered._get_internal_state())
+pages = export_games(tempfile.mkdtemp(), [(SEED, episode["action"])], workers=0, num_players=3, max_steps=200)
+assert all(os.path.getsize(page) for page in pages)
+print("OK: text render and HTML replay of a seeded game")
+
+# Autoreset: final_obs / final_info hold the finished game's last state
+# (not the next game's first), and stay put when the vector env steps on.
+vector = VectorSingleAgentEnv(2, max_steps=40)
+observations, infos = vector.reset(seed=SEED)
+vector.single_action_space.seed(SEED)
+autoresets = 0
+while autoresets < 4:
+    actions = [vector.single_action_space.sample(row(infos["action_mask"], i)) for i in range(vector.num_envs)]
+    observations, rewards, terminations, truncations, infos = vector.step(actions)
+    finished = [(i, infos["final_obs"][i], infos["final_info"][i]) for i in np.flatnonzero(terminations | truncations)]
+    kept = deepcopy(finished)
+    for i, final_obs, final_info in finished:
+        assert not same(final_obs, row(observations, i))
+    actions = [vector.single_action_space.sample(row(infos["action_mask"], i)) for i in range(vector.num_envs)]
+    observations, rewards, terminations, truncations, infos = vector.step(actions)
+    for (i, final_obs, final_info), (_, obs_then, info_then) in zip(finished, kept):
+        assert same(final_obs, obs_then) and same(final_info, info_then)
+    autoresets += len(finished)
+print(f"OK: {autoresets} autoresets keep final_obs / final_info")
+
+# A cancelled act() leaves the rest of its batch served, and a server that
+# answers short fails the requests it left out instead of hanging them.
+class ShortServer(LoopbackServer):
+    async def infer(self, observations):
+        return (await super().infer(observations))[:-1]
+
+async def cancel_in_batch():
+    batch_env = MonopolyDeal(max_steps=100)
+    batch_env.reset(seed=SEED)
+    observation = batch_env.observe(batch_env.agent_selection)
+    batcher = Batcher(LoopbackServer(RandomPolicy(seed=SEED), latency=0.01))
+    cancelled, served = asyncio.ensure_future(batcher.act(observation)), asyncio.ensure_future(batcher.act(observation))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    assert isinstance(await asyncio.wait_for(served, 5), dict)
+    batcher = Batcher(ShortServer(RandomPolicy(seed=SEED)))
+    first, second = await asyncio.wait_for(asyncio.gather(batcher.act(observation), batcher.act(observation),
+                                                          return_exceptions=True), 5)
+    assert isinstance(first, dict) and isinstance(second, RuntimeError)
+
+asyncio.run(cancel_in_batch())
+print("OK: Batcher serves around cancelled and unanswered requests")
+
+# 2-5 player games against one inference server at once: every request
+# carries its player count, so mixed batches pack and sample correctly.
+async def serve_all_counts(path):
+    serving = asyncio.ensure_future(InferenceServer(path, policy=LinearPolicy(seed=SEED), seed=SEED).serve_forever())
+    while not os.path.exists(path):
+        await asyncio.sleep(0.01)
+    clients = [await InferenceClient(path, n).connect() for n in range(MIN_PLAYERS, MAX_PLAYERS + 1)]
+    results = await asyncio.gather(*[run_games(2, Batcher(client), seed=SEED, max_steps=200, num_players=client.num_players)
+                                     for client in clients])
+    for client in clients:
+        await client.close()
+    serving.cancel()
+    return results
+
+results = asyncio.run(serve_all_counts(os.path.join(tempfile.mkdtemp(), "inference.sock")))
+assert all(steps >= 200 or winner is not None for games in results for winner, steps in games)
+print(f"OK: {MIN_PLAYERS}-{MAX_PLAYERS} player games through the inference server")
+
+# A policy that raises fails the requests of its batch (the client sees the
+# connection drop) without stopping the server, which serves the next client.
+class FailingPolicy(LinearPolicy):
+    def __call__(self, observations, num_players=MIN_PLAYERS):
+        if self.fail:
+            raise RuntimeError("policy failed")
+        return super().__call__(observations, num_players)
+
+async def survive_policy_error(path):
+    policy = FailingPolicy(seed=SEED)
+    policy.fail = True
+    serving = asyncio.ensure_future(InferenceServer(path, policy=policy).serve_forever())
+    while not os.path.exists(path):
+        await asyncio.sleep(0.01)
+    client = await InferenceClient(path).connect()
+    try:
+        await run_games(2, Batcher(client), seed=SEED, max_steps=50)
+        raise AssertionError("policy error was not reported")
+    except ConnectionError:
+        pass
+    await client.close()
+    policy.fail = False
+    client = await InferenceClient(path).connect()
+    results = await run_games(2, Batcher(client), seed=SEED, max_steps=50)
+    await client.close()
+    serving.cancel()
+    return results
+
+results = asyncio.run(asyncio.wait_for(survive_policy_error(os.path.join(tempfile.mkdtemp(), "inference.sock")), 60))
+assert all(steps >= 50 or winner is not None for winner, steps in results)
+print("OK: the inference server survives a failing policy")
+
+# Cancelling one in-flight request leaves the client in step with the
+# server, and a header with an unsupported player count drops only its own
+# connection.
+async def cancel_and_reject(path):
+    serving = asyncio.ensure_future(InferenceServer(path, seed=SEED, max_wait=0.05).serve_forever())
+    while not os.path.exists(path):
+        await asyncio.sleep(0.01)
+    flat_env = MonopolyDeal(max_steps=100)
+    flat_env.reset(seed=SEED)
+    agent = flat_env.agent_selection
+    observations = np.stack([flat_env.observe_flat(agent)] * 3)
+    masks = np.stack([flat_env.action_mask_flat(agent)] * 3)
+    client = await InferenceClient(path).connect()
+    requests = [asyncio.ensure_future(client.infer_flat(observations[:rows], masks[:rows])) for rows in (3, 1, 2)]
+    await asyncio.sleep(0)
+    requests[0].cancel()
+    served = await asyncio.wait_for(asyncio.gather(*requests[1:]), 5)
+    assert [len(actions) for actions in served] == [1, 2] and not client._receiving.done()
+    assert len(await asyncio.wait_for(client.infer_flat(observations, masks), 5)) == 3
+    bad = await InferenceClient(path, num_players=MAX_PLAYERS + 4).connect()
+    try:
+        await asyncio.wait_for(bad.infer_flat(observations, masks), 5)
+        raise AssertionError("unsupported player count was accepted")
+    except ConnectionError:
+        pass
+    await bad.close()
+    assert len(await asyncio.wait_for(client.infer_flat(observations, masks), 5)) == 3
+    await client.close()
+    serving.cancel()
+
+asyncio.run(cancel_and_reject(os.path.join(tempfile.mkdtemp(), "inference.sock")))
+print("OK: the inference client survives cancellation; bad headers are rejected")
+
+print(f"OK: {steps} steps without crash ({env.num_steps} live, winner: {info.get('winner')})")
 
 env.close()
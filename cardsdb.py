@@ -64,4 +64,7 @@ for i in range(6):
 for i in range(8):
     ALL_CARDS.append(ActionCard(25, "Pass Go", 1, "Take 2 cards"))
 
-    
\ No newline at end of file
+    
+
+# One card object per id, e.g. for restoring pickled games
+CARDS_BY_ID = {card.id: card for card in ALL_CARDS}
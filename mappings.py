@@ -1,6 +1,7 @@
 # IMPORTANT CONSTANTS
-NUM_PLAYERS = 2                        # Number of players including agent
-NUM_OPPONENTS = NUM_PLAYERS - 1
+NUM_PLAYERS = 2                        # Default number of players including agent
+MIN_PLAYERS = 2                        # Player counts MonopolyDeal(num_players=...) accepts
+MAX_PLAYERS = 5
 
 MAX_HAND_SIZE = 13                     # Maximum number of cards in hand (start with 7, play 3 Pass Go's)
 MAX_SETS_PER_PROPERTY = 9              # Maximum possible number of sets per property colour
@@ -11,7 +12,10 @@ NUM_UNIQUE_PROPERTY_CARDS = 18         # Number of property cards
 NUM_UNIQUE_CARDS = 40                  # Number of unique cards in deck
 
 NUM_ACTIONS = 17                       # Number of actions
-MAX_DECISIONS = 14                     # Highest decision code (attacker phases 0-9, defender phases 10-14)
+SETS_TO_WIN = 3                        # Completed sets of different colours needed to win
+
+MAX_DECISIONS = 15                     # Highest decision code (attacker phases 0-9, defender phases 10-15)
+MAX_PAYMENT_BUNDLES = 16               # Payment bundles offered per DECISION_DEFENDER_PAY_BUNDLE
 
 # Defender-phase decision codes. Active when env.pending is not None and
 # control has been yielded from the attacker to a defender for a follow-up choice.
@@ -20,6 +24,75 @@ DECISION_DEFENDER_PAY = 11                       # pick a card to hand over (ren
 DECISION_DEFENDER_PAY_DONE = 12                  # signal payment is complete (or forced when no cards left)
 DECISION_DEFENDER_FORCED_DEAL_PLACE_COLOUR = 13  # set colour for incoming forced-deal property
 DECISION_DEFENDER_FORCED_DEAL_PLACE_INDEX = 14   # set index within that colour
+DECISION_DEFENDER_PAY_BUNDLE = 15                # pick a whole payment bundle (payment="bundle")
+
+# action_context layout. The context is one flat int8 array (-1 = unset),
+# indexed with these offsets rather than a nested dict of np.int8 scalars.
+CTX_DECISION = 0
+CTX_ACTION = 1
+CTX_HAND_CARD = 2
+CTX_TARGET_ID = 3
+CTX_OPPONENT_ID = 4
+CTX_OPPONENT_PROPERTY_COLOUR = 5
+CTX_OPPONENT_PROPERTY_SET_INDEX = 6
+CTX_OPPONENT_PROPERTY_CARD = 7
+CTX_OPPONENT_SET_COLOUR = 8
+CTX_OPPONENT_SET_INDEX = 9
+CTX_MY_PROPERTY_COLOUR = 10
+CTX_MY_PROPERTY_SET_INDEX = 11
+CTX_MY_PROPERTY_CARD = 12
+CTX_MY_SET_COLOUR = 13
+CTX_MY_SET_INDEX = 14
+CTX_SIZE = 15
+
+# Largest value of each action_context field, in offset order
+def ctx_high(num_players):
+    return [
+        MAX_DECISIONS,                   # decision
+        NUM_ACTIONS - 1,                 # action
+        NUM_UNIQUE_CARDS - 1,            # hand_card
+        num_players - 1,                 # target_ID
+        num_players - 1,                 # opponent_ID
+        NUM_UNIQUE_COLOURS - 1,          # opponent_property colour
+        MAX_SETS_PER_PROPERTY - 1,       # opponent_property set_index
+        NUM_UNIQUE_PROPERTY_CARDS - 1,   # opponent_property card
+        NUM_UNIQUE_COLOURS - 1,          # opponent_set colour
+        MAX_SETS_PER_PROPERTY - 1,       # opponent_set set_index
+        NUM_UNIQUE_COLOURS - 1,          # my_property colour
+        MAX_SETS_PER_PROPERTY - 1,       # my_property set_index
+        NUM_UNIQUE_PROPERTY_CARDS - 1,   # my_property card
+        NUM_UNIQUE_COLOURS - 1,          # my_set colour
+        MAX_SETS_PER_PROPERTY - 1,       # my_set set_index
+    ]
+
+# action_history layout (observation extra "action_history"): the last
+# HISTORY_LENGTH resolved actions, one int8 row each (-1 = unset), newest
+# first. Seats are relative to the observer: 0 is the observer, i is the
+# i-th opponent in turn order (row i-1 of the opponent_* fields).
+HISTORY_LENGTH = 16
+HIST_ACTION = 0                        # action_ID, or HISTORY_PAYMENT / HISTORY_PLACEMENT
+HIST_ACTOR = 1                         # seat that acted
+HIST_TARGET = 2                        # seat targeted (-1 for none or every opponent)
+HIST_HAND_CARD = 3                     # card played from hand
+HIST_CARD = 4                          # property card played, moved, taken or placed
+HIST_COLOUR = 5                        # colour of the set involved
+HIST_AMOUNT = 6                        # amount owed by each target, or paid
+HIST_SIZE = 7
+
+HISTORY_PAYMENT = NUM_ACTIONS          # a defender paid the attacker (actor pays target)
+HISTORY_PLACEMENT = NUM_ACTIONS + 1    # a defender placed the forced-deal card it received
+
+# Largest value of each action_history field, in offset order
+def history_high(num_players):
+    return [
+        HISTORY_PLACEMENT,               # action
+        num_players - 1,                 # actor
+        num_players - 1,                 # target
+        NUM_UNIQUE_CARDS - 1,            # hand_card
+        NUM_UNIQUE_PROPERTY_CARDS - 1,   # card
+        NUM_UNIQUE_COLOURS - 1,          # colour
+        127,                             # amount (int8 max)
+    ]
 
 # Number of cards required for a set
 SET_LENGTH = {
@@ -34,6 +107,7 @@ SET_LENGTH = {
     "Pink": 3,
     "Black": 4,
 }
+MAX_SET_SIZE = max(SET_LENGTH.values())
 
 # Number of max sets 
 MAX_SETS = {